@@ -0,0 +1,240 @@
+"""Benchmark de bout en bout de BellAIAgent.process_message, sans réseau
+
+Modèle factice scripté (séquences d'appels d'outils réalistes) et serveur local
+imitant Google Routes / Places. Résultats en JSON, comparables entre commits.
+
+Usage:
+    python benchmarks/bench_agent.py
+    python benchmarks/bench_agent.py --turns 500 --concurrency 32 --llm-latency 0.2 --output HEAD.json
+    python benchmarks/bench_agent.py --scenarios greeting,route --baseline main.json
+"""
+import os
+import gc
+import sys
+import json
+import time
+import asyncio
+import argparse
+import contextlib
+import subprocess
+import tracemalloc
+from typing import Any, Dict, List, Optional
+import numpy as np
+
+# Clés factices : les clients Google/Azure valident leur format dès l'import
+os.environ.setdefault("GPLACES_API_KEY", "AIza" + "x" * 35)
+os.environ.setdefault("AZURE_OPENAI_API_KEY", "bench")
+os.environ.setdefault("AZURE_OPENAI_ENDPOINT", "https://bench.openai.azure.com/")
+os.environ.setdefault("AZURE_OPENAI_DEPLOYMENT_NAME", "bellai")
+
+HOTEL = "52 Rue d'Oradour-sur-Glane, 75015 Paris"
+
+# Scénario -> (message client, mot-clé du script, script du modèle factice)
+SCENARIOS: Dict[str, Dict[str, Any]] = {
+    "greeting": {
+        "message": "Bonjour !",
+        "keyword": "bonjour",
+        "script": ["Bonjour et bienvenue au BellAI Hotel ! Comment puis-je vous aider ?"],
+    },
+    "restaurant_booking": {
+        "message": "Je voudrais réserver une table au restaurant ce soir à 20h",
+        "keyword": "réserver une table",
+        "script": [
+            ("get_client_preferences", {}),
+            ("detect_booking_intention", {"user_message": "Je voudrais réserver une table au restaurant ce soir à 20h",
+                                          "service_type": "restaurant"}),
+            "Je vous propose une table au Patio à 20h. Souhaitez-vous que je confirme ?",
+        ],
+    },
+    "route": {
+        "message": "Comment aller à l'Opéra Garnier en métro ?",
+        "keyword": "opéra garnier",
+        "script": [
+            ("get_route", {"origin": HOTEL, "destination": "Opéra Garnier, Paris", "travel_mode": "TRANSIT"}),
+            "Prenez la ligne 8 à Charles Michels jusqu'à Opéra, environ 23 minutes.",
+        ],
+    },
+    "places": {
+        "message": "Un bon restaurant italien près de l'hôtel ?",
+        "keyword": "italien",
+        "script": [
+            ("search_places", {"query": "restaurant italien"}),
+            ("get_route_matrix", {"origin": HOTEL, "destinations": ["Lieu stub_1", "Lieu stub_2", "Lieu stub_3"]}),
+            "Voici trois adresses italiennes, la plus proche est à 10 minutes.",
+        ],
+    },
+    "escalation": {
+        "message": "J'ai un problème grave avec ma chambre, je veux parler à un responsable",
+        "keyword": "responsable",
+        "script": [
+            ("detect_escalation_need", {"user_message": "J'ai un problème grave avec ma chambre, je veux parler à un responsable"}),
+            "Je transmets immédiatement votre demande à la réception.",
+        ],
+    },
+}
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "max": None}
+    array = np.array(values)
+    return {
+        "p50": round(float(np.percentile(array, 50)), 3),
+        "p95": round(float(np.percentile(array, 95)), 3),
+        "p99": round(float(np.percentile(array, 99)), 3),
+        "max": round(float(array.max()), 3),
+    }
+
+def build_agent(llm_latency: float, governed: bool):
+    """Agent complet avec le modèle factice sur toutes les routes"""
+    from bellai.core.agent import BellAIAgent
+    from bellai.core.router import ModelRoute
+    from bellai.testing.fake_llm import FakeChatModel
+
+    fake = FakeChatModel(latency=llm_latency,
+                         scripts={scenario["keyword"]: scenario["script"] for scenario in SCENARIOS.values()})
+    model = fake
+    if governed:
+        from bellai.core.governor import GovernedChatModel, get_governor
+        model = GovernedChatModel(inner=fake, governor=get_governor("bench"))
+    agent = BellAIAgent(models={route: model for route in ModelRoute})
+    return agent, fake
+
+async def _run_turns(agent, message: str, prefix: str, turns: int, concurrency: int) -> Dict[str, Any]:
+    """Tours répartis sur `concurrency` sessions exécutées en parallèle"""
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+
+    async def worker(index: int, count: int) -> None:
+        for _ in range(count):
+            started = time.perf_counter()
+            result = await agent.process_message(message, f"{prefix}_{index}")
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[result.get("status", "unknown")] = statuses.get(result.get("status", "unknown"), 0) + 1
+
+    workers = min(concurrency, turns)
+    shares = [turns // workers + (i < turns % workers) for i in range(workers)]
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i, share) for i, share in enumerate(shares)))
+    return {"wall": time.perf_counter() - started, "latencies": latencies, "statuses": statuses}
+
+async def _memory_per_session(agent, message: str, prefix: str, sessions: int) -> float:
+    """Mémoire retenue après un tour dans `sessions` nouvelles sessions (Ko par session)"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(sessions):
+        await agent.process_message(message, f"{prefix}_{i}")
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return round((after - before) / sessions / 1024, 2)
+
+async def run_scenario(agent, fake, name: str, turns: int, concurrency: int,
+                       llm_latency: float, memory_sessions: int) -> Dict[str, Any]:
+    message = SCENARIOS[name]["message"]
+    # Échauffement (imports paresseux, caches)
+    await _run_turns(agent, message, f"warm_{name}", min(5, turns), 1)
+
+    # Surcoût par itération mesuré sans concurrence
+    calls = fake.calls
+    sequential = await _run_turns(agent, message, f"seq_{name}", min(20, turns), 1)
+    seq_turns = len(sequential["latencies"])
+    calls_per_turn = (fake.calls - calls) / seq_turns
+    overhead_ms = (float(np.mean(sequential["latencies"])) - llm_latency * 1000 * calls_per_turn) / calls_per_turn
+
+    load = await _run_turns(agent, message, f"load_{name}", turns, concurrency)
+    return {
+        "turns": turns,
+        "concurrency": concurrency,
+        "statuses": load["statuses"],
+        "turns_per_second": round(turns / load["wall"], 2),
+        "latency_ms": _percentiles(load["latencies"]),
+        "llm_calls_per_turn": round(calls_per_turn, 2),
+        "iteration_overhead_ms": round(overhead_ms, 3),
+        "memory_per_session_kb": await _memory_per_session(agent, message, f"mem_{name}", memory_sessions),
+    }
+
+def compare(result: Dict[str, Any], baseline: Dict[str, Any]) -> Dict[str, Any]:
+    """Écarts relatifs (%) avec un résultat précédent : débit, p95 et surcoût par itération"""
+    deltas = {}
+    for name, current in result["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        pairs = {
+            "turns_per_second": (current["turns_per_second"], previous["turns_per_second"]),
+            "p95_ms": (current["latency_ms"]["p95"], previous["latency_ms"]["p95"]),
+            "iteration_overhead_ms": (current["iteration_overhead_ms"], previous["iteration_overhead_ms"]),
+        }
+        deltas[name] = {key: round((now - before) / before * 100, 1) if before else None
+                        for key, (now, before) in pairs.items()}
+    return {"baseline_commit": baseline.get("commit"), "delta_percent": deltas}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Scénarios séparés par des virgules")
+    parser.add_argument("--turns", type=int, default=200, help="Tours par scénario")
+    parser.add_argument("--concurrency", type=int, default=16, help="Sessions en parallèle")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Latence simulée par appel au modèle (s)")
+    parser.add_argument("--google-latency", type=float, default=0.0, help="Latence simulée des API Google (s)")
+    parser.add_argument("--memory-sessions", type=int, default=100)
+    parser.add_argument("--governed", action="store_true", help="Modèle derrière le régulateur Azure")
+    parser.add_argument("--output", help="Fichier JSON de résultats (sinon sortie standard)")
+    parser.add_argument("--baseline", help="Résultat JSON précédent à comparer")
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Scénarios inconnus: {', '.join(unknown)}")
+
+    from bellai.testing.google_stub import GoogleStubServer
+    with GoogleStubServer(latency=args.google_latency) as google:
+        # Avant l'import de l'agent : les URL sont lues au chargement des modules
+        os.environ["BELLAI_GOOGLE_ROUTES_URL"] = google.url
+        os.environ["BELLAI_GOOGLE_MAPS_URL"] = google.url
+        agent, fake = build_agent(args.llm_latency, args.governed)
+
+        async def run_all() -> Dict[str, Any]:
+            return {name: await run_scenario(agent, fake, name, args.turns, args.concurrency,
+                                             args.llm_latency, args.memory_sessions)
+                    for name in names}
+
+        # Traces verbeuses de l'AgentExecutor écartées : seule la sortie JSON reste sur stdout
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            scenarios = asyncio.run(run_all())
+        google_requests = dict(google.requests)
+
+    result = {
+        "benchmark": "agent_e2e",
+        "commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "config": {
+            "turns": args.turns,
+            "concurrency": args.concurrency,
+            "llm_latency": args.llm_latency,
+            "google_latency": args.google_latency,
+            "governed": args.governed,
+        },
+        "scenarios": scenarios,
+        "google_requests": google_requests,
+    }
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            result["comparison"] = compare(result, json.load(f))
+
+    output = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    print(output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Benchmark de latence des requêtes du routeur GTFS hors ligne (RAPTOR)
+
+Usage:
+    python benchmarks/bench_transit.py                       # réseau synthétique 20x20
+    python benchmarks/bench_transit.py --grid 40 --queries 500
+    python benchmarks/bench_transit.py --gtfs /chemin/vers/idfm_gtfs
+"""
+import os
+import json
+import time
+import random
+import argparse
+import tempfile
+from datetime import datetime
+import numpy as np
+from bellai.routing.transit import TransitTimetable, RaptorRouter
+
+ORIGIN_LAT, ORIGIN_LON = 48.8294, 2.2784
+SPACING_DEG = 0.0036  # ~400 m entre arrêts
+
+def _hms(seconds: int) -> str:
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+def write_synthetic_feed(path: str, grid: int, headway_s: int = 300, hop_s: int = 90) -> None:
+    """Réseau en grille : une ligne par rangée et par colonne, dans les deux sens"""
+    stops = ["stop_id,stop_name,stop_lat,stop_lon"]
+    for i in range(grid):
+        for j in range(grid):
+            stops.append(f"S{i}_{j},Arrêt {i}-{j},{ORIGIN_LAT + i * SPACING_DEG:.6f},{ORIGIN_LON + j * SPACING_DEG:.6f}")
+
+    lines = []
+    for i in range(grid):
+        lines.append((f"H{i}", [f"S{i}_{j}" for j in range(grid)]))
+        lines.append((f"V{i}", [f"S{j}_{i}" for j in range(grid)]))
+
+    routes = ["route_id,route_short_name,route_type"]
+    trips = ["route_id,service_id,trip_id,trip_headsign"]
+    stop_times = ["trip_id,arrival_time,departure_time,stop_id,stop_sequence"]
+    for name, sequence in lines:
+        routes.append(f"{name},{name},{3 if name.startswith('H') else 1}")
+        for direction, ordered in (("A", sequence), ("R", sequence[::-1])):
+            for n, start in enumerate(range(6 * 3600, 23 * 3600, headway_s)):
+                trip_id = f"{name}{direction}_{n}"
+                trips.append(f"{name},ALL,{trip_id},{ordered[-1]}")
+                for k, stop in enumerate(ordered):
+                    t = _hms(start + k * hop_s)
+                    stop_times.append(f"{trip_id},{t},{t},{stop},{k + 1}")
+
+    for filename, rows in (("stops.txt", stops), ("routes.txt", routes), ("trips.txt", trips), ("stop_times.txt", stop_times)):
+        with open(os.path.join(path, filename), "w", encoding="utf-8") as f:
+            f.write("\n".join(rows) + "\n")
+
+def run(gtfs_path: str, queries: int, seed: int) -> dict:
+    started = time.perf_counter()
+    timetable = TransitTimetable(gtfs_path)
+    load_seconds = time.perf_counter() - started
+    router = RaptorRouter(timetable)
+
+    rng = random.Random(seed)
+    latencies, found = [], 0
+    departure = datetime(2025, 6, 2, 8, 0)
+    for _ in range(queries):
+        a, b = rng.sample(range(len(timetable.stop_ids)), 2)
+        origin = (timetable.stop_lats[a], timetable.stop_lons[a])
+        destination = (timetable.stop_lats[b], timetable.stop_lons[b])
+        t0 = time.perf_counter()
+        route = router.route(origin, destination, departure)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        found += route is not None
+
+    latencies_ms = np.array(latencies)
+    return {
+        "benchmark": "transit_raptor",
+        "stops": len(timetable.stop_ids),
+        "patterns": len(timetable.pattern_stops),
+        "load_seconds": round(load_seconds, 3),
+        "queries": queries,
+        "found": found,
+        "latency_ms": {
+            "p50": round(float(np.percentile(latencies_ms, 50)), 3),
+            "p95": round(float(np.percentile(latencies_ms, 95)), 3),
+            "p99": round(float(np.percentile(latencies_ms, 99)), 3),
+            "max": round(float(latencies_ms.max()), 3),
+        },
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--gtfs", help="Répertoire d'un flux GTFS (sinon réseau synthétique)")
+    parser.add_argument("--grid", type=int, default=20, help="Taille de la grille synthétique")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.gtfs:
+        result = run(args.gtfs, args.queries, args.seed)
+    else:
+        with tempfile.TemporaryDirectory() as path:
+            write_synthetic_feed(path, args.grid)
+            result = run(path, args.queries, args.seed)
+    print(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    main()
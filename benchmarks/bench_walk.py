@@ -0,0 +1,84 @@
+"""Benchmark de latence du routeur piéton local (A* sur graphe CSR)
+
+Usage:
+    python benchmarks/bench_walk.py                          # grille synthétique 100x100
+    python benchmarks/bench_walk.py --grid 200 --queries 500
+    python benchmarks/bench_walk.py --graph /chemin/vers/paris_walk.json
+"""
+import os
+import json
+import time
+import random
+import argparse
+import tempfile
+import numpy as np
+from bellai.routing.walk import WalkGraph, WalkRouter
+
+ORIGIN_LAT, ORIGIN_LON = 48.8294, 2.2784
+SPACING_LAT, SPACING_LON = 0.0009, 0.00136  # ~100 m entre carrefours
+
+def write_synthetic_graph(path: str, grid: int, seed: int, closed_ratio: float = 0.05) -> None:
+    """Quadrillage de rues avec quelques tronçons fermés tirés au hasard"""
+    rng = random.Random(seed)
+    nodes = [[f"n{i}_{j}", ORIGIN_LAT + i * SPACING_LAT, ORIGIN_LON + j * SPACING_LON]
+             for i in range(grid) for j in range(grid)]
+    edges = []
+    for i in range(grid):
+        for j in range(grid):
+            if j + 1 < grid and rng.random() > closed_ratio:
+                edges.append([f"n{i}_{j}", f"n{i}_{j + 1}", None, f"Rue {i}"])
+            if i + 1 < grid and rng.random() > closed_ratio:
+                edges.append([f"n{i}_{j}", f"n{i + 1}_{j}", None, f"Avenue {j}"])
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"nodes": nodes, "edges": edges}, f)
+
+def run(graph_path: str, queries: int, seed: int) -> dict:
+    started = time.perf_counter()
+    graph = WalkGraph(graph_path)
+    load_seconds = time.perf_counter() - started
+    router = WalkRouter(graph)
+
+    rng = random.Random(seed)
+    latencies, found = [], 0
+    for _ in range(queries):
+        a, b = rng.sample(range(len(graph.node_ids)), 2)
+        t0 = time.perf_counter()
+        route = router.route((graph.lats[a], graph.lons[a]), (graph.lats[b], graph.lons[b]))
+        latencies.append((time.perf_counter() - t0) * 1000)
+        found += route is not None
+
+    latencies_ms = np.array(latencies)
+    return {
+        "benchmark": "walk_astar",
+        "nodes": len(graph.node_ids),
+        "edges": len(graph.targets),
+        "load_seconds": round(load_seconds, 3),
+        "queries": queries,
+        "found": found,
+        "latency_ms": {
+            "p50": round(float(np.percentile(latencies_ms, 50)), 3),
+            "p95": round(float(np.percentile(latencies_ms, 95)), 3),
+            "p99": round(float(np.percentile(latencies_ms, 99)), 3),
+            "max": round(float(latencies_ms.max()), 3),
+        },
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--graph", help="Graphe piéton JSON (sinon grille synthétique)")
+    parser.add_argument("--grid", type=int, default=100, help="Taille de la grille synthétique")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.graph:
+        result = run(args.graph, args.queries, args.seed)
+    else:
+        with tempfile.TemporaryDirectory() as path:
+            graph_path = os.path.join(path, "walk.json")
+            write_synthetic_graph(graph_path, args.grid, args.seed)
+            result = run(graph_path, args.queries, args.seed)
+    print(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""Générateur de charge : N clients simultanés avec temps de réflexion et mélange d'intentions
+
+Chaque palier lance N sessions de clients (une par chambre) qui enchaînent les messages
+de test rapide de l'interface Streamlit, séparés par un temps de réflexion aléatoire.
+Sortie JSON : courbe débit/latence par palier, point de saturation et croissance
+mémoire (chat_memory, action_manager, RSS) au fil du test.
+
+Usage:
+    # Agent en process, modèle factice (0.8 s par appel) et API Google simulées (150 ms)
+    python benchmarks/load_test.py --guests 10,25,50,100,250 --llm-latency 0.8 --tool-latency 0.15
+
+    # Service HTTP : POST {"message", "session_id"} -> réponse de process_message en JSON
+    python benchmarks/load_test.py --url http://localhost:8000/chat --guests 10,50,100
+"""
+import os
+import sys
+import json
+import math
+import time
+import random
+import asyncio
+import argparse
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import numpy as np
+
+# Clés factices : les clients Google/Azure valident leur format dès l'import
+os.environ.setdefault("GPLACES_API_KEY", "AIza" + "x" * 35)
+os.environ.setdefault("AZURE_OPENAI_API_KEY", "load")
+os.environ.setdefault("AZURE_OPENAI_ENDPOINT", "https://load.openai.azure.com/")
+os.environ.setdefault("AZURE_OPENAI_DEPLOYMENT_NAME", "bellai")
+
+# Messages de test rapide de streamlit_app.py, pondérés par fréquence observée à la réception
+INTENTS: List[Dict[str, Any]] = [
+    {"message": "Présentez-moi votre hôtel", "keyword": "présentez", "weight": 0.30,
+     "script": [("get_hotel_info", {}), "Le BellAI Hotel vous accueille dans le 15e arrondissement..."]},
+    {"message": "J'ai faim, je voudrais manger", "keyword": "faim", "weight": 0.25,
+     "script": [("get_client_preferences", {}),
+                ("detect_booking_intention", {"user_message": "J'ai faim, je voudrais manger", "service_type": "restaurant"}),
+                "Notre restaurant Le Patio propose un menu français ce soir. Je réserve ?"]},
+    {"message": "Pouvez-vous livrer quelque chose dans ma chambre ?", "keyword": "livrer", "weight": 0.15,
+     "script": [("get_services_hours", {}),
+                ("detect_booking_intention", {"user_message": "Pouvez-vous livrer quelque chose dans ma chambre ?",
+                                              "service_type": "room_service"}),
+                "Le room service est disponible 24h/24. Que souhaitez-vous ?"]},
+    {"message": "J'ai besoin d'un taxi pour l'aéroport", "keyword": "taxi", "weight": 0.15,
+     "script": [("detect_concierge_request", {"user_message": "J'ai besoin d'un taxi pour l'aéroport"}),
+                "Je transmets votre demande de taxi à la conciergerie."]},
+    {"message": "Je voudrais un massage relaxant", "keyword": "massage", "weight": 0.10,
+     "script": [("detect_booking_intention", {"user_message": "Je voudrais un massage relaxant", "service_type": "spa"}),
+                "Le spa propose un massage relaxant à 18h. Je réserve ?"]},
+    {"message": "Je ne suis pas satisfait, je veux parler au responsable", "keyword": "satisfait", "weight": 0.05,
+     "script": [("detect_escalation_need", {"user_message": "Je ne suis pas satisfait, je veux parler au responsable"}),
+                "Je préviens immédiatement le responsable de la réception."]},
+]
+
+Target = Callable[[str, str], Awaitable[Dict[str, Any]]]
+
+def _percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "max": None}
+    array = np.array(values)
+    return {
+        "p50": round(float(np.percentile(array, 50)), 1),
+        "p95": round(float(np.percentile(array, 95)), 1),
+        "p99": round(float(np.percentile(array, 99)), 1),
+        "max": round(float(array.max()), 1),
+    }
+
+def _rss_mb() -> Optional[float]:
+    """Mémoire résidente du process (Linux)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return round(int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20, 1)
+    except (OSError, ValueError):
+        return None
+
+def in_process_target(llm_latency: float) -> Target:
+    """BellAIAgent en process avec le modèle factice scripté par intention"""
+    from bellai.core.agent import BellAIAgent
+    from bellai.core.router import ModelRoute
+    from bellai.testing.fake_llm import FakeChatModel
+
+    fake = FakeChatModel(latency=llm_latency, scripts={intent["keyword"]: intent["script"] for intent in INTENTS})
+    agent = BellAIAgent(models={route: fake for route in ModelRoute})
+    return agent.process_message
+
+def http_target(url: str, max_workers: int, timeout: float) -> Target:
+    """Service HTTP exposant process_message (un thread par requête en vol)"""
+    import requests
+    session = requests.Session()
+    session.mount(url, requests.adapters.HTTPAdapter(pool_maxsize=max_workers))
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def post(message: str, session_id: str) -> Dict[str, Any]:
+        response = session.post(url, json={"message": message, "session_id": session_id}, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+
+    async def send(message: str, session_id: str) -> Dict[str, Any]:
+        return await asyncio.get_running_loop().run_in_executor(executor, post, message, session_id)
+    return send
+
+def memory_sample(started: float, guests: int) -> Dict[str, Any]:
+    """État des structures en mémoire de l'agent (mode en process)"""
+    from bellai.core.memory import chat_memory
+    from bellai.core.intention import action_manager
+    with chat_memory._lock:
+        sessions = len(chat_memory.conversations)
+        messages = sum(len(history) for history in chat_memory.conversations.values())
+    with action_manager._lock:
+        pending, completed = len(action_manager.pending_actions), len(action_manager.completed_actions)
+    return {
+        "t": round(time.perf_counter() - started, 1),
+        "guests": guests,
+        "sessions": sessions,
+        "messages": messages,
+        "pending_actions": pending,
+        "completed_actions": completed,
+        "rss_mb": _rss_mb(),
+    }
+
+async def run_step(target: Target, guests: int, duration: float, think_time: float,
+                   rng: random.Random) -> Dict[str, Any]:
+    """Un palier : `guests` clients actifs pendant `duration` secondes"""
+    weights = [intent["weight"] for intent in INTENTS]
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    deadline = time.perf_counter() + duration
+
+    async def guest(room: int) -> None:
+        # Arrivées étalées sur le premier temps de réflexion
+        await asyncio.sleep(rng.uniform(0, think_time))
+        while time.perf_counter() < deadline:
+            intent = rng.choices(INTENTS, weights)[0]
+            started = time.perf_counter()
+            try:
+                result = await target(intent["message"], f"room_{room}")
+                status = result.get("status", "unknown")
+            except Exception:
+                status = "exception"
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+            await asyncio.sleep(rng.expovariate(1 / think_time) if think_time > 0 else 0)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(guest(room) for room in range(1, guests + 1)))
+    elapsed = time.perf_counter() - started
+    turns = len(latencies)
+    errors = statuses.get("error", 0) + statuses.get("exception", 0)
+    return {
+        "guests": guests,
+        "turns": turns,
+        "turns_per_second": round(turns / elapsed, 2),
+        "latency_ms": _percentiles(latencies),
+        "error_rate": round(errors / turns, 4) if turns else None,
+        "statuses": statuses,
+    }
+
+def find_saturation(curve: List[Dict[str, Any]], slo_p95_ms: float, max_error_rate: float) -> Dict[str, Any]:
+    """Plus grand palier dans l'objectif de latence, et coude de la courbe de débit"""
+    within = [point["guests"] for point in curve
+              if point["turns"] and point["latency_ms"]["p95"] <= slo_p95_ms and point["error_rate"] <= max_error_rate]
+    knee = None
+    for previous, current in zip(curve, curve[1:]):
+        # Saturé quand le débit progresse de moins de la moitié de la progression linéaire
+        linear = previous["turns_per_second"] * current["guests"] / previous["guests"]
+        if current["turns_per_second"] < previous["turns_per_second"] + 0.5 * (linear - previous["turns_per_second"]):
+            knee = previous["guests"]
+            break
+    return {
+        "max_guests_within_slo": max(within, default=0),
+        "throughput_knee_guests": knee,
+        "peak_turns_per_second": max((point["turns_per_second"] for point in curve), default=0),
+    }
+
+async def run_load(target: Target, steps: List[int], duration: float, think_time: float, seed: int,
+                   sample_interval: Optional[float]) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    samples: List[Dict[str, Any]] = []
+    current = {"guests": 0}
+
+    async def sampler() -> None:
+        while True:
+            samples.append(memory_sample(started, current["guests"]))
+            await asyncio.sleep(sample_interval)
+
+    sampling = asyncio.ensure_future(sampler()) if sample_interval else None
+    curve = []
+    try:
+        for guests in steps:
+            current["guests"] = guests
+            curve.append(await run_step(target, guests, duration, think_time, rng))
+    finally:
+        if sampling is not None:
+            sampling.cancel()
+            samples.append(memory_sample(started, current["guests"]))
+    return {"curve": curve, "memory": samples}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Endpoint HTTP (sinon agent en process)")
+    parser.add_argument("--guests", default="10,25,50,100,250", help="Paliers de clients simultanés")
+    parser.add_argument("--step-duration", type=float, default=30.0, help="Durée de chaque palier (s)")
+    parser.add_argument("--think-time", type=float, default=5.0, help="Temps de réflexion moyen entre messages (s)")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Latence simulée par appel au modèle (s)")
+    parser.add_argument("--tool-latency", type=float, default=0.1, help="Latence simulée des API Google (s)")
+    parser.add_argument("--slo-p95", type=float, default=5000.0, help="Objectif de latence p95 (ms)")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--rooms", type=int, default=250, help="Chambres à servir (dimensionnement)")
+    parser.add_argument("--sample-interval", type=float, default=2.0, help="Période d'échantillonnage mémoire (s)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Timeout HTTP (s)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Fichier JSON de résultats (sinon sortie standard)")
+    args = parser.parse_args()
+
+    steps = sorted(int(value) for value in args.guests.split(",") if value.strip())
+
+    with contextlib.ExitStack() as stack:
+        if args.url:
+            target = http_target(args.url, max(steps), args.timeout)
+            sample_interval = None
+        else:
+            from bellai.testing.google_stub import GoogleStubServer
+            google = stack.enter_context(GoogleStubServer(latency=args.tool_latency))
+            # Avant l'import de l'agent : les URL sont lues au chargement des modules
+            os.environ["BELLAI_GOOGLE_ROUTES_URL"] = google.url
+            os.environ["BELLAI_GOOGLE_MAPS_URL"] = google.url
+            target = in_process_target(args.llm_latency)
+            sample_interval = args.sample_interval
+            # Traces verbeuses de l'AgentExecutor écartées : seule la sortie JSON reste sur stdout
+            stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, "w"))))
+        load = asyncio.run(run_load(target, steps, args.step_duration, args.think_time, args.seed, sample_interval))
+
+    saturation = find_saturation(load["curve"], args.slo_p95, args.max_error_rate)
+    capacity = saturation["max_guests_within_slo"]
+    result = {
+        "benchmark": "load_test",
+        "target": args.url or "in_process",
+        "python": sys.version.split()[0],
+        "config": {
+            "guests": steps,
+            "step_duration": args.step_duration,
+            "think_time": args.think_time,
+            "llm_latency": None if args.url else args.llm_latency,
+            "tool_latency": None if args.url else args.tool_latency,
+            "slo_p95_ms": args.slo_p95,
+        },
+        "curve": load["curve"],
+        "saturation": saturation,
+        "capacity": {
+            "rooms": args.rooms,
+            "workers_needed": math.ceil(args.rooms / capacity) if capacity else None,
+        },
+        "memory": load["memory"],
+    }
+
+    output = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    print(output)
+
+if __name__ == "__main__":
+    main()
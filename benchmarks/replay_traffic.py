@@ -0,0 +1,195 @@
+"""Rejeu de trafic réel : les messages clients d'exports de conversations repassent dans BellAIAgent
+
+Les tours sont relancés avec leurs écarts d'arrivée d'origine (ou compressés par --speed),
+sur un modèle déterministe : modèle factice qui renvoie la réponse enregistrée, ou
+cassette (bellai.testing.cassette). Le rapport compare latence, itérations et tokens
+aux valeurs enregistrées dans les métadonnées des messages (durée déduite des
+horodatages à défaut). Le modèle factice conclut en une itération : pour comparer
+les itérations et les appels d'outils, rejouer une cassette.
+
+Usage:
+    # Export de ChatMemoryManager.save_to_file ou exports Streamlit d'une conversation
+    python benchmarks/replay_traffic.py conversations.json --speed 10
+    python benchmarks/replay_traffic.py conv_*.json --speed 0 --llm-latency 0.5 --output replay.json
+    python benchmarks/replay_traffic.py conversations.json --cassette cassettes/prod.jsonl.gz
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import contextlib
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import numpy as np
+
+# Clés factices : les clients Google/Azure valident leur format dès l'import
+os.environ.setdefault("GPLACES_API_KEY", "AIza" + "x" * 35)
+os.environ.setdefault("AZURE_OPENAI_API_KEY", "replay")
+os.environ.setdefault("AZURE_OPENAI_ENDPOINT", "https://replay.openai.azure.com/")
+os.environ.setdefault("AZURE_OPENAI_DEPLOYMENT_NAME", "bellai")
+
+def load_turns(paths: List[str]) -> List[Dict[str, Any]]:
+    """Tours (message client, réponse et coût enregistrés) de tous les exports, par ordre d'arrivée"""
+    turns = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        # Export complet {session: [messages]} ou conversation unique exportée depuis Streamlit
+        sessions = data if isinstance(data, dict) else {os.path.splitext(os.path.basename(path))[0]: data}
+        for session_id, messages in sessions.items():
+            for i, message in enumerate(messages):
+                if message.get("role") != "user":
+                    continue
+                reply = next((m for m in messages[i + 1:] if m.get("role") in ("assistant", "user")), None)
+                reply = reply if reply is not None and reply.get("role") == "assistant" else None
+                turns.append({
+                    "session_id": session_id,
+                    "message": message["content"],
+                    "arrival": datetime.fromisoformat(message["timestamp"]).timestamp(),
+                    "response": reply["content"] if reply else None,
+                    "baseline": _baseline(message, reply),
+                })
+    return sorted(turns, key=lambda turn: turn["arrival"])
+
+def _baseline(message: Dict[str, Any], reply: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Coût enregistré du tour : métadonnées de la réponse, sinon écart des horodatages"""
+    if reply is None:
+        return {}
+    metadata = reply.get("metadata") or {}
+    duration = metadata.get("duration_ms")
+    if duration is None:
+        delta = datetime.fromisoformat(reply["timestamp"]) - datetime.fromisoformat(message["timestamp"])
+        duration = delta.total_seconds() * 1000
+    return {
+        "duration_ms": duration,
+        "iterations": metadata.get("iterations"),
+        "tokens": (metadata.get("prompt_tokens", 0) + metadata.get("completion_tokens", 0)) if "prompt_tokens" in metadata else None,
+    }
+
+def build_agent(turns: List[Dict[str, Any]], llm_latency: float, cassette_path: Optional[str]):
+    """Agent sur un modèle déterministe : réponse enregistrée de chaque tour, ou cassette"""
+    from bellai.core.agent import BellAIAgent
+    from bellai.core.router import ModelRoute
+    if cassette_path:
+        from bellai.testing.cassette import Cassette, CassetteChatModel
+        cassette = Cassette(cassette_path, mode="replay", latency="original")
+        cassette.intercept_http().__enter__()
+        model = CassetteChatModel(cassette=cassette)
+    else:
+        from bellai.testing.fake_llm import FakeChatModel
+        model = FakeChatModel(latency=llm_latency, scripts={
+            turn["message"].lower(): [turn["response"]] for turn in turns if turn["response"]
+        })
+    agent = BellAIAgent(models={route: model for route in ModelRoute})
+    return agent
+
+async def replay(agent, turns: List[Dict[str, Any]], speed: float) -> List[Dict[str, Any]]:
+    """Relance chaque session dans l'ordre, aux instants d'arrivée d'origine divisés par `speed`"""
+    from bellai.core.memory import chat_memory
+
+    by_session: Dict[str, List[Dict[str, Any]]] = {}
+    for turn in turns:
+        by_session.setdefault(turn["session_id"], []).append(turn)
+    first_arrival = turns[0]["arrival"]
+    started = time.perf_counter()
+    results: List[Dict[str, Any]] = []
+
+    async def session(session_id: str, session_turns: List[Dict[str, Any]]) -> None:
+        replay_session = f"replay_{session_id}"
+        for turn in session_turns:
+            if speed > 0:
+                # Un tour ne part pas avant la fin du précédent de la même session
+                due = (turn["arrival"] - first_arrival) / speed
+                await asyncio.sleep(max(0.0, due - (time.perf_counter() - started)))
+            lag = time.perf_counter() - started - ((turn["arrival"] - first_arrival) / speed if speed > 0 else 0)
+            turn_started = time.perf_counter()
+            result = await agent.process_message(turn["message"], replay_session)
+            latency = (time.perf_counter() - turn_started) * 1000
+            history = chat_memory.get_conversation_history(replay_session)
+            metadata = history[-1].get("metadata", {}) if history else {}
+            results.append({
+                **turn,
+                "status": result.get("status"),
+                "replay": {
+                    "duration_ms": latency,
+                    "iterations": metadata.get("iterations"),
+                    "tokens": metadata.get("prompt_tokens", 0) + metadata.get("completion_tokens", 0),
+                    "start_lag_ms": max(0.0, lag * 1000),
+                },
+            })
+
+    await asyncio.gather(*(session(session_id, session_turns) for session_id, session_turns in by_session.items()))
+    return results
+
+def _summary(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {"count": 0, "mean": None, "p50": None, "p95": None}
+    array = np.array(values, dtype=float)
+    return {
+        "count": len(values),
+        "mean": round(float(array.mean()), 2),
+        "p50": round(float(np.percentile(array, 50)), 2),
+        "p95": round(float(np.percentile(array, 95)), 2),
+    }
+
+def compare(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Latence, itérations et tokens : enregistré vs rejoué (écart relatif des moyennes)"""
+    report = {}
+    for metric in ("duration_ms", "iterations", "tokens"):
+        pairs = [(r["baseline"].get(metric), r["replay"].get(metric)) for r in results]
+        baseline = _summary([b for b, _ in pairs if b is not None])
+        replayed = _summary([p for _, p in pairs if p is not None])
+        delta = None
+        if baseline["mean"] and replayed["mean"] is not None:
+            delta = round((replayed["mean"] - baseline["mean"]) / baseline["mean"] * 100, 1)
+        report[metric] = {"baseline": baseline, "replay": replayed, "delta_percent": delta}
+    return report
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("logs", nargs="+", help="Exports JSON de conversations")
+    parser.add_argument("--speed", type=float, default=1.0, help="Facteur de compression du temps (0 = sans attente)")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Latence du modèle factice (s)")
+    parser.add_argument("--cassette", help="Cassette à rejouer à la place du modèle factice")
+    parser.add_argument("--output", help="Fichier JSON de résultats (sinon sortie standard)")
+    args = parser.parse_args()
+
+    turns = load_turns(args.logs)
+    if not turns:
+        parser.error("Aucun message client dans les exports fournis")
+
+    agent = build_agent(turns, args.llm_latency, args.cassette)
+    started = time.perf_counter()
+    # Traces verbeuses de l'AgentExecutor écartées : seule la sortie JSON reste sur stdout
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        results = asyncio.run(replay(agent, turns, args.speed))
+    elapsed = time.perf_counter() - started
+
+    statuses: Dict[str, int] = {}
+    for result in results:
+        statuses[result["status"]] = statuses.get(result["status"], 0) + 1
+    report = {
+        "benchmark": "traffic_replay",
+        "python": sys.version.split()[0],
+        "logs": args.logs,
+        "model": "cassette" if args.cassette else "recorded_responses",
+        "speed": args.speed,
+        "sessions": len({turn["session_id"] for turn in turns}),
+        "turns": len(results),
+        "original_span_seconds": round(turns[-1]["arrival"] - turns[0]["arrival"], 1),
+        "replay_seconds": round(elapsed, 1),
+        "statuses": statuses,
+        "start_lag_ms": _summary([r["replay"]["start_lag_ms"] for r in results]),
+        "comparison": compare(results),
+    }
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    print(output)
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,36 @@
 import os
-from typing import Dict, Any, List
+import time
+import asyncio
+from typing import Dict, Any, List, Optional
 from datetime import datetime
-from langchain_openai import AzureChatOpenAI
+from langchain_core.language_models import BaseChatModel
 from langchain.agents import create_tool_calling_agent, AgentExecutor
 from langchain_core.prompts import ChatPromptTemplate
 from dotenv import load_dotenv
 from bellai.core.memory import chat_memory
 from bellai.core.intention import action_manager
+from bellai.core.router import ModelRoute, TokenUsageCallback, model_router
+from bellai.core.prefetch import SpeculativePrefetcher
+from bellai.core.singleflight import single_flight
+from bellai.core.governor import get_governor_metrics
+from bellai.core.breaker import CircuitOpen, get_breaker_metrics
+from bellai.core.scheduler import TurnScheduler
+from bellai.core.deadline import ToolObservationCallback, build_partial_answer
+from bellai.core.turn_stats import TimedMemory, TurnStatsCallback, turn_stats
+from bellai.core.metrics import record_turn, register_agent_metrics, start_metrics_server_from_env
+from bellai.core.tracing import TracingCallback, current_span, tracer
+from bellai.core.profiling import turn_profiler
+from bellai.core.budget import BudgetState, CappedChatModel, budget_answer, token_ledger
+from bellai.core.introspection import memory_introspector
+from bellai.core.sessions import SessionLocks, TurnContext, current_session, current_turn
 from bellai.tools.hotel_service import get_hotel_tools
 from bellai.tools.client_service import get_client_tools
 from bellai.tools.intention_service import get_intention_tools
-from bellai.tools.places_service import search_places
-from bellai.tools.navigation import get_route
+from bellai.tools.places_service import search_places, stale_places
+from bellai.tools.navigation import get_route, get_route_matrix, route_details, stale_routes, RouteDetailsCallback
+from bellai.tools.gazetteer import find_closest_places
+from bellai.tools.route_table import start_scheduler_from_env
+from bellai.routing.transit import get_transit_router
 
 load_dotenv()
 
@@ -20,7 +39,9 @@ def get_system_prompt(
     hotel_tools = get_hotel_tools,
     intention_tools = get_intention_tools,
     search_place = search_places,
-    navigation = get_route
+    navigation = get_route,
+    route_matrix = get_route_matrix,
+    closest_places = find_closest_places
 ) -> str:
     """Prompt système optimisé pour l'assistant hôtelier Bell.AI"""
     return f"""
@@ -35,6 +56,8 @@ Tu disposes d'outils spécialisés pour récupérer les informations clients et
 🗺️ Conciergerie Paris: 
    • {search_place.name}: {search_place.description}
    • {navigation.name}: {navigation.description}
+   • {route_matrix.name}: {route_matrix.description}
+   • {closest_places.name}: {closest_places.description}
 
 ═══ IDENTITÉ PROFESSIONNELLE ═══
 ✓ Nom: "Bell.AI" (TOUJOURS se présenter ainsi)
@@ -95,8 +118,14 @@ Tu disposes d'outils spécialisés pour récupérer les informations clients et
    - "métro/bus/transport" → TRANSIT
    - "taxi/uber/voiture" → DRIVE (vehicle_type="taxi" si taxi/uber)
    - "à pied" → WALK
-   - Distance < 1km → WALK
-   - Défaut → TRANSIT
+   - Mode non précisé → AUTO (l'outil choisit WALK si < 1km, sinon TRANSIT)
+
+📊 OUTIL get_route_matrix:
+ - "lequel est le plus proche ?" après search_places → UN SEUL appel get_route_matrix(origin, [adresses])
+ - Ne jamais enchaîner plusieurs get_route pour comparer des destinations
+
+🏛️ OUTIL find_closest_places:
+ - "gare/métro/monument/musée/parc... le plus proche" → find_closest_places(category)
 
 💬 EXEMPLES:
 
@@ -108,7 +137,7 @@ Client: "Restaurant italien proche ?"
 Client: "Comment aller à la Tour Eiffel ?"
  → get_route(origin="52 Rue d'Oradour-sur-Glane, 75015 Paris", 
              destination="Tour Eiffel, Paris", 
-             travel_mode="TRANSIT")
+             travel_mode="AUTO")
 
 Client: "Aller au Louvre en taxi"
  → get_route(origin="52 Rue d'Oradour-sur-Glane, 75015 Paris", 
@@ -195,19 +224,32 @@ RÈGLE D'OR ABSOLUE:
 """
 
 class BellAIAgent:
-    def __init__(self):
-        self.model = AzureChatOpenAI(
-            api_key=os.getenv("AZURE_OPENAI_API_KEY"),
-            azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
-            api_version=os.getenv("AZURE_OPENAI_API_VERSION", "2024-10-21"),
-            deployment_name=os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"),
-            temperature=0.6,
-            max_tokens=1000
-        )
+    def __init__(self, models: Optional[Dict[ModelRoute, BaseChatModel]] = None):
+        # Un modèle par route : rapide pour les tours simples, principal sinon
+        self.router = model_router
+        self.models = models or {route: self.router.build_model(route) for route in ModelRoute}
+        self.model = self.models[ModelRoute.MAIN]
         
         # Tools avec détection d'intention
-        self.tools = get_hotel_tools() + get_client_tools() + get_intention_tools() + [search_places, get_route]
+        tools = get_hotel_tools() + get_client_tools() + get_intention_tools() + [search_places, get_route, get_route_matrix, find_closest_places]
+
+        # Appels externes identiques et simultanés regroupés (itinéraires, matrices, lieux)
+        self.single_flight = single_flight
+        tools = self.single_flight.wrap_tools(tools)
+
+        # Préchargement spéculatif des outils évidents (préférences, horaires, itinéraire)
+        self.prefetcher = SpeculativePrefetcher(tools)
+        self.tools = self.prefetcher.wrap_tools(tools)
         
+        # Tours sérialisés par session, puis file de priorité devant l'exécution
+        self.sessions = SessionLocks()
+        # "cancel" : un nouveau message annule le tour en cours et les deux sont fusionnés ; "queue" : ils s'enchaînent
+        self.supersede_policy = os.getenv("BELLAI_SUPERSEDE_POLICY", "queue").lower()
+        self.supersede_window = float(os.getenv("BELLAI_SUPERSEDE_WINDOW_S", "15"))
+        # Durée maximale d'un tour côté client (0 = sans limite)
+        self.turn_deadline = float(os.getenv("BELLAI_TURN_DEADLINE_S", "12"))
+        self.scheduler = TurnScheduler()
+
         # Prompt avec instructions d'intention
         self.prompt = ChatPromptTemplate.from_messages([
             ("system", get_system_prompt()),
@@ -216,22 +258,137 @@ class BellAIAgent:
             ("placeholder", "{agent_scratchpad}")
         ])
         
-        self.agent = create_tool_calling_agent(
-            llm=self.model,
-            tools=self.tools,
-            prompt=self.prompt
-        )
+        self.agents = {
+            route: create_tool_calling_agent(
+                llm=model,
+                tools=self.tools,
+                prompt=self.prompt
+            )
+            for route, model in self.models.items()
+        }
+        self.agent = self.agents[ModelRoute.MAIN]
+        # Sessions au budget souple : mêmes agents, longueur des réponses plafonnée
+        self.capped_agents = {
+            route: create_tool_calling_agent(
+                llm=CappedChatModel(inner=model, max_tokens=token_ledger.soft_max_tokens),
+                tools=self.tools,
+                prompt=self.prompt
+            )
+            for route, model in self.models.items()
+        }
+
+        # Flux GTFS chargé au démarrage, pas au premier itinéraire TRANSIT (dans l'échéance du tour)
+        get_transit_router()
+        # Reconstruction périodique de la table d'itinéraires si BELLAI_ROUTE_TABLE_SCHEDULE_HOURS
+        start_scheduler_from_env()
+
+        # /metrics sur un port dédié si BELLAI_METRICS_PORT (jauges liées à l'instance globale, en fin de module)
+        start_metrics_server_from_env()
 
     async def process_message(self, message: str, session_id: str) -> Dict[str, Any]:
         """Traite un message avec détection d'intention et actions backend"""
+        turn = TurnContext(session_id, message)
+        # Échéance de bout en bout (attente comprise), propagée aux appels du modèle et des outils
+        if self.turn_deadline > 0:
+            turn.deadline = turn.started_at + self.turn_deadline
+        previous = self.sessions.register(turn)
+
+        # Un message arrivé pendant le tour précédent le remplace : les deux sont traités ensemble
+        if (
+            previous is not None
+            and self.supersede_policy == "cancel"
+            and time.monotonic() - previous.started_at <= self.supersede_window
+            and previous.supersede(turn)
+        ):
+            self.sessions.counters.inc("superseded")
+
+        # Session et tour propagés aux outils (actions rattachées, annulation visible des threads)
+        session_token, turn_token = current_session.set(session_id), current_turn.set(turn)
+        try:
+            task = asyncio.ensure_future(self._serialized_turn(turn, previous))
+            turn.attach(task)
+            try:
+                return await task
+            except asyncio.CancelledError:
+                if turn.superseded_by is None:
+                    raise
+                # Actions immédiates déjà créées par ce tour (escalade), les autres ont été retirées
+                backend_actions = self._turn_actions(session_id, turn)
+                return {
+                    "response": None,
+                    "session_id": session_id,
+                    "backend_actions": backend_actions,
+                    "intentions_detected": len(backend_actions) > 0,
+                    "superseded_by": turn.superseded_by.turn_id,
+                    "status": "superseded",
+                    "stats": TurnStatsCallback().summary(),
+                }
+        finally:
+            self.sessions.unregister(turn)
+            current_session.reset(session_token)
+            current_turn.reset(turn_token)
+
+    async def _serialized_turn(self, turn: TurnContext, previous: Optional[TurnContext]) -> Dict[str, Any]:
+        """Attend son tour dans la session puis passe par l'ordonnanceur"""
+        # Un seul tour à la fois par session, dans l'ordre d'arrivée
+        async with self.sessions.hold(turn.session_id):
+            message = self.sessions.effective_text(turn, previous)
+            # Les escalades passent devant les demandes courantes quand les workers sont saturés
+            return await self.scheduler.submit(message, turn.session_id, self._process_turn)
+
+    async def _process_turn(self, message: str, session_id: str) -> Dict[str, Any]:
+        """Exécute un tour de conversation (appelé par l'ordonnanceur), sous profileur si demandé"""
+        if not turn_profiler.should_profile(session_id):
+            return await self._execute_turn(message, session_id)
+        turn = current_turn.get()
+        turn_id = turn.turn_id if turn is not None else "turn"
+        return await turn_profiler.profile(self._execute_turn(message, session_id), session_id, turn_id)
+
+    async def _execute_turn(self, message: str, session_id: str) -> Dict[str, Any]:
+        """Exécute un tour de conversation"""
+
+        # Choisir le déploiement selon la complexité du tour
+        route = self.router.route(message)
+        if route not in self.agents:
+            route = ModelRoute.MAIN
+
+        # Budget de tokens : historique et réponses raccourcis, puis réponses sans modèle
+        budget = token_ledger.state(session_id)
+        token_ledger.counters.inc(budget.value)
+        if budget == BudgetState.HARD:
+            return self._budget_exhausted_turn(message, session_id, current_turn.get(), route)
+        if budget == BudgetState.SOFT:
+            chat_memory.set_window(session_id, token_ledger.soft_history)
+        usage = TokenUsageCallback()
+        routes_seen = RouteDetailsCallback()
+        observations = ToolObservationCallback()
+        stats = TurnStatsCallback()
+        started = time.perf_counter()
+        # Attente avant exécution (verrou de session et file de priorité)
+        turn = current_turn.get()
+        wait_ms = (time.monotonic() - turn.started_at) * 1000 if turn is not None else 0.0
+
+        # Span du tour, parent des itérations, outils et requêtes HTTP (préchargement compris)
+        turn_span = tracer.start_trace("agent.turn", {
+            "bellai.session_id": session_id,
+            "bellai.turn_id": turn.turn_id if turn is not None else None,
+            "bellai.model_route": route.value,
+            "bellai.wait_ms": round(wait_ms, 2),
+        })
+        span_token = current_span.set(turn_span)
+        tracing = TracingCallback(turn_span)
+
+        # Démarrer les outils probables en parallèle du raisonnement du modèle
+        prefetch_batch = self.prefetcher.start(message)
 
         try:
-            # Récupérer la mémoire de la session
-            memory = chat_memory.get_langchain_memory(session_id)
+            # Récupérer la mémoire de la session (lectures et écritures chronométrées)
+            with stats.memory():
+                memory = TimedMemory(inner=chat_memory.get_langchain_memory(session_id), stats=stats)
 
             # Créer l'executor avec mémoire
             agent_executor = AgentExecutor(
-                agent=self.agent,
+                agent=self.capped_agents[route] if budget == BudgetState.SOFT else self.agents[route],
                 tools=self.tools,
                 memory=memory,
                 verbose=True,
@@ -239,17 +396,57 @@ class BellAIAgent:
             )
 
             # Ajouter le message utilisateur à l'historique
-            chat_memory.add_message(session_id, "user", message)
-
-            # Exécuter l'agent avec détection d'intention
-            result = await agent_executor.ainvoke({"input": message})
-            response = result["output"]
+            with stats.memory():
+                chat_memory.add_message(session_id, "user", message)
+
+            # Exécuter l'agent avec détection d'intention, dans le temps restant du tour
+            remaining = turn.remaining() if turn is not None else None
+            status = "success"
+            try:
+                result = await asyncio.wait_for(
+                    agent_executor.ainvoke({"input": message}, config={"callbacks": [usage, routes_seen, observations, stats, tracing]}),
+                    timeout=None if remaining is None else max(0.0, remaining),
+                )
+                response = result["output"]
+            except asyncio.TimeoutError:
+                # Échéance atteinte : réponse partielle à partir des outils déjà exécutés et des actions détectées
+                status = "partial"
+                self.sessions.counters.inc("deadline_exceeded")
+                response = build_partial_answer(observations.observations, self._turn_actions(session_id, turn))
+            except CircuitOpen:
+                # Azure OpenAI coupé : échec immédiat, même réponse de repli que sur échéance
+                status = "degraded"
+                response = build_partial_answer(observations.observations, self._turn_actions(session_id, turn))
+            self.router.record(route, time.perf_counter() - started, usage)
             
             # Récupérer les actions backend générées
-            backend_actions = action_manager.get_actions_for_frontend()
+            backend_actions = action_manager.get_actions_for_frontend(session_id)
             
-            # Ajouter la réponse à l'historique
-            chat_memory.add_message(session_id, "assistant", response)
+            # Ajouter la réponse à l'historique, avec le coût du tour (référence pour le rejeu de trafic)
+            with stats.memory():
+                chat_memory.add_message(session_id, "assistant", response, {
+                    "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+                    "iterations": usage.llm_calls,
+                    "prompt_tokens": usage.prompt_tokens,
+                    "completion_tokens": usage.completion_tokens,
+                    "tools": [name for name, _ in observations.observations],
+                    "model_route": route.value,
+                    "status": status,
+                })
+            if turn is not None:
+                turn.completed = True
+            summary = stats.summary(wait_ms)
+            turn_stats.record(summary)
+            record_turn(summary, status, route.value)
+            token_ledger.record(session_id, summary)
+            turn_span.set_attributes({
+                "bellai.status": status,
+                "bellai.iterations": summary["iterations"],
+                "gen_ai.usage.input_tokens": summary["prompt_tokens"],
+                "gen_ai.usage.output_tokens": summary["completion_tokens"],
+            })
+            if status != "success":
+                turn_span.set_error(status)
             
             return {
                 "response": response,
@@ -257,26 +454,90 @@ class BellAIAgent:
                 "message_count": len(chat_memory.get_conversation_history(session_id)),
                 "backend_actions": backend_actions,  # Actions pour le frontend
                 "intentions_detected": len(backend_actions) > 0,
-                "status": "success",
+                "route_details": route_details.get_for_frontend(routes_seen.route_ids),  # Étapes complètes des itinéraires
+                "model_route": route.value,
+                "status": status,
+                "stats": summary,  # Décomposition temps / tokens du tour
+                "budget": budget.value,
             }
             
+        except asyncio.CancelledError:
+            # Tour remplacé : retirer ses actions à confirmer et son message, repris dans le tour fusionné
+            turn = current_turn.get()
+            if turn is not None:
+                rolled_back = action_manager.rollback_turn(turn.turn_id)
+                self.sessions.counters.inc("rolled_back_actions", len(rolled_back))
+            chat_memory.discard_last_message(session_id, "user", message)
+            turn_span.set_attribute("bellai.status", "superseded")
+            raise
+
         except Exception as e:
+            self.router.record(route, time.perf_counter() - started, usage, error=True)
             error_msg = f"Désolé, je rencontre un problème technique. Contactez la réception au +33 1 23 45 67 89"
 
             chat_memory.add_message(session_id, "assistant", error_msg, {"error": str(e)})
-
+            summary = stats.summary(wait_ms)
+            turn_stats.record(summary)
+            record_turn(summary, "error", route.value)
+            token_ledger.record(session_id, summary)
+            turn_span.set_attribute("bellai.status", "error")
+            turn_span.set_error(type(e).__name__)
+
+            backend_actions = self._turn_actions(session_id, turn)
             return {
                 "response": error_msg,
                 "session_id": session_id,
-                "backend_actions": [],
-                "intentions_detected": False,
+                "backend_actions": backend_actions,
+                "intentions_detected": len(backend_actions) > 0,
                 "status": "error",
-                "error": str(e)
+                "error": str(e),
+                "stats": summary,
             }
 
+        finally:
+            self.prefetcher.finish(prefetch_batch)
+            tracing.finish()
+            turn_span.end()
+            current_span.reset(span_token)
+
+    @staticmethod
+    def _turn_actions(session_id: str, turn: Optional[TurnContext]) -> List[Dict[str, Any]]:
+        """Actions en attente créées par ce tour (pas celles des tours précédents de la session)"""
+        return action_manager.get_actions_for_frontend(session_id, turn.turn_id if turn is not None else None)
+
+    def _budget_exhausted_turn(self, message: str, session_id: str, turn: Optional[TurnContext], route: ModelRoute) -> Dict[str, Any]:
+        """Tour d'une session au-delà du budget strict : réponse déterministe, sans appel au modèle"""
+        stats = TurnStatsCallback()
+        wait_ms = (time.monotonic() - turn.started_at) * 1000 if turn is not None else 0.0
+        response = budget_answer(message)
+        with stats.memory():
+            chat_memory.add_message(session_id, "user", message)
+            chat_memory.add_message(session_id, "assistant", response, {"status": "budget_exhausted"})
+        # L'ordonnanceur a pu créer l'escalade de ce tour avant l'exécution
+        backend_actions = self._turn_actions(session_id, turn)
+        # Refus comptés comme les autres tours (agrégats et bellai_turns_total{status="budget_exhausted"})
+        summary = stats.summary(wait_ms)
+        turn_stats.record(summary)
+        record_turn(summary, "budget_exhausted", route.value)
+        return {
+            "response": response,
+            "session_id": session_id,
+            "message_count": len(chat_memory.get_conversation_history(session_id)),
+            "backend_actions": backend_actions,
+            "intentions_detected": len(backend_actions) > 0,
+            "route_details": [],
+            "status": "budget_exhausted",
+            "stats": summary,
+            "budget": BudgetState.HARD.value,
+        }
+
     async def confirm_backend_action(self, action_id: str, session_id: str) -> Dict[str, Any]:
         """Confirme et exécute une action backend"""
-        
+        # La confirmation écrit dans la mémoire de session : même sérialisation que les tours
+        async with self.sessions.hold(session_id):
+            return await self._confirm_backend_action(action_id, session_id)
+
+    async def _confirm_backend_action(self, action_id: str, session_id: str) -> Dict[str, Any]:
         try:
             # Récupérer la mémoire
             memory = chat_memory.get_langchain_memory(session_id)
@@ -327,9 +588,77 @@ class BellAIAgent:
                 "error": str(e)
             }
 
-    def get_pending_actions(self) -> List[Dict[str, Any]]:
-        """Récupère les actions en attente pour le frontend"""
-        return action_manager.get_actions_for_frontend()
+    def get_router_metrics(self) -> Dict[str, Any]:
+        """Métriques de latence et de tokens par route de modèle"""
+        return self.router.get_metrics()
+
+    def get_prefetch_metrics(self) -> Dict[str, Any]:
+        """Taux de succès et travail gaspillé du préchargement spéculatif"""
+        return self.prefetcher.get_metrics()
+
+    def get_session_metrics(self) -> Dict[str, Any]:
+        """Sessions actives et attente des tours d'une même session"""
+        return self.sessions.get_metrics()
+
+    def get_scheduler_metrics(self) -> Dict[str, Any]:
+        """Attente et latence des tours par priorité"""
+        return self.scheduler.get_metrics()
+
+    def get_governor_metrics(self) -> Dict[str, Any]:
+        """File d'attente, temps d'attente et concurrence par déploiement Azure"""
+        return get_governor_metrics()
+
+    def get_breaker_metrics(self) -> Dict[str, Any]:
+        """État des disjoncteurs par dépendance et résultats servis depuis le cache de secours"""
+        return {
+            "breakers": get_breaker_metrics(),
+            "stale": {
+                "google_routes": stale_routes.counters.snapshot(),
+                "google_places": stale_places.counters.snapshot(),
+            },
+        }
+
+    def get_turn_stats_metrics(self) -> Dict[str, Any]:
+        """Histogrammes des tours : durée, attente, appels au modèle, outils, mémoire, itérations"""
+        return turn_stats.get_metrics()
+
+    def get_token_ledger(self, session_id: Optional[str] = None, guest_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Tokens consommés : une session, un client, ou rapport de coût complet"""
+        if session_id is not None:
+            return token_ledger.get_session(session_id)
+        if guest_id is not None:
+            return token_ledger.get_guest(guest_id)
+        return token_ledger.report()
+
+    def get_memory_report(self, top: int = 10) -> Dict[str, Any]:
+        """Mémoire approximative par sous-système et sessions les plus lourdes"""
+        return memory_introspector.report(top)
+
+    def get_allocation_diff(self, top: int = 20) -> Dict[str, Any]:
+        """Allocations depuis le dernier appel (démarre le suivi tracemalloc au premier appel)"""
+        if not memory_introspector.tracking:
+            memory_introspector.start_allocation_tracking()
+        return memory_introspector.allocation_diff(top)
+
+    def profile_session(self, session_id: str, enabled: bool = True) -> None:
+        """Profile (ou plus) les prochains tours d'une session, sans redémarrage"""
+        turn_profiler.profile_session(session_id, enabled)
+
+    def get_profiling_metrics(self) -> Dict[str, Any]:
+        """Tours profilés, ignorés (profileur occupé), sessions marquées"""
+        return turn_profiler.get_metrics()
+
+    def get_tracing_metrics(self) -> Dict[str, Any]:
+        """Tours tracés : gardés, écartés par échantillonnage, perdus (file pleine), exportés"""
+        return tracer.get_metrics()
+
+    def get_single_flight_metrics(self) -> Dict[str, Any]:
+        """Appels externes regroupés et attentes par clé"""
+        return self.single_flight.get_metrics()
+
+    def get_pending_actions(self, session_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Récupère les actions en attente pour le frontend (d'une session si précisée)"""
+        return action_manager.get_actions_for_frontend(session_id)
 
     def cancel_action(self, action_id: str) -> bool:
         """Annule une action en attente"""
@@ -406,3 +735,5 @@ class BellAIAgent:
 
 # Instance globale
 bellai_agent = BellAIAgent()
+# Jauges Prometheus enregistrées une seule fois : un agent créé ensuite (tests, benchmarks) ne les rebranche pas
+register_agent_metrics(bellai_agent)
@@ -0,0 +1,210 @@
+"""Disjoncteurs par dépendance externe (Google Routes, Google Places, Azure OpenAI) et cache de secours"""
+import os
+import time
+import threading
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from enum import Enum
+from typing import Dict, Any, Optional, Tuple, Type
+from dotenv import load_dotenv
+from bellai.core.stats import CounterSet
+
+load_dotenv()
+
+class BreakerState(Enum):
+    """États d'un disjoncteur"""
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+class CircuitOpen(Exception):
+    """Dépendance coupée : l'appel est refusé sans attendre de timeout"""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"Service {name} indisponible (nouvel essai dans {retry_in:.0f}s)")
+        self.name = name
+        self.retry_in = retry_in
+
+class CircuitBreaker:
+    """Ouvre le circuit sur taux d'erreurs ou de lenteurs, puis sonde en demi-ouverture"""
+
+    def __init__(self, name: str, slow_call_seconds: float):
+        self.name = name
+        self.window_seconds = float(os.getenv("BELLAI_BREAKER_WINDOW_S", "60"))
+        self.min_calls = int(os.getenv("BELLAI_BREAKER_MIN_CALLS", "10"))
+        self.failure_rate = float(os.getenv("BELLAI_BREAKER_FAILURE_RATE", "0.5"))
+        self.slow_rate = float(os.getenv("BELLAI_BREAKER_SLOW_RATE", "0.8"))
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = float(os.getenv("BELLAI_BREAKER_OPEN_S", "30"))
+        self.half_open_probes = int(os.getenv("BELLAI_BREAKER_HALF_OPEN_PROBES", "2"))
+
+        self.state = BreakerState.CLOSED
+        self.opened_at = 0.0
+        self._outcomes: deque = deque()  # (horodatage, échec, lent)
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self._lock = threading.Lock()
+        self.counters = CounterSet()
+
+    def _expire(self, now: float) -> None:
+        while self._outcomes and now - self._outcomes[0][0] > self.window_seconds:
+            self._outcomes.popleft()
+
+    def _open(self, now: float) -> None:
+        self.state = BreakerState.OPEN
+        self.opened_at = now
+        self._outcomes.clear()
+        self.counters.inc("opened")
+
+    def allow(self) -> None:
+        """Autorise l'appel ou lève CircuitOpen"""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == BreakerState.OPEN:
+                if now - self.opened_at < self.open_seconds:
+                    self.counters.inc("rejected")
+                    raise CircuitOpen(self.name, self.open_seconds - (now - self.opened_at))
+                # Délai écoulé : quelques appels sondent la dépendance
+                self.state = BreakerState.HALF_OPEN
+                self._probes_in_flight = 0
+                self._probe_successes = 0
+            if self.state == BreakerState.HALF_OPEN:
+                if self._probes_in_flight >= self.half_open_probes:
+                    self.counters.inc("rejected")
+                    raise CircuitOpen(self.name, 1)
+                self._probes_in_flight += 1
+
+    def record(self, failed: bool, duration: float) -> None:
+        """Enregistre l'issue d'un appel autorisé"""
+        slow = duration >= self.slow_call_seconds
+        with self._lock:
+            now = time.monotonic()
+            self.counters.inc("failures" if failed else "successes")
+            if slow:
+                self.counters.inc("slow_calls")
+
+            if self.state == BreakerState.HALF_OPEN:
+                self._probes_in_flight -= 1
+                if failed or slow:
+                    self._open(now)
+                else:
+                    self._probe_successes += 1
+                    if self._probe_successes >= self.half_open_probes:
+                        self.state = BreakerState.CLOSED
+                        self.counters.inc("closed")
+                return
+            if self.state == BreakerState.OPEN:
+                return
+
+            self._outcomes.append((now, failed, slow))
+            self._expire(now)
+            calls = len(self._outcomes)
+            if calls < self.min_calls:
+                return
+            failures = sum(1 for _, f, _ in self._outcomes if f)
+            slows = sum(1 for _, _, s in self._outcomes if s)
+            if failures / calls >= self.failure_rate or slows / calls >= self.slow_rate:
+                self._open(now)
+
+    def abandon(self) -> None:
+        """Appel autorisé puis annulé sans issue (ex: tour remplacé)"""
+        with self._lock:
+            if self.state == BreakerState.HALF_OPEN and self._probes_in_flight > 0:
+                self._probes_in_flight -= 1
+
+    @contextmanager
+    def guard(self, failures: Tuple[Type[BaseException], ...] = (Exception,)):
+        """Protège un appel : refus immédiat si ouvert, issue et durée enregistrées sinon"""
+        self.allow()
+        started = time.perf_counter()
+        try:
+            yield
+        except failures:
+            self.record(True, time.perf_counter() - started)
+            raise
+        except BaseException as e:
+            if not isinstance(e, Exception):
+                # Annulation : aucune information sur la dépendance
+                self.abandon()
+                raise
+            # Erreur fonctionnelle (ex: aucun itinéraire) : la dépendance a répondu
+            self.record(False, time.perf_counter() - started)
+            raise
+        self.record(False, time.perf_counter() - started)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """État, taux d'erreurs et de lenteurs sur la fenêtre, compteurs"""
+        with self._lock:
+            self._expire(time.monotonic())
+            calls = len(self._outcomes)
+            failures = sum(1 for _, f, _ in self._outcomes if f)
+            slows = sum(1 for _, _, s in self._outcomes if s)
+            state = self.state.value
+        return {
+            "state": state,
+            "window_calls": calls,
+            "failure_rate": round(failures / calls, 3) if calls else None,
+            "slow_rate": round(slows / calls, 3) if calls else None,
+            **{name: self.counters.get(name) for name in ("successes", "failures", "slow_calls", "rejected", "opened", "closed")},
+        }
+
+class StaleCache:
+    """Derniers résultats valides par clé, servis quand la dépendance est coupée"""
+
+    def __init__(self, max_entries: int = 1000, max_age_seconds: float = None):
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds or float(os.getenv("BELLAI_STALE_MAX_AGE_S", "86400"))
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = CounterSet()
+
+    def store(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        """Valeur et âge en secondes, si encore exploitable"""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or time.time() - entry[0] > self.max_age_seconds:
+            self.counters.inc("misses")
+            return None
+        self.counters.inc("served")
+        return entry[1], time.time() - entry[0]
+
+def stale_notice(age_seconds: float) -> str:
+    """Mention ajoutée aux résultats servis depuis le cache de secours"""
+    minutes = int(age_seconds // 60)
+    age = f"il y a {minutes} min" if minutes else "il y a moins d'une minute"
+    return f"⚠️ RÉSULTAT EN CACHE ({age}, service momentanément indisponible) — à présenter comme indicatif"
+
+def unavailable_message(e: CircuitOpen) -> str:
+    """Observation d'échec rapide quand aucun résultat de secours n'existe"""
+    return (f"❌ Service indisponible: {e}. Ne pas réessayer pendant ce tour ; "
+            "indiquer au client que l'information est momentanément indisponible.")
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+# Seuil de lenteur par dépendance (s)
+SLOW_CALL_SECONDS = {
+    "google_routes": float(os.getenv("BELLAI_BREAKER_ROUTES_SLOW_S", "5")),
+    "google_places": float(os.getenv("BELLAI_BREAKER_PLACES_SLOW_S", "5")),
+    "azure_openai": float(os.getenv("BELLAI_BREAKER_AZURE_SLOW_S", "20")),
+}
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Disjoncteur d'une dépendance (créé au premier appel)"""
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name, SLOW_CALL_SECONDS.get(name, 10.0))
+        return _breakers[name]
+
+def get_breaker_metrics() -> Dict[str, Any]:
+    """État de tous les disjoncteurs"""
+    with _breakers_lock:
+        breakers = dict(_breakers)
+    return {name: breaker.get_metrics() for name, breaker in breakers.items()}
@@ -0,0 +1,197 @@
+"""Comptabilité des tokens par session et par client, et budgets de tokens
+
+Chaque tour ajoute ses tokens (prompt, complétion, cache) aux totaux de sa session et du
+client. Au-delà du budget souple, l'historique envoyé au modèle est raccourci et la
+longueur des réponses plafonnée ; au-delà du budget strict, les réponses sont
+déterministes, sans appel au modèle.
+"""
+import os
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, List, Optional
+from pydantic import ConfigDict
+from dotenv import load_dotenv
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatResult
+from bellai.core.router import detect_turn_intent
+from bellai.core.stats import CounterSet
+
+load_dotenv()
+
+class BudgetState(Enum):
+    """Niveau de budget atteint par une session"""
+    OK = "ok"
+    SOFT = "soft"
+    HARD = "hard"
+
+# Identifiant de session généré par ChatMemoryManager.get_session_id : "<client>_<AAAAMMJJ>_<HHMMSS>"
+_SESSION_SUFFIX = re.compile(r"_\d{8}_\d{6}$")
+
+# Réponses sans modèle une fois le budget strict atteint, par intention du message
+BUDGET_ANSWERS = {
+    "greeting": "Avec plaisir ! Toute l'équipe de l'hôtel BellAI reste à votre disposition.",
+    "confirmation": "C'est noté. Pour finaliser, la réception est à votre disposition au +33 1 23 45 67 89.",
+    "booking": "Pour cette réservation, la réception s'en occupe directement au +33 1 23 45 67 89.",
+    "escalation": "Je suis désolé. Contactez la réception au +33 1 23 45 67 89 : un responsable vous répondra.",
+}
+DEFAULT_BUDGET_ANSWER = "Pour la suite de votre demande, la réception est à votre disposition au +33 1 23 45 67 89."
+
+def budget_answer(message: str) -> str:
+    """Réponse déterministe au-delà du budget strict"""
+    return BUDGET_ANSWERS.get(detect_turn_intent(message), DEFAULT_BUDGET_ANSWER)
+
+def _empty_totals() -> Dict[str, Any]:
+    return {"turns": 0, "prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0, "total_tokens": 0}
+
+class TokenLedger:
+    """Totaux de tokens par session et par client, avec état de budget"""
+
+    def __init__(self):
+        # Budgets en tokens (prompt + complétion) par session, et par client toutes sessions confondues (0 = sans limite)
+        self.session_soft = int(os.getenv("BELLAI_SESSION_SOFT_TOKENS", "200000"))
+        self.session_hard = int(os.getenv("BELLAI_SESSION_HARD_TOKENS", "500000"))
+        self.guest_soft = int(os.getenv("BELLAI_GUEST_SOFT_TOKENS", "0"))
+        self.guest_hard = int(os.getenv("BELLAI_GUEST_HARD_TOKENS", "0"))
+        # Au budget souple : échanges gardés dans l'historique, longueur maximale des réponses
+        self.soft_history = int(os.getenv("BELLAI_BUDGET_HISTORY", "3"))
+        self.soft_max_tokens = int(os.getenv("BELLAI_BUDGET_MAX_TOKENS", "300"))
+        # Prix pour 1000 tokens, pour le rapport de coût (0 = non renseigné)
+        self.prompt_price = float(os.getenv("BELLAI_PROMPT_PRICE_PER_1K", "0"))
+        self.completion_price = float(os.getenv("BELLAI_COMPLETION_PRICE_PER_1K", "0"))
+        self.max_sessions = int(os.getenv("BELLAI_LEDGER_MAX_SESSIONS", "10000"))
+        self.sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.guests: Dict[str, Dict[str, Any]] = {}
+        self.guest_overrides: Dict[str, str] = {}
+        self.counters = CounterSet()
+        self._lock = threading.Lock()
+
+    def guest_of(self, session_id: str) -> str:
+        """Client d'une session : rattachement explicite, sinon préfixe de l'identifiant de session"""
+        return self.guest_overrides.get(session_id) or _SESSION_SUFFIX.sub("", session_id)
+
+    def set_guest(self, session_id: str, guest_id: str) -> None:
+        """Rattache une session à un client (ex: numéro de chambre)"""
+        with self._lock:
+            self.guest_overrides[session_id] = guest_id
+            entry = self.sessions.get(session_id)
+            if entry is not None and entry["guest_id"] != guest_id:
+                # Les tokens déjà consommés suivent la session vers son client
+                self._add(self.guests.setdefault(guest_id, _empty_totals()), entry)
+                self._add(self.guests[entry["guest_id"]], entry, sign=-1)
+                entry["guest_id"] = guest_id
+
+    @staticmethod
+    def _add(totals: Dict[str, Any], turn: Dict[str, Any], sign: int = 1) -> None:
+        for key in ("turns", "prompt_tokens", "completion_tokens", "cached_tokens", "total_tokens"):
+            totals[key] += sign * turn[key]
+
+    def record(self, session_id: str, summary: Dict[str, Any]) -> Dict[str, Any]:
+        """Ajoute les tokens d'un tour (TurnStatsCallback.summary) ; retourne les totaux de la session"""
+        turn = {
+            "turns": 1,
+            "prompt_tokens": summary["prompt_tokens"],
+            "completion_tokens": summary["completion_tokens"],
+            "cached_tokens": summary["cached_tokens"],
+            "total_tokens": summary["prompt_tokens"] + summary["completion_tokens"],
+        }
+        now = datetime.now().isoformat()
+        with self._lock:
+            entry = self.sessions.get(session_id)
+            if entry is None:
+                entry = self.sessions[session_id] = {**_empty_totals(), "guest_id": self.guest_of(session_id), "first_seen": now}
+                if len(self.sessions) > self.max_sessions:
+                    # Session la moins récente retirée ; ses tokens restent dans les totaux du client
+                    evicted, _ = self.sessions.popitem(last=False)
+                    self.guest_overrides.pop(evicted, None)
+            self.sessions.move_to_end(session_id)
+            self._add(entry, turn)
+            entry["last_seen"] = now
+            self._add(self.guests.setdefault(entry["guest_id"], _empty_totals()), turn)
+            return dict(entry)
+
+    def state(self, session_id: str) -> BudgetState:
+        """Budget atteint par la session ou par son client"""
+        with self._lock:
+            entry = self.sessions.get(session_id)
+            session_tokens = entry["total_tokens"] if entry else 0
+            guest = self.guests.get(entry["guest_id"] if entry else self.guest_of(session_id))
+            guest_tokens = guest["total_tokens"] if guest else 0
+        if (self.session_hard and session_tokens >= self.session_hard) or (self.guest_hard and guest_tokens >= self.guest_hard):
+            return BudgetState.HARD
+        if (self.session_soft and session_tokens >= self.session_soft) or (self.guest_soft and guest_tokens >= self.guest_soft):
+            return BudgetState.SOFT
+        return BudgetState.OK
+
+    def _cost(self, totals: Dict[str, Any]) -> Optional[float]:
+        if not (self.prompt_price or self.completion_price):
+            return None
+        return round(totals["prompt_tokens"] / 1000 * self.prompt_price
+                     + totals["completion_tokens"] / 1000 * self.completion_price, 4)
+
+    def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self.sessions.get(session_id)
+            entry = dict(entry) if entry else None
+        if entry is None:
+            return None
+        return {**entry, "budget": self.state(session_id).value, "cost": self._cost(entry)}
+
+    def get_guest(self, guest_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            totals = dict(self.guests[guest_id]) if guest_id in self.guests else None
+            sessions = [session_id for session_id, entry in self.sessions.items() if entry["guest_id"] == guest_id]
+        if totals is None:
+            return None
+        return {**totals, "sessions": sessions, "cost": self._cost(totals)}
+
+    def report(self, top: int = 20) -> Dict[str, Any]:
+        """Rapport de coût : totaux, sessions et clients les plus consommateurs"""
+        with self._lock:
+            sessions = {session_id: dict(entry) for session_id, entry in self.sessions.items()}
+            guests = {guest_id: dict(totals) for guest_id, totals in self.guests.items()}
+        totals = _empty_totals()
+        for guest in guests.values():
+            self._add(totals, guest)
+        by_tokens = lambda item: item[1]["total_tokens"]
+        return {
+            "totals": {**totals, "cost": self._cost(totals)},
+            "budgets": {
+                "session_soft": self.session_soft, "session_hard": self.session_hard,
+                "guest_soft": self.guest_soft, "guest_hard": self.guest_hard,
+            },
+            "turns_by_budget": {state.value: self.counters.get(state.value) for state in BudgetState},
+            "top_sessions": [{"session_id": session_id, **entry, "cost": self._cost(entry)}
+                             for session_id, entry in sorted(sessions.items(), key=by_tokens, reverse=True)[:top]],
+            "top_guests": [{"guest_id": guest_id, **entry, "cost": self._cost(entry)}
+                           for guest_id, entry in sorted(guests.items(), key=by_tokens, reverse=True)[:top]],
+        }
+
+# Instance globale
+token_ledger = TokenLedger()
+
+class CappedChatModel(BaseChatModel):
+    """Modèle de chat dont la longueur des réponses est plafonnée (sessions au budget souple)"""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    inner: BaseChatModel
+    max_tokens: int
+
+    @property
+    def _llm_type(self) -> str:
+        return f"capped-{self.inner._llm_type}"
+
+    def bind_tools(self, tools, **kwargs):
+        # Conversion des outils déléguée au modèle interne, appel gardé sur ce modèle
+        binding = self.inner.bind_tools(tools, **kwargs)
+        return self.bind(**binding.kwargs)
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        return self.inner._generate(messages, stop=stop, **{**kwargs, "max_tokens": self.max_tokens})
+
+    async def _agenerate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        return await self.inner._agenerate(messages, stop=stop, **{**kwargs, "max_tokens": self.max_tokens})
@@ -0,0 +1,42 @@
+"""Échéance des tours : observations collectées et réponse partielle déterministe"""
+import re
+from typing import Dict, Any, List, Tuple
+from uuid import UUID
+from langchain_core.callbacks import BaseCallbackHandler
+
+# Outils dont le résultat peut être présenté tel quel au client
+PRESENTABLE_TOOLS = ("get_route", "get_route_matrix", "search_places", "find_closest_places")
+
+FALLBACK_MESSAGE = "Je n'ai pas pu finaliser votre demande à temps. Contactez la réception au +33 1 23 45 67 89 si besoin."
+
+_ROUTE_ID_LINE = re.compile(r"\n?ROUTE_ID: \S+")
+
+class ToolObservationCallback(BaseCallbackHandler):
+    """Relève les résultats d'outils du tour, pour répondre même si le modèle n'a pas conclu"""
+
+    def __init__(self):
+        self.observations: List[Tuple[str, str]] = []
+        self._names: Dict[UUID, str] = {}
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID, **kwargs) -> None:
+        self._names[run_id] = (serialized or {}).get("name") or kwargs.get("name", "")
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs) -> None:
+        content = getattr(output, "content", output)
+        self.observations.append((self._names.pop(run_id, ""), str(content)))
+
+def build_partial_answer(observations: List[Tuple[str, str]], actions: List[Dict[str, Any]]) -> str:
+    """Meilleure réponse possible à partir des outils déjà exécutés et des actions détectées"""
+    results = [
+        _ROUTE_ID_LINE.sub("", output).strip()
+        for name, output in observations
+        if name in PRESENTABLE_TOOLS and output and not output.startswith("❌")
+    ]
+    lines = ["Voici ce que j'ai pu trouver :", *results] if results else [FALLBACK_MESSAGE]
+
+    action_types = {action["action_type"] for action in actions}
+    if any(action_type.startswith("create_booking") for action_type in action_types):
+        lines.append("Voulez-vous que j'ouvre l'interface de réservation ?")
+    if "escalate_to_human" in action_types:
+        lines.append("Un membre de notre équipe va prendre contact avec vous.")
+    return "\n".join(lines)
@@ -0,0 +1,264 @@
+"""Régulation des appels Azure OpenAI : quotas RPM/TPM, file d'attente bornée et concurrence AIMD"""
+import os
+import time
+import random
+import asyncio
+import itertools
+import threading
+from collections import deque
+from typing import Dict, Any, List, Optional
+from dotenv import load_dotenv
+from pydantic import ConfigDict
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatResult
+from bellai.core.sessions import remaining_time
+from bellai.core.breaker import CircuitBreaker, get_breaker
+from bellai.core.stats import LatencyHistogram, CounterSet
+
+load_dotenv()
+
+WINDOW_SECONDS = 60.0
+
+class GovernorRejected(Exception):
+    """Tour refusé : file d'attente pleine ou attente trop longue"""
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Délai demandé par Azure (en-têtes retry-after-ms / retry-after), si présent"""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+    return None
+
+def is_throttled(error: Exception) -> bool:
+    """Erreur 429 renvoyée par Azure OpenAI"""
+    return getattr(error, "status_code", None) == 429 or type(error).__name__ == "RateLimitError"
+
+def estimate_tokens(messages: List[BaseMessage], max_tokens: int = 0) -> int:
+    """Estimation grossière (4 caractères par token) des tokens d'une requête"""
+    chars = sum(len(str(message.content)) for message in messages)
+    return chars // 4 + max_tokens
+
+class RateGovernor:
+    """Quotas glissants par minute, file d'attente FIFO bornée et concurrence adaptative"""
+
+    def __init__(self, name: str = "default"):
+        self.name = name
+        self.rpm = int(os.getenv("BELLAI_AZURE_RPM", "300"))
+        self.tpm = int(os.getenv("BELLAI_AZURE_TPM", "100000"))
+        self.max_queue = int(os.getenv("BELLAI_GOVERNOR_MAX_QUEUE", "50"))
+        self.max_wait = float(os.getenv("BELLAI_GOVERNOR_MAX_WAIT_S", "10"))
+        self.max_retries = int(os.getenv("BELLAI_GOVERNOR_MAX_RETRIES", "3"))
+        self.min_concurrency = int(os.getenv("BELLAI_GOVERNOR_MIN_CONCURRENCY", "1"))
+        self.max_concurrency = int(os.getenv("BELLAI_GOVERNOR_MAX_CONCURRENCY", "32"))
+
+        # Limite de concurrence AIMD : +1 par fenêtre de succès, divisée par 2 sur 429
+        self.concurrency_limit = float(min(self.max_concurrency, max(self.min_concurrency, 8)))
+        self.in_flight = 0
+        self.blocked_until = 0.0
+
+        self._requests: deque = deque()  # horodatages
+        self._tokens: deque = deque()    # (horodatage, tokens)
+        self._token_total = 0
+        self._queue: deque = deque()
+        self._tickets = itertools.count()
+        self._lock = threading.Lock()
+
+        self.wait_time = LatencyHistogram()
+        self.counters = CounterSet()
+        self.max_queue_depth = 0
+
+    def _expire(self, now: float) -> None:
+        while self._requests and now - self._requests[0] >= WINDOW_SECONDS:
+            self._requests.popleft()
+        while self._tokens and now - self._tokens[0][0] >= WINDOW_SECONDS:
+            self._token_total -= self._tokens.popleft()[1]
+
+    def _delay(self, tokens: int, now: float) -> float:
+        """Temps avant de pouvoir admettre une requête (0 si possible immédiatement)"""
+        self._expire(now)
+        delays = [self.blocked_until - now]
+        if self.in_flight >= int(self.concurrency_limit):
+            delays.append(0.01)
+        if len(self._requests) >= self.rpm:
+            delays.append(self._requests[0] + WINDOW_SECONDS - now)
+        if self._tokens and self._token_total + tokens > self.tpm:
+            delays.append(self._tokens[0][0] + WINDOW_SECONDS - now)
+        return max(delays)
+
+    async def acquire(self, tokens: int, max_wait: Optional[float] = None) -> None:
+        """Attend son tour (FIFO) puis réserve une place et les quotas estimés"""
+        max_wait = self.max_wait if max_wait is None else min(self.max_wait, max_wait)
+        started = time.perf_counter()
+        with self._lock:
+            if len(self._queue) >= self.max_queue:
+                self.counters.inc("rejected_queue_full")
+                raise GovernorRejected(f"File d'attente {self.name} pleine ({self.max_queue})")
+            ticket = next(self._tickets)
+            self._queue.append(ticket)
+            self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+
+        try:
+            while True:
+                with self._lock:
+                    now = time.monotonic()
+                    delay = self._delay(tokens, now) if self._queue[0] == ticket else 0.005
+                    if delay <= 0 and self._queue[0] == ticket:
+                        self._queue.popleft()
+                        self.in_flight += 1
+                        self._requests.append(now)
+                        self._tokens.append((now, tokens))
+                        self._token_total += tokens
+                        break
+                if time.perf_counter() - started + min(delay, 0.05) > max_wait:
+                    self.counters.inc("rejected_timeout")
+                    raise GovernorRejected(f"Attente {self.name} supérieure à {max_wait:.2f}s")
+                await asyncio.sleep(min(max(delay, 0.005), 0.05))
+        except BaseException:
+            with self._lock:
+                if ticket in self._queue:
+                    self._queue.remove(ticket)
+            raise
+
+        waited = time.perf_counter() - started
+        self.wait_time.observe(waited)
+        self.counters.inc("admitted")
+        if waited > 0.001:
+            self.counters.inc("queued")
+
+    def release(self, estimated_tokens: int, actual_tokens: Optional[int] = None,
+                throttled: bool = False, retry_after: Optional[float] = None) -> None:
+        """Libère la place, corrige les tokens réservés et ajuste la concurrence"""
+        with self._lock:
+            self.in_flight -= 1
+            if actual_tokens is not None and actual_tokens != estimated_tokens:
+                correction = actual_tokens - estimated_tokens
+                self._tokens.append((time.monotonic(), correction))
+                self._token_total += correction
+
+            if throttled:
+                # Diminution multiplicative de la concurrence
+                self.concurrency_limit = max(self.min_concurrency, self.concurrency_limit / 2)
+                pause = retry_after if retry_after is not None else 1.0
+                # Pause globale : aucune requête du déploiement avant la fin du délai
+                self.blocked_until = max(self.blocked_until, time.monotonic() + pause)
+                self.counters.inc("throttled")
+            else:
+                # Augmentation additive : environ +1 après une fenêtre complète de succès
+                self.concurrency_limit = min(self.max_concurrency, self.concurrency_limit + 1 / self.concurrency_limit)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Profondeur de file, temps d'attente, concurrence et consommation de la minute"""
+        with self._lock:
+            self._expire(time.monotonic())
+            state = {
+                "queue_depth": len(self._queue),
+                "max_queue_depth": self.max_queue_depth,
+                "in_flight": self.in_flight,
+                "concurrency_limit": round(self.concurrency_limit, 2),
+                "requests_last_minute": len(self._requests),
+                "tokens_last_minute": self._token_total,
+                "rpm_limit": self.rpm,
+                "tpm_limit": self.tpm,
+            }
+        return {**state, **self.counters.snapshot(), "wait_time": self.wait_time.snapshot()}
+
+class GovernedChatModel(BaseChatModel):
+    """Modèle de chat dont chaque appel passe par un RateGovernor, avec reprise sur 429"""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    inner: BaseChatModel
+    governor: RateGovernor
+    max_output_tokens: int = 1000
+    # Disjoncteur Azure OpenAI : échec immédiat (CircuitOpen) quand le service est en panne
+    breaker: Optional[CircuitBreaker] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return f"governed-{self.inner._llm_type}"
+
+    def bind_tools(self, tools, **kwargs):
+        # Conversion des outils déléguée au modèle interne, appel gardé sur ce modèle
+        binding = self.inner.bind_tools(tools, **kwargs)
+        return self.bind(**binding.kwargs)
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        # Chemin synchrone (hors agent) : pas de file d'attente, appel direct
+        return self.inner._generate(messages, stop=stop, **kwargs)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        estimated = estimate_tokens(messages, self.max_output_tokens)
+        breaker = self.breaker
+        for attempt in range(self.governor.max_retries + 1):
+            if breaker is not None:
+                # Avant la file d'attente : inutile d'attendre un service coupé
+                breaker.allow()
+            # L'attente dans la file ne dépasse pas l'échéance du tour
+            try:
+                await self.governor.acquire(estimated, max_wait=remaining_time(self.governor.max_wait, minimum=0.0))
+            except BaseException:
+                if breaker is not None:
+                    breaker.abandon()
+                raise
+            started = time.perf_counter()
+            try:
+                result = await self.inner._agenerate(messages, stop=stop, **kwargs)
+            except asyncio.CancelledError:
+                # Tour annulé : la requête HTTP est abandonnée, la place est rendue
+                self.governor.release(estimated)
+                if breaker is not None:
+                    breaker.abandon()
+                raise
+            except Exception as e:
+                throttled = is_throttled(e)
+                if breaker is not None:
+                    # Un 429 relève du régulateur, pas d'une panne du service
+                    breaker.record(not throttled, time.perf_counter() - started)
+                retry_after = None
+                if throttled:
+                    # Délai indiqué par Azure, sinon backoff exponentiel avec gigue
+                    retry_after = _retry_after(e)
+                    if retry_after is None:
+                        retry_after = min(8.0, 0.5 * 2 ** attempt) * random.uniform(0.5, 1.0)
+                self.governor.release(estimated, throttled=throttled, retry_after=retry_after)
+                if not throttled or attempt == self.governor.max_retries:
+                    raise
+                # La pause est appliquée par le régulateur à la prochaine admission
+                self.governor.counters.inc("retries")
+                continue
+            if breaker is not None:
+                breaker.record(False, time.perf_counter() - started)
+            self.governor.release(estimated, _usage_tokens(result))
+            return result
+
+def _usage_tokens(result: ChatResult) -> Optional[int]:
+    """Tokens réellement consommés d'après usage_metadata"""
+    total = 0
+    for generation in result.generations:
+        usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+        if not usage:
+            return None
+        total += usage.get("total_tokens", 0)
+    return total
+
+_governors: Dict[str, RateGovernor] = {}
+_governors_lock = threading.Lock()
+
+def get_governor(deployment: str) -> RateGovernor:
+    """Un régulateur par déploiement (les quotas Azure sont par déploiement)"""
+    with _governors_lock:
+        if deployment not in _governors:
+            _governors[deployment] = RateGovernor(deployment)
+        return _governors[deployment]
+
+def get_governor_metrics() -> Dict[str, Any]:
+    """Métriques de tous les régulateurs"""
+    with _governors_lock:
+        governors = dict(_governors)
+    return {name: governor.get_metrics() for name, governor in governors.items()}
@@ -1,6 +1,13 @@
 from typing import Dict, Any, List, Optional
 from enum import Enum
 import json
+import time
+import itertools
+import threading
+from bellai.core.sessions import current_session, current_turn
+
+# Suffixe d'identifiant : deux actions créées dans la même milliseconde restent distinctes
+_action_counter = itertools.count(1)
 
 class IntentionType(Enum):
     """Types d'intentions détectées"""
@@ -18,11 +25,13 @@ class BackendAction:
         self.action_type = action_type
         self.data = data
         self.confirmation_needed = confirmation_needed
+        self.session_id = current_session.get()
+        turn = current_turn.get()
+        self.turn_id = turn.turn_id if turn else None
         self.id = self._generate_id()
 
     def _generate_id(self) -> str:
-        import time
-        return str(int(time.time() * 1000))
+        return f"{int(time.time() * 1000)}_{next(_action_counter)}"
 
     def to_tool_call(self) -> str:
         """Convertit l'action en format tool_call pour le backend"""
@@ -36,7 +45,8 @@ class BackendAction:
             "action_type": self.action_type,
             "data": self.data,
             "confirmation_needed": self.confirmation_needed,
-            "id": self.id
+            "id": self.id,
+            "session_id": self.session_id
         }
 
 class BackendActionManager:
@@ -45,33 +55,46 @@ class BackendActionManager:
     def __init__(self):
         self.pending_actions: Dict[str, BackendAction] = {}
         self.completed_actions: Dict[str, BackendAction] = {}
+        self._lock = threading.Lock()
     
     def store_action(self, action: BackendAction) -> None:
         """Stocke une action en attente"""
-        self.pending_actions[action.id] = action
+        with self._lock:
+            self.pending_actions[action.id] = action
     
-    def get_pending_actions(self) -> List[BackendAction]:
-        """Récupère toutes les actions en attente"""
-        return list(self.pending_actions.values())
+    def get_pending_actions(self, session_id: Optional[str] = None) -> List[BackendAction]:
+        """Récupère les actions en attente (d'une session si précisée)"""
+        with self._lock:
+            actions = list(self.pending_actions.values())
+        return [action for action in actions if session_id is None or action.session_id == session_id]
     
     def confirm_action(self, action_id: str) -> Optional[BackendAction]:
         """Confirme et exécute une action"""
-        if action_id in self.pending_actions:
-            action = self.pending_actions.pop(action_id)
-            self.completed_actions[action_id] = action
+        with self._lock:
+            action = self.pending_actions.pop(action_id, None)
+            if action:
+                self.completed_actions[action_id] = action
             return action
-        return None
     
     def cancel_action(self, action_id: str) -> bool:
         """Annule une action en attente"""
-        if action_id in self.pending_actions:
-            del self.pending_actions[action_id]
-            return True
-        return False
+        with self._lock:
+            return self.pending_actions.pop(action_id, None) is not None
+    
+    def rollback_turn(self, turn_id: str) -> List[str]:
+        """Retire les actions en attente de confirmation créées par un tour annulé"""
+        with self._lock:
+            # Les actions immédiates (escalade, notification) sont déjà parties
+            rolled_back = [action_id for action_id, action in self.pending_actions.items()
+                           if action.turn_id == turn_id and action.confirmation_needed]
+            for action_id in rolled_back:
+                del self.pending_actions[action_id]
+        return rolled_back
     
-    def get_actions_for_frontend(self) -> List[Dict[str, Any]]:
-        """Récupère les actions au format frontend/backend"""
-        return [action.to_dict() for action in self.pending_actions.values()]
+    def get_actions_for_frontend(self, session_id: Optional[str] = None, turn_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Récupère les actions au format frontend/backend (d'un tour si précisé)"""
+        return [action.to_dict() for action in self.get_pending_actions(session_id)
+                if turn_id is None or action.turn_id == turn_id]
 
 # Instance globale
 action_manager = BackendActionManager()
\ No newline at end of file
@@ -0,0 +1,194 @@
+"""Empreinte mémoire approximative par session et par sous-système, et diff d'allocations tracemalloc
+
+La taille d'un objet est estimée en parcourant ses références (dictionnaires, listes,
+attributs d'instances) ; au-delà de `sample` éléments, un conteneur n'est mesuré que
+sur un échantillon, extrapolé à sa longueur. Assez rapide pour être appelé
+périodiquement (ex: jauge Prometheus), au prix d'une estimation.
+"""
+import os
+import sys
+import time
+import random
+import threading
+import tracemalloc
+from collections import deque
+from types import BuiltinFunctionType, FunctionType, MethodType, ModuleType
+from typing import Any, Dict, List, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Objets dont on ne parcourt pas le contenu
+_ATOMIC = (str, bytes, bytearray, int, float, complex, bool, type(None))
+# Objets partagés par tout le process : ni comptés ni parcourus
+_SHARED = (type, ModuleType, FunctionType, BuiltinFunctionType, MethodType)
+
+def approx_sizeof(obj: Any, sample: int = 32, max_depth: int = 12) -> int:
+    """Taille approximative (octets) d'un objet et de tout ce qu'il référence"""
+    seen = set()
+    total = 0.0
+    stack = [(obj, 1.0, 0)]
+    while stack:
+        current, weight, depth = stack.pop()
+        if id(current) in seen or isinstance(current, _SHARED):
+            continue
+        seen.add(id(current))
+        total += sys.getsizeof(current, 0) * weight
+        if isinstance(current, _ATOMIC) or depth >= max_depth:
+            continue
+
+        if isinstance(current, dict):
+            children = list(current.items())
+        elif isinstance(current, (list, tuple, set, frozenset, deque)):
+            children = list(current)
+        else:
+            children = []
+            attributes = getattr(current, "__dict__", None)
+            if attributes is not None:
+                children.append(attributes)
+            for slot in getattr(type(current), "__slots__", ()):
+                if isinstance(slot, str) and hasattr(current, slot):
+                    children.append(getattr(current, slot))
+
+        factor = 1.0
+        if len(children) > sample:
+            factor = len(children) / sample
+            children = random.sample(children, sample)
+        for child in children:
+            # Paire clé/valeur d'un dictionnaire : les deux avec le même poids
+            if isinstance(current, dict):
+                stack.append((child[0], weight * factor, depth + 1))
+                stack.append((child[1], weight * factor, depth + 1))
+            else:
+                stack.append((child, weight * factor, depth + 1))
+    return int(total)
+
+class MemoryIntrospector:
+    """Rapport mémoire des structures en process (historiques, mémoires LangChain, actions, caches)"""
+
+    def __init__(self):
+        self.sample = int(os.getenv("BELLAI_SIZEOF_SAMPLE", "32"))
+        # Au-delà, les sessions mesurées sont tirées au hasard et les totaux extrapolés
+        self.max_sessions = int(os.getenv("BELLAI_INTROSPECTION_MAX_SESSIONS", "2000"))
+        self._last: Optional[Dict[str, Any]] = None
+        self._last_at = 0.0
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._started_tracing = False
+        self._lock = threading.Lock()
+
+    def report(self, top: int = 10, max_age: float = 0.0) -> Dict[str, Any]:
+        """Octets par sous-système, par session (top N) et au total ; rapport en cache pendant `max_age` secondes"""
+        with self._lock:
+            if self._last is not None and time.monotonic() - self._last_at < max_age:
+                return self._last
+        report = self._build(top)
+        with self._lock:
+            self._last, self._last_at = report, time.monotonic()
+        return report
+
+    def _build(self, top: int) -> Dict[str, Any]:
+        from bellai.core.memory import chat_memory
+        from bellai.core.intention import action_manager
+        from bellai.core.budget import token_ledger
+        from bellai.tools.navigation import route_details, stale_routes
+        from bellai.tools.places_service import stale_places
+        from bellai.tools.route_table import route_table
+
+        started = time.perf_counter()
+        # Copies : les tours continuent pendant la mesure
+        conversations = dict(chat_memory.conversations)
+        langchain_memories = dict(chat_memory.langchain_memories)
+        actions: Dict[str, List[Any]] = {}
+        for store in (action_manager.pending_actions, action_manager.completed_actions):
+            for action in list(store.values()):
+                actions.setdefault(action.session_id or "", []).append(action)
+        ledger = dict(token_ledger.sessions)
+
+        session_ids = set(conversations) | set(langchain_memories) | set(actions)
+        measured = list(session_ids)
+        if len(measured) > self.max_sessions:
+            measured = random.sample(measured, self.max_sessions)
+        factor = len(session_ids) / len(measured) if measured else 1.0
+
+        sessions = []
+        per_session_totals = {"chat_history": 0, "langchain_memory": 0, "actions": 0, "token_ledger": 0}
+        for session_id in measured:
+            sizes = {
+                "chat_history": approx_sizeof(conversations.get(session_id, []), self.sample),
+                "langchain_memory": approx_sizeof(langchain_memories.get(session_id), self.sample),
+                "actions": approx_sizeof(actions.get(session_id, []), self.sample),
+                "token_ledger": approx_sizeof(ledger.get(session_id), self.sample),
+            }
+            for name, size in sizes.items():
+                per_session_totals[name] += size
+            sessions.append({
+                "session_id": session_id,
+                "bytes": sum(sizes.values()),
+                "messages": len(conversations.get(session_id, [])),
+                **sizes,
+            })
+
+        entries = {
+            "chat_history": len(conversations),
+            "langchain_memory": len(langchain_memories),
+            "actions": sum(len(session_actions) for session_actions in actions.values()),
+            "token_ledger": len(ledger),
+        }
+        subsystems = {name: {"bytes": int(size * factor), "entries": entries[name]} for name, size in per_session_totals.items()}
+        # Caches partagés par toutes les sessions
+        for name, store, count in (
+            ("route_details", route_details.routes, len(route_details.routes)),
+            ("stale_routes", stale_routes._entries, len(stale_routes._entries)),
+            ("stale_places", stale_places._entries, len(stale_places._entries)),
+            ("route_table", route_table.__dict__, len(route_table.destinations)),
+        ):
+            subsystems[name] = {"bytes": approx_sizeof(dict(store), self.sample), "entries": count}
+
+        return {
+            "total_bytes": sum(subsystem["bytes"] for subsystem in subsystems.values()),
+            "subsystems": subsystems,
+            "session_count": len(session_ids),
+            "sessions_measured": len(measured),
+            "top_sessions": sorted(sessions, key=lambda s: s["bytes"], reverse=True)[:top],
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+
+    @property
+    def tracking(self) -> bool:
+        return self._baseline is not None and tracemalloc.is_tracing()
+
+    def start_allocation_tracking(self, frames: int = 10) -> None:
+        """Démarre tracemalloc (si besoin) et prend l'instantané de référence"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            self._started_tracing = True
+        self._baseline = tracemalloc.take_snapshot()
+
+    def allocation_diff(self, top: int = 20, reset: bool = True) -> Dict[str, Any]:
+        """Allocations apparues depuis l'instantané de référence, par ligne de code"""
+        if not self.tracking:
+            raise RuntimeError("Suivi des allocations non démarré (start_allocation_tracking)")
+        current = tracemalloc.take_snapshot()
+        ignored = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        stats = current.filter_traces(ignored).compare_to(self._baseline.filter_traces(ignored), "lineno")
+        if reset:
+            self._baseline = current
+        return {
+            "size_diff": sum(stat.size_diff for stat in stats),
+            "traced_bytes": tracemalloc.get_traced_memory()[0],
+            "top": [{
+                "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                "size_diff": stat.size_diff,
+                "count_diff": stat.count_diff,
+                "size": stat.size,
+            } for stat in stats[:top]],
+        }
+
+    def stop_allocation_tracking(self) -> None:
+        self._baseline = None
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+# Instance globale
+memory_introspector = MemoryIntrospector()
@@ -1,6 +1,7 @@
 from typing import Dict, List
 from datetime import datetime
 import json
+import threading
 from langchain.memory import ConversationBufferWindowMemory
 
 class ChatMemoryManager:
@@ -13,6 +14,8 @@ class ChatMemoryManager:
         self.langchain_memories: Dict[str, ConversationBufferWindowMemory] = {}
         # Limite de messages par conversation
         self.max_messages = 20
+        # Les tours de sessions différentes s'exécutent en parallèle (boucles et threads)
+        self._lock = threading.RLock()
 
     def get_session_id(self, user_id: str = "default") -> str:
         """Génère un ID de session"""
@@ -21,6 +24,10 @@ class ChatMemoryManager:
 
     def create_session(self, session_id: str) -> None:
         """Crée une nouvelle session de chat"""
+        with self._lock:
+            self._create_session(session_id)
+
+    def _create_session(self, session_id: str) -> None:
         if session_id not in self.conversations:
             self.conversations[session_id] = []
             self.langchain_memories[session_id] = ConversationBufferWindowMemory(
@@ -31,8 +38,6 @@ class ChatMemoryManager:
 
     def add_message(self, session_id: str, role: str, content: str, metadata: Dict = None) -> None:
         """Ajoute un message à l'historique"""
-        self.create_session(session_id)
-
         # Ajouter au stockage simple
         message = {
             "role": role,
@@ -40,22 +45,45 @@ class ChatMemoryManager:
             "timestamp": datetime.now().isoformat(),
             "metadata": metadata or {}
         }
-        self.conversations[session_id].append(message)
-
-        # Ajouter à la mémoire LangChain
-        if role == "user":
-            self.langchain_memories[session_id].chat_memory.add_user_message(content)
-        elif role == "assistant":
-            self.langchain_memories[session_id].chat_memory.add_ai_message(content)
+        with self._lock:
+            self._create_session(session_id)
+            self.conversations[session_id].append(message)
+
+            # Ajouter à la mémoire LangChain
+            if role == "user":
+                self.langchain_memories[session_id].chat_memory.add_user_message(content)
+            elif role == "assistant":
+                self.langchain_memories[session_id].chat_memory.add_ai_message(content)
+
+    def discard_last_message(self, session_id: str, role: str, content: str) -> bool:
+        """Retire le dernier message s'il correspond (tour annulé avant sa réponse)"""
+        with self._lock:
+            messages = self.conversations.get(session_id)
+            if not messages or messages[-1]["role"] != role or messages[-1]["content"] != content:
+                return False
+            messages.pop()
+            chat_history = self.langchain_memories[session_id].chat_memory
+            if chat_history.messages and chat_history.messages[-1].content == content:
+                chat_history.messages.pop()
+            return True
 
     def get_conversation_history(self, session_id: str) -> List[Dict]:
         """Récupère l'historique complet d'une conversation"""
-        return self.conversations.get(session_id, [])
+        with self._lock:
+            return list(self.conversations.get(session_id, []))
 
     def get_langchain_memory(self, session_id: str) -> ConversationBufferWindowMemory:
         """Récupère la mémoire LangChain pour une session"""
-        self.create_session(session_id)
-        return self.langchain_memories[session_id]
+        with self._lock:
+            self._create_session(session_id)
+            return self.langchain_memories[session_id]
+
+    def set_window(self, session_id: str, k: int) -> None:
+        """Réduit le nombre d'échanges de l'historique envoyés au modèle pour une session"""
+        with self._lock:
+            self._create_session(session_id)
+            memory = self.langchain_memories[session_id]
+            memory.k = min(memory.k, k)
 
     def get_recent_context(self, session_id: str, last_n: int = 5) -> str:
         """Récupère le contexte récent sous forme de texte"""
@@ -71,15 +99,16 @@ class ChatMemoryManager:
 
     def clear_session(self, session_id: str) -> None:
         """Efface l'historique d'une session"""
-        if session_id in self.conversations:
-            del self.conversations[session_id]
-        if session_id in self.langchain_memories:
-            del self.langchain_memories[session_id]
+        with self._lock:
+            self.conversations.pop(session_id, None)
+            self.langchain_memories.pop(session_id, None)
 
     def list_sessions(self, user_id: str = None) -> List[Dict]:
         """Liste les sessions disponibles"""
         sessions = []
-        for session_id, messages in self.conversations.items():
+        with self._lock:
+            conversations = {session_id: list(messages) for session_id, messages in self.conversations.items()}
+        for session_id, messages in conversations.items():
             if user_id and not session_id.startswith(user_id):
                 continue
 
@@ -98,25 +127,28 @@ class ChatMemoryManager:
 
     def save_to_file(self, filepath: str) -> None:
         """Sauvegarde les conversations dans un fichier"""
-        with open(filepath, 'w', encoding='utf-8') as f:
+        with self._lock, open(filepath, 'w', encoding='utf-8') as f:
             json.dump(self.conversations, f, ensure_ascii=False, indent=2)
 
     def load_from_file(self, filepath: str) -> None:
         """Charge les conversations depuis un fichier"""
         try:
             with open(filepath, 'r', encoding='utf-8') as f:
-                self.conversations = json.load(f)
+                conversations = json.load(f)
+        except FileNotFoundError:
+            conversations = {}
+
+        with self._lock:
+            self.conversations = conversations
 
             # Recréer les mémoires LangChain
             for session_id, messages in self.conversations.items():
-                self.create_session(session_id)
+                self._create_session(session_id)
                 for msg in messages:
                     if msg["role"] == "user":
                         self.langchain_memories[session_id].chat_memory.add_user_message(msg["content"])
                     elif msg["role"] == "assistant":
                         self.langchain_memories[session_id].chat_memory.add_ai_message(msg["content"])
-        except FileNotFoundError:
-            self.conversations = {}
 
 # Instance globale
 chat_memory = ChatMemoryManager()
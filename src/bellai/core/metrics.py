@@ -0,0 +1,362 @@
+"""Registre de métriques en process (compteurs, jauges, histogrammes) et export au format Prometheus
+
+Les compteurs et histogrammes sont agrégés par thread, sans verrou sur le chemin chaud :
+chaque thread écrit dans son propre dictionnaire, fusionné seulement à la lecture.
+"""
+import os
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from dotenv import load_dotenv
+from bellai.core.stats import DEFAULT_BUCKETS
+
+load_dotenv()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LabelValues = Tuple[str, ...]
+Samples = Dict[LabelValues, float]
+
+class _Shards:
+    """Un dictionnaire par thread, fusionnés à la lecture"""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards: List[dict] = []
+        self._lock = threading.Lock()
+
+    def local(self) -> dict:
+        values = getattr(self._local, "values", None)
+        if values is None:
+            values = self._local.values = {}
+            # Seul l'enregistrement d'un nouveau thread prend le verrou
+            with self._lock:
+                self._shards.append(values)
+        return values
+
+    def snapshots(self) -> List[dict]:
+        with self._lock:
+            shards = list(self._shards)
+        # dict.copy est atomique sous le GIL
+        return [shard.copy() for shard in shards]
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _format_labels(names: Sequence[str], values: LabelValues, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else repr(float(bound))
+
+class Metric:
+    """Base commune : nom, aide, noms d'étiquettes"""
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def expose(self) -> List[str]:
+        raise NotImplementedError
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+
+class Counter(Metric):
+    """Compteur monotone"""
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._shards = _Shards()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        values = self._shards.local()
+        key = self._key(labels)
+        values[key] = values.get(key, 0) + amount
+
+    def samples(self) -> Samples:
+        merged: Samples = {}
+        for shard in self._shards.snapshots():
+            for key, value in shard.items():
+                merged[key] = merged.get(key, 0) + value
+        return merged
+
+    def expose(self) -> List[str]:
+        return self._header() + [
+            f"{self.name}_total{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(self.samples().items())
+        ]
+
+class Gauge(Metric):
+    """Valeur instantanée, fixée directement ou calculée à la lecture"""
+
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 function: Optional[Callable[[], Any]] = None):
+        super().__init__(name, documentation, labelnames)
+        self._values: Samples = {}
+        self.function = function
+
+    def set(self, value: float, **labels) -> None:
+        # Affectation atomique sous le GIL
+        self._values[self._key(labels)] = value
+
+    def samples(self) -> Samples:
+        if self.function is None:
+            return dict(self._values)
+        value = self.function()
+        # La fonction retourne une valeur, ou {valeurs d'étiquettes: valeur}
+        return value if isinstance(value, dict) else {(): value}
+
+    def expose(self) -> List[str]:
+        lines = self._header()
+        for key, value in sorted(self.samples().items()):
+            if value is not None:
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+class CallbackCounter(Gauge):
+    """Compteur tenu par un autre composant (ex: CounterSet), lu au moment de l'export"""
+
+    type = "counter"
+
+    def expose(self) -> List[str]:
+        return self._header() + [
+            f"{self.name}_total{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(self.samples().items()) if value is not None
+        ]
+
+class Histogram(Metric):
+    """Histogramme à buckets fixes"""
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._shards = _Shards()
+
+    def observe(self, value: float, **labels) -> None:
+        values = self._shards.local()
+        key = self._key(labels)
+        state = values.get(key)
+        if state is None:
+            # [compte par bucket..., +Inf, somme]
+            state = values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        state[bisect.bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    def samples(self) -> Dict[LabelValues, List[float]]:
+        merged: Dict[LabelValues, List[float]] = {}
+        for shard in self._shards.snapshots():
+            for key, state in shard.items():
+                state = list(state)
+                total = merged.setdefault(key, [0] * len(state))
+                for i, value in enumerate(state):
+                    total[i] += value
+        return merged
+
+    def expose(self) -> List[str]:
+        lines = self._header()
+        for key, state in sorted(self.samples().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), state[:-1]):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, ("le", _format_bound(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    """Ensemble des métriques exportées (un nom = une métrique, la dernière déclarée l'emporte)"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+              function: Optional[Callable[[], Any]] = None) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, function))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def exposition(self) -> str:
+        """Toutes les métriques au format texte Prometheus"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            try:
+                lines.extend(metric.expose())
+            except Exception:
+                # Une jauge en erreur ne doit pas priver l'export des autres métriques
+                continue
+        return "\n".join(lines) + "\n"
+
+# Instance globale
+registry = MetricsRegistry()
+
+# --- Métriques des tours ---
+
+TURNS = registry.counter("bellai_turns", "Tours traités par statut et route de modèle", ("status", "route"))
+TURN_DURATION = registry.histogram("bellai_turn_duration_seconds", "Durée d'exécution des tours", ("route",))
+TURN_WAIT = registry.histogram("bellai_turn_wait_seconds", "Attente avant exécution (verrou de session, file)")
+TURN_ITERATIONS = registry.histogram("bellai_turn_iterations", "Appels au modèle par tour", (),
+                                     buckets=(1, 2, 3, 4, 5, 6, 8, 10))
+LLM_DURATION = registry.histogram("bellai_llm_call_duration_seconds", "Durée des appels au modèle", ("route",))
+LLM_ERRORS = registry.counter("bellai_llm_errors", "Appels au modèle en erreur", ("route",))
+LLM_TOKENS = registry.counter("bellai_llm_tokens", "Tokens consommés", ("route", "kind"))
+TOOL_DURATION = registry.histogram("bellai_tool_duration_seconds", "Durée des outils", ("tool",))
+TOOL_ERRORS = registry.counter("bellai_tool_errors", "Outils en erreur", ("tool",))
+MEMORY_DURATION = registry.histogram("bellai_memory_duration_seconds", "Temps passé dans la mémoire de conversation par tour")
+
+def record_turn(summary: Dict[str, Any], status: str, route: str) -> None:
+    """Alimente le registre à partir de la décomposition d'un tour (TurnStatsCallback.summary)"""
+    TURNS.inc(status=status, route=route)
+    TURN_DURATION.observe(summary["total_ms"] / 1000, route=route)
+    TURN_WAIT.observe(summary["wait_ms"] / 1000)
+    TURN_ITERATIONS.observe(summary["iterations"])
+    MEMORY_DURATION.observe(summary["memory_ms"] / 1000)
+    for call in summary["llm_calls"]:
+        LLM_DURATION.observe(call["ms"] / 1000, route=route)
+        if "error" in call:
+            LLM_ERRORS.inc(route=route)
+    for kind in ("prompt", "completion", "cached"):
+        if summary[f"{kind}_tokens"]:
+            LLM_TOKENS.inc(summary[f"{kind}_tokens"], route=route, kind=kind)
+    for tool in summary["tools"]:
+        TOOL_DURATION.observe(tool["ms"] / 1000, tool=tool["name"])
+        if "error" in tool:
+            TOOL_ERRORS.inc(tool=tool["name"])
+
+# --- Jauges et compteurs lus sur les composants existants ---
+
+BREAKER_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+def register_agent_metrics(agent) -> None:
+    """Expose l'état de l'agent : sessions, actions, files d'attente, caches, disjoncteurs (une fois, pour l'agent global)"""
+    from bellai.core.memory import chat_memory
+    from bellai.core.intention import action_manager
+    from bellai.core.governor import get_governor_metrics
+    from bellai.core.breaker import get_breaker_metrics
+    from bellai.tools.route_table import route_table
+    from bellai.tools.navigation import stale_routes
+    from bellai.tools.places_service import stale_places
+    from bellai.core.introspection import memory_introspector
+
+    registry.gauge("bellai_active_sessions", "Sessions avec un tour en cours ou en attente",
+                   function=lambda: agent.sessions.get_metrics()["active_sessions"])
+    registry.gauge("bellai_waiting_turns", "Tours en attente du verrou de leur session",
+                   function=lambda: agent.sessions.get_metrics()["waiting_turns"])
+    registry.gauge("bellai_chat_sessions", "Conversations en mémoire", function=lambda: len(chat_memory.conversations))
+    registry.gauge("bellai_actions", "Actions backend en mémoire", ("state",), function=lambda: {
+        ("pending",): len(action_manager.pending_actions),
+        ("completed",): len(action_manager.completed_actions),
+    })
+    registry.gauge("bellai_scheduler_queue_depth", "Tours en file devant l'ordonnanceur",
+                   function=lambda: agent.scheduler.get_metrics()["queue_depth"])
+    registry.gauge("bellai_scheduler_running", "Tours en cours d'exécution",
+                   function=lambda: agent.scheduler.get_metrics()["running"])
+    registry.gauge("bellai_governor_queue_depth", "Requêtes en attente du régulateur Azure", ("deployment",),
+                   function=lambda: {(name, ): m["queue_depth"] for name, m in get_governor_metrics().items()})
+    registry.gauge("bellai_governor_in_flight", "Requêtes Azure en cours", ("deployment",),
+                   function=lambda: {(name, ): m["in_flight"] for name, m in get_governor_metrics().items()})
+    registry.gauge("bellai_breaker_state", "État des disjoncteurs (0 fermé, 1 demi-ouvert, 2 ouvert)", ("dependency",),
+                   function=lambda: {(name, ): BREAKER_STATES[m["state"]] for name, m in get_breaker_metrics().items()})
+
+    # Rapport mémoire recalculé au plus une fois par minute
+    registry.gauge("bellai_memory_bytes", "Mémoire approximative par sous-système", ("subsystem",), function=lambda: {
+        (name, ): subsystem["bytes"] for name, subsystem in memory_introspector.report(max_age=60)["subsystems"].items()
+    })
+
+    def cache_counts(field: str) -> Samples:
+        prefetch = agent.prefetcher.counters
+        flight = agent.single_flight.counters
+        counts = {
+            "prefetch": (prefetch.get("hits"), prefetch.get("launched") - prefetch.get("hits")),
+            "single_flight": (flight.get("shared"), flight.get("calls") - flight.get("shared")),
+            "route_table": (route_table.counters.get("hits"), route_table.counters.get("misses")),
+            "stale_routes": (stale_routes.counters.get("served"), stale_routes.counters.get("misses")),
+            "stale_places": (stale_places.counters.get("served"), stale_places.counters.get("misses")),
+        }
+        index = 0 if field == "hits" else 1
+        return {(cache, ): values[index] for cache, values in counts.items()}
+
+    registry.register(CallbackCounter("bellai_cache_hits", "Succès des caches", ("cache",),
+                                      function=lambda: cache_counts("hits")))
+    registry.register(CallbackCounter("bellai_cache_misses", "Échecs des caches", ("cache",),
+                                      function=lambda: cache_counts("misses")))
+
+# --- Export ---
+
+async def metrics_app(scope, receive, send) -> None:
+    """Application ASGI à monter sur n'importe quel serveur (ex: app.mount("/metrics", metrics_app))"""
+    if scope["type"] != "http":
+        return
+    body = registry.exposition().encode("utf-8")
+    await send({"type": "http.response.start", "status": 200,
+                "headers": [(b"content-type", CONTENT_TYPE.encode()), (b"content-length", str(len(body)).encode())]})
+    await send({"type": "http.response.body", "body": body})
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        body = registry.exposition().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+_server: Optional[ThreadingHTTPServer] = None
+_server_lock = threading.Lock()
+
+def start_metrics_server(port: int, addr: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """Sert /metrics sur un port dédié, dans un thread (un seul serveur par process)"""
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((addr, port), _MetricsHandler)
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="bellai-metrics", daemon=True).start()
+        return _server
+
+def start_metrics_server_from_env() -> Optional[ThreadingHTTPServer]:
+    """Démarre le serveur si BELLAI_METRICS_PORT est défini"""
+    port = os.getenv("BELLAI_METRICS_PORT")
+    if not port:
+        return None
+    return start_metrics_server(int(port), os.getenv("BELLAI_METRICS_ADDR", "0.0.0.0"))
@@ -0,0 +1,172 @@
+"""Exécution spéculative des outils probables pendant que le modèle réfléchit"""
+import os
+import re
+import json
+import time
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextvars import ContextVar, copy_context
+from typing import Dict, Any, List, Optional, Tuple
+from langchain_core.tools import BaseTool, StructuredTool
+from bellai.core.stats import CounterSet
+from bellai.tools.intention_service import BOOKING_KEYWORDS, ROUTE_KEYWORDS, TAXI_KEYWORDS
+from bellai.tools.places_service import HOTEL_LOCATION
+
+# Pool dédié aux appels spéculatifs (les outils sont synchrones)
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv("BELLAI_PREFETCH_WORKERS", "8")), thread_name_prefix="bellai-prefetch")
+
+# Lot de préchargement du tour en cours
+_current_batch: ContextVar[Optional["PrefetchBatch"]] = ContextVar("bellai_prefetch_batch", default=None)
+
+# "aller à la Tour Eiffel", "trajet vers le Louvre", "taxi pour l'aéroport"...
+_DESTINATION_PATTERN = re.compile(
+    r"(?:aller|rendre|trajet|itinéraire|taxi|uber)\s+(?:jusqu'|jusqu’)?(?:à|au|aux|vers|pour|a)\s+"
+    r"(?:la |le |les |l'|l’)?(?P<destination>[^?!.,]+?)(?:\s+(?:en|à)\s+(?:taxi|uber|métro|bus|voiture|pied|transport\w*))?\s*[?!.]*$",
+    re.IGNORECASE,
+)
+
+def normalize_tool_args(tool: BaseTool, args: Dict[str, Any]) -> str:
+    """Clé canonique d'un appel d'outil (valeurs par défaut incluses, casse ignorée)"""
+    merged = {name: spec.get("default") for name, spec in tool.args.items()}
+    merged.update(args or {})
+    normalized = {
+        key: " ".join(value.lower().split()) if isinstance(value, str) else value
+        for key, value in merged.items()
+    }
+    return f"{tool.name}:{json.dumps(normalized, sort_keys=True, ensure_ascii=False, default=str)}"
+
+def extract_destination(message: str) -> Optional[str]:
+    """Extrait une destination explicite d'une demande d'itinéraire"""
+    match = _DESTINATION_PATTERN.search(message.strip())
+    if not match:
+        return None
+    destination = match.group("destination").strip()
+    if not destination or len(destination) > 80:
+        return None
+    return f"{destination[0].upper()}{destination[1:]}, Paris"
+
+class PrefetchBatch:
+    """Appels spéculatifs lancés pour un tour"""
+
+    def __init__(self):
+        self.futures: Dict[str, Future] = {}
+        self.started_at: Dict[str, float] = {}
+        self.used: set = set()
+
+class SpeculativePrefetcher:
+    """Anticipe les appels d'outils évidents et mémorise leurs résultats pour le tour"""
+
+    def __init__(self, tools: List[BaseTool]):
+        self.tools = {tool.name: tool for tool in tools}
+        self.enabled = os.getenv("BELLAI_PREFETCH_ENABLED", "true").lower() != "false"
+        self.counters = CounterSet()
+
+    def predict(self, message: str) -> List[Tuple[str, Dict[str, Any]]]:
+        """Liste les appels d'outils que le modèle va très probablement demander"""
+        message_lower = message.lower()
+        calls: List[Tuple[str, Dict[str, Any]]] = []
+
+        if any(kw in message_lower for kw in BOOKING_KEYWORDS["restaurant"] + BOOKING_KEYWORDS["spa"]):
+            calls.append(("get_client_preferences", {}))
+            calls.append(("get_services_hours", {}))
+
+        is_taxi = any(kw in message_lower for kw in TAXI_KEYWORDS)
+        if is_taxi or any(kw in message_lower for kw in ROUTE_KEYWORDS):
+            destination = extract_destination(message)
+            if destination:
+                args = {"origin": HOTEL_LOCATION, "destination": destination, "travel_mode": "AUTO"}
+                if is_taxi:
+                    args.update({"travel_mode": "DRIVE", "vehicle_type": "taxi"})
+                calls.append(("get_route", args))
+
+        return [(name, args) for name, args in calls if name in self.tools]
+
+    def start(self, message: str) -> Optional[PrefetchBatch]:
+        """Lance en arrière-plan les appels prédits pour le tour courant"""
+        if not self.enabled:
+            return None
+
+        batch = PrefetchBatch()
+        for name, args in self.predict(message):
+            tool = self.tools[name]
+            key = normalize_tool_args(tool, args)
+            if key in batch.futures:
+                continue
+            batch.futures[key] = _executor.submit(copy_context().run, tool.func, **args)
+            batch.started_at[key] = time.perf_counter()
+            self.counters.inc("launched")
+
+        _current_batch.set(batch)
+        return batch
+
+    def finish(self, batch: Optional[PrefetchBatch]) -> None:
+        """Abandonne les résultats non consommés et comptabilise le travail perdu"""
+        if batch is None:
+            return
+        for key, future in batch.futures.items():
+            if key in batch.used:
+                continue
+            self.counters.inc("wasted")
+            if future.cancel():
+                self.counters.inc("cancelled")
+            else:
+                future.add_done_callback(
+                    lambda _, started=batch.started_at[key]: self.counters.inc("wasted_seconds", time.perf_counter() - started)
+                )
+        _current_batch.set(None)
+
+    def _take(self, tool: BaseTool, args: Dict[str, Any]) -> Optional[Future]:
+        """Récupère un appel spéculatif correspondant, s'il existe"""
+        batch = _current_batch.get()
+        if batch is None:
+            return None
+        key = normalize_tool_args(tool, args)
+        future = batch.futures.get(key)
+        if future is None or key in batch.used:
+            self.counters.inc("misses")
+            return None
+        batch.used.add(key)
+        self.counters.inc("hits")
+        if future.done():
+            self.counters.inc("hits_ready")
+        return future
+
+    def wrap_tool(self, tool: BaseTool) -> BaseTool:
+        """Enveloppe un outil pour servir les résultats préchargés"""
+
+        def run(**kwargs):
+            future = self._take(tool, kwargs)
+            if future is not None:
+                return future.result()
+            return tool.func(**kwargs)
+
+        async def arun(**kwargs):
+            future = self._take(tool, kwargs)
+            if future is not None:
+                return await asyncio.wrap_future(future)
+            return await asyncio.to_thread(tool.func, **kwargs)
+
+        return StructuredTool.from_function(
+            func=run,
+            coroutine=arun,
+            name=tool.name,
+            description=tool.description,
+            args_schema=tool.args_schema,
+            infer_schema=False,
+            return_direct=tool.return_direct,
+        )
+
+    def wrap_tools(self, tools: List[BaseTool]) -> List[BaseTool]:
+        """Enveloppe les outils susceptibles d'être préchargés"""
+        prefetchable = {"get_client_preferences", "get_services_hours", "get_route"}
+        return [self.wrap_tool(tool) if tool.name in prefetchable else tool for tool in tools]
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Taux de succès et travail gaspillé"""
+        counters = self.counters.snapshot()
+        launched = counters.get("launched", 0)
+        return {
+            **counters,
+            "hit_rate": round(counters.get("hits", 0) / launched, 3) if launched else None,
+            "waste_rate": round(counters.get("wasted", 0) / launched, 3) if launched else None,
+        }
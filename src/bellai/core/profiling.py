@@ -0,0 +1,194 @@
+"""Profilage à la demande de tours individuels (CPU et allocations mémoire)
+
+Un tour est profilé si sa session est marquée (profile_session, activable à chaud) ou
+s'il est tiré par l'échantillonnage (BELLAI_PROFILE_SAMPLE). Sans session marquée et
+avec un taux nul, le seul coût est un test sur deux attributs.
+
+Deux profileurs CPU :
+- "cprofile" : cProfile déterministe, fichier .pstats (snakeviz, python -m pstats)
+- "sampling" : échantillonnage de la pile du thread de la boucle, fichier .speedscope.json
+Les deux observent le thread de la boucle asyncio : les autres tours entrelacés pendant
+le tour profilé y apparaissent aussi, les outils exécutés dans des threads non.
+tracemalloc ajoute un fichier .alloc.txt : pic du tour et allocations encore vivantes à sa fin.
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import cProfile
+import threading
+import tracemalloc
+from datetime import datetime
+from typing import Any, Awaitable, Dict, List, Optional, Set, Tuple
+from dotenv import load_dotenv
+from bellai.core.stats import CounterSet
+
+load_dotenv()
+
+# Allocations listées dans le rapport mémoire
+TOP_ALLOCATIONS = 25
+
+class StackSampler(threading.Thread):
+    """Relevé périodique de la pile d'un thread, exporté au format speedscope"""
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(name="bellai-profiler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.frames: List[Dict[str, Any]] = []
+        self._frame_index: Dict[Tuple[str, str, int], int] = {}
+        self.samples: List[List[int]] = []
+        self.weights: List[float] = []
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        last = time.perf_counter()
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            if frame is not None:
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(self._index(code.co_name, code.co_filename, code.co_firstlineno))
+                    frame = frame.f_back
+                # speedscope : de la racine vers la feuille
+                self.samples.append(stack[::-1])
+                self.weights.append(now - last)
+            last = now
+
+    def _index(self, name: str, filename: str, line: int) -> int:
+        key = (name, filename, line)
+        index = self._frame_index.get(key)
+        if index is None:
+            index = self._frame_index[key] = len(self.frames)
+            self.frames.append({"name": name, "file": filename, "line": line})
+        return index
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+    def to_speedscope(self, name: str) -> Dict[str, Any]:
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "bellai.core.profiling",
+            "activeProfileIndex": 0,
+            "shared": {"frames": self.frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(self.weights),
+                "samples": self.samples,
+                "weights": self.weights,
+            }],
+        }
+
+class TurnProfiler:
+    """Décide quels tours profiler et écrit leurs profils, nommés par session et tour"""
+
+    def __init__(self):
+        self.output_dir = os.getenv("BELLAI_PROFILE_DIR", "profiles")
+        self.sample_rate = float(os.getenv("BELLAI_PROFILE_SAMPLE", "0"))
+        self.mode = os.getenv("BELLAI_PROFILE_MODE", "cprofile").lower()
+        self.interval = float(os.getenv("BELLAI_PROFILE_INTERVAL_MS", "5")) / 1000
+        self.track_allocations = os.getenv("BELLAI_PROFILE_TRACEMALLOC", "1") == "1"
+        self.sessions: Set[str] = {s for s in os.getenv("BELLAI_PROFILE_SESSIONS", "").split(",") if s}
+        self.counters = CounterSet()
+        # Un seul profileur à la fois : cProfile et tracemalloc sont globaux au process
+        self._busy = threading.Lock()
+
+    def profile_session(self, session_id: str, enabled: bool = True) -> None:
+        """Active ou désactive le profilage de tous les tours d'une session"""
+        if enabled:
+            self.sessions.add(session_id)
+        else:
+            self.sessions.discard(session_id)
+
+    def should_profile(self, session_id: str) -> bool:
+        if not self.sessions and self.sample_rate <= 0:
+            return False
+        return session_id in self.sessions or random.random() < self.sample_rate
+
+    async def profile(self, turn: Awaitable, session_id: str, turn_id: str) -> Any:
+        """Exécute le tour sous profileur ; s'il y en a déjà un en cours, le tour s'exécute normalement"""
+        if not self._busy.acquire(blocking=False):
+            self.counters.inc("skipped_busy")
+            return await turn
+        try:
+            started_tracing = False
+            if self.track_allocations:
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start(10)
+                    started_tracing = True
+                tracemalloc.reset_peak()
+            sampler = profiler = None
+            if self.mode == "sampling":
+                sampler = StackSampler(threading.get_ident(), self.interval)
+                sampler.start()
+            else:
+                profiler = cProfile.Profile()
+                profiler.enable()
+            started = time.perf_counter()
+            try:
+                return await turn
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+                if sampler is not None:
+                    sampler.stop()
+                duration_ms = (time.perf_counter() - started) * 1000
+                snapshot = peak = None
+                if self.track_allocations:
+                    peak = tracemalloc.get_traced_memory()[1]
+                    snapshot = tracemalloc.take_snapshot()
+                    if started_tracing:
+                        tracemalloc.stop()
+                self._write(session_id, turn_id, duration_ms, profiler, sampler, snapshot, peak)
+        finally:
+            self._busy.release()
+
+    def _write(self, session_id: str, turn_id: str, duration_ms: float, profiler: Optional[cProfile.Profile],
+               sampler: Optional[StackSampler], snapshot: Optional[tracemalloc.Snapshot], peak: Optional[int]) -> None:
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        base = os.path.join(self.output_dir, re.sub(r"[^\w.-]", "_", f"{session_id}_{turn_id}_{stamp}"))
+        name = f"{session_id} {turn_id} ({duration_ms:.0f} ms)"
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            if profiler is not None:
+                profiler.dump_stats(f"{base}.pstats")
+            if sampler is not None:
+                with open(f"{base}.speedscope.json", "w", encoding="utf-8") as f:
+                    json.dump(sampler.to_speedscope(name), f)
+            if snapshot is not None:
+                snapshot = snapshot.filter_traces([
+                    tracemalloc.Filter(False, tracemalloc.__file__),
+                    tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+                ])
+                stats = snapshot.statistics("lineno")
+                with open(f"{base}.alloc.txt", "w", encoding="utf-8") as f:
+                    f.write(f"{name}\n")
+                    f.write(f"Pic pendant le tour : {peak / 1024:.1f} KiB\n")
+                    f.write(f"Encore alloué en fin de tour : {sum(stat.size for stat in stats) / 1024:.1f} KiB\n\n")
+                    for stat in stats[:TOP_ALLOCATIONS]:
+                        f.write(f"{stat}\n")
+            self.counters.inc("profiled")
+        except OSError:
+            self.counters.inc("write_errors")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "sample_rate": self.sample_rate,
+            "sessions": sorted(self.sessions),
+            "output_dir": self.output_dir,
+            **{key: self.counters.get(key) for key in ("profiled", "skipped_busy", "write_errors")},
+        }
+
+# Instance globale
+turn_profiler = TurnProfiler()
@@ -0,0 +1,174 @@
+"""Routage des tours de conversation vers le déploiement Azure OpenAI adapté"""
+import os
+from enum import Enum
+from typing import Dict, Any, Optional
+from dotenv import load_dotenv
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models import BaseChatModel
+from langchain_openai import AzureChatOpenAI
+from bellai.core.governor import GovernedChatModel, get_governor
+from bellai.core.breaker import get_breaker
+from bellai.testing.cassette import CassetteChatModel, get_cassette
+from bellai.core.stats import LatencyHistogram, CounterSet
+from bellai.tools.intention_service import BOOKING_KEYWORDS, ESCALATION_TRIGGERS, CONCIERGE_KEYWORDS, ROUTE_KEYWORDS, TAXI_KEYWORDS
+
+load_dotenv()
+
+class ModelRoute(Enum):
+    """Routes de modèle disponibles"""
+    FAST = "fast"
+    MAIN = "main"
+
+# Mots-clés complémentaires pour l'estimation de complexité
+GREETING_WORDS = ["bonjour", "bonsoir", "salut", "hello", "hi", "coucou", "merci", "au revoir", "bonne nuit", "bonne journée"]
+CONFIRMATION_WORDS = ["oui", "ok", "d'accord", "volontiers", "confirme", "vas-y", "allez-y", "parfait"]
+INFO_KEYWORDS = ["horaire", "heure", "ouvert", "fermé", "prix", "tarif", "wifi", "wi-fi", "check-in", "check-out", "adresse", "contact"]
+
+# Profondeur d'outils attendue par intention
+EXPECTED_TOOL_DEPTH = {
+    "greeting": 1,
+    "info": 1,
+    "concierge": 2,
+    "escalation": 2,
+    "confirmation": 2,
+    "booking": 3,
+    "unknown": 2,
+}
+
+def detect_turn_intent(message: str) -> str:
+    """Intention grossière d'un message, sans appel au modèle"""
+    message_lower = message.lower().strip()
+
+    if any(word in message_lower for word in ESCALATION_TRIGGERS):
+        return "escalation"
+    if any(kw in message_lower for keywords in BOOKING_KEYWORDS.values() for kw in keywords):
+        return "booking"
+    if any(kw in message_lower for kw in CONCIERGE_KEYWORDS + ROUTE_KEYWORDS + TAXI_KEYWORDS):
+        return "concierge"
+    if any(kw in message_lower for kw in INFO_KEYWORDS):
+        return "info"
+
+    words = message_lower.replace("!", " ").replace(".", " ").replace(",", " ").replace("?", " ").split()
+    if words and words[0] in CONFIRMATION_WORDS and len(words) <= 3:
+        return "confirmation"
+    normalized = " ".join(words)
+    if any(normalized == word or normalized.startswith(word + " ") for word in GREETING_WORDS):
+        return "greeting"
+    return "unknown"
+
+class TokenUsageCallback(BaseCallbackHandler):
+    """Callback LangChain qui cumule les tokens consommés pendant un tour"""
+
+    def __init__(self):
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.llm_calls = 0
+
+    def on_llm_end(self, response, **kwargs) -> None:
+        self.llm_calls += 1
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    self.prompt_tokens += usage.get("input_tokens", 0)
+                    self.completion_tokens += usage.get("output_tokens", 0)
+
+class ModelRouter:
+    """Choisit le déploiement selon la complexité estimée du tour"""
+
+    def __init__(self):
+        # Seuils de complexité
+        self.fast_max_chars = int(os.getenv("BELLAI_ROUTER_FAST_MAX_CHARS", "60"))
+        self.fast_max_tool_depth = int(os.getenv("BELLAI_ROUTER_FAST_MAX_TOOL_DEPTH", "1"))
+        self.enabled = os.getenv("BELLAI_ROUTER_ENABLED", "true").lower() != "false"
+        self.governed = os.getenv("BELLAI_GOVERNOR_ENABLED", "true").lower() != "false"
+
+        # Déploiements par route (le rapide retombe sur le principal si non configuré)
+        main_deployment = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME")
+        self.deployments = {
+            ModelRoute.MAIN: main_deployment,
+            ModelRoute.FAST: os.getenv("AZURE_OPENAI_FAST_DEPLOYMENT_NAME", main_deployment),
+        }
+        self.max_tokens = {
+            ModelRoute.MAIN: 1000,
+            ModelRoute.FAST: int(os.getenv("BELLAI_ROUTER_FAST_MAX_TOKENS", "300")),
+        }
+
+        # Métriques par route
+        self.latency = {route: LatencyHistogram() for route in ModelRoute}
+        self.counters = CounterSet()
+
+    def build_model(self, route: ModelRoute) -> BaseChatModel:
+        """Instancie le modèle Azure OpenAI d'une route, derrière le régulateur de son déploiement"""
+        model = AzureChatOpenAI(
+            api_key=os.getenv("AZURE_OPENAI_API_KEY"),
+            azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+            api_version=os.getenv("AZURE_OPENAI_API_VERSION", "2024-10-21"),
+            deployment_name=self.deployments[route],
+            temperature=0.6,
+            max_tokens=self.max_tokens[route],
+            # Les 429 sont repris par le régulateur, qui en tient compte pour la concurrence
+            max_retries=0 if self.governed else 2
+        )
+        if self.governed:
+            model = GovernedChatModel(
+                inner=model,
+                governor=get_governor(self.deployments[route]),
+                max_output_tokens=self.max_tokens[route],
+                breaker=get_breaker("azure_openai"),
+            )
+        # Enregistrement / rejeu des échanges (BELLAI_CASSETTE) : en rejeu, ni Azure ni régulateur
+        cassette = get_cassette()
+        if cassette is not None:
+            model = CassetteChatModel(inner=model, cassette=cassette)
+        return model
+
+    def classify(self, message: str) -> Dict[str, Any]:
+        """Calcule les signaux de complexité d'un message"""
+        intent = detect_turn_intent(message)
+        return {
+            "length": len(message),
+            "intent": intent,
+            "expected_tool_depth": EXPECTED_TOOL_DEPTH[intent],
+        }
+
+    def route(self, message: str) -> ModelRoute:
+        """Sélectionne la route d'un message"""
+        if not self.enabled:
+            return ModelRoute.MAIN
+
+        signals = self.classify(message)
+        if (
+            signals["length"] <= self.fast_max_chars
+            and signals["intent"] in ("greeting", "info")
+            and signals["expected_tool_depth"] <= self.fast_max_tool_depth
+        ):
+            return ModelRoute.FAST
+        return ModelRoute.MAIN
+
+    def record(self, route: ModelRoute, duration: float, usage: Optional[TokenUsageCallback] = None, error: bool = False) -> None:
+        """Enregistre latence et consommation d'un tour"""
+        self.latency[route].observe(duration)
+        self.counters.inc(f"{route.value}.turns")
+        if error:
+            self.counters.inc(f"{route.value}.errors")
+        if usage:
+            self.counters.inc(f"{route.value}.llm_calls", usage.llm_calls)
+            self.counters.inc(f"{route.value}.prompt_tokens", usage.prompt_tokens)
+            self.counters.inc(f"{route.value}.completion_tokens", usage.completion_tokens)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Exporte les métriques par route"""
+        counters = self.counters.snapshot()
+        metrics = {}
+        for route in ModelRoute:
+            prefix = f"{route.value}."
+            metrics[route.value] = {
+                "deployment": self.deployments[route],
+                "latency": self.latency[route].snapshot(),
+                **{name[len(prefix):]: value for name, value in counters.items() if name.startswith(prefix)},
+            }
+        return metrics
+
+# Instance globale
+model_router = ModelRouter()
@@ -0,0 +1,129 @@
+"""Ordonnancement des tours par priorité : les escalades passent devant les demandes courantes"""
+import os
+import time
+import heapq
+import asyncio
+import itertools
+import threading
+from enum import IntEnum
+from typing import Dict, Any, Awaitable, Callable, List, Tuple
+from dotenv import load_dotenv
+from bellai.core.stats import LatencyHistogram, CounterSet
+from bellai.tools.intention_service import ESCALATION_TRIGGERS, URGENT_TRIGGERS, detect_escalation_need
+
+load_dotenv()
+
+class Priority(IntEnum):
+    """Priorités de tour (plus petit = plus urgent)"""
+    URGENT = 0
+    HIGH = 1
+    NORMAL = 2
+
+def classify_priority(message: str) -> Priority:
+    """Urgence d'un message avant tout appel au modèle (mêmes déclencheurs que detect_escalation_need)"""
+    message_lower = message.lower()
+    triggered = [word for word in ESCALATION_TRIGGERS if word in message_lower]
+    if not triggered:
+        return Priority.NORMAL
+    if any(word in URGENT_TRIGGERS for word in triggered):
+        return Priority.URGENT
+    return Priority.HIGH
+
+class TurnScheduler:
+    """File de priorité avec vieillissement devant l'exécution des tours"""
+
+    def __init__(self, max_concurrent: int = None, aging_seconds: float = None):
+        self.max_concurrent = max_concurrent or int(os.getenv("BELLAI_SCHEDULER_WORKERS", "16"))
+        # Un tour gagne un niveau de priorité par période d'attente (pas de famine)
+        self.aging_seconds = aging_seconds or float(os.getenv("BELLAI_SCHEDULER_AGING_S", "5"))
+
+        self.running = 0
+        self._heap: List[Tuple[float, int, asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+
+        self.queue_wait = {priority: LatencyHistogram() for priority in Priority}
+        self.latency = {priority: LatencyHistogram() for priority in Priority}
+        self.counters = CounterSet()
+
+    def _dispatch(self) -> None:
+        """Libère les tours en tête de file tant qu'il reste des places"""
+        with self._lock:
+            while self._heap and self.running < self.max_concurrent:
+                _, _, loop, ticket = heapq.heappop(self._heap)
+                if ticket.done():
+                    continue
+                self.running += 1
+                # Les tickets peuvent appartenir à une autre boucle (ex: Streamlit)
+                loop.call_soon_threadsafe(self._grant, ticket)
+
+    async def _acquire(self, priority: Priority) -> None:
+        loop = asyncio.get_running_loop()
+        ticket = loop.create_future()
+        # L'âge fait baisser la clé au même rythme pour tous : la clé reste statique
+        key = priority * self.aging_seconds + time.monotonic()
+        with self._lock:
+            heapq.heappush(self._heap, (key, next(self._sequence), loop, ticket))
+        self._dispatch()
+        try:
+            await ticket
+        except asyncio.CancelledError:
+            if ticket.done() and not ticket.cancelled():
+                self._release()
+            raise
+
+    def _grant(self, ticket: asyncio.Future) -> None:
+        if ticket.done():
+            # Tour annulé entre la sélection et l'attribution : rendre la place
+            self._release()
+        else:
+            ticket.set_result(None)
+
+    def _release(self) -> None:
+        with self._lock:
+            self.running -= 1
+        self._dispatch()
+
+    def dispatch_escalation(self, message: str, session_id: str) -> None:
+        """Crée immédiatement l'action d'escalade, sans attendre le modèle"""
+        result = detect_escalation_need.func(message, context=f"session:{session_id}")
+        if result.startswith("ESCALATION_NEEDED"):
+            self.counters.inc("escalations_dispatched")
+
+    async def submit(self, message: str, session_id: str,
+                     handler: Callable[[str, str], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Classe le tour, l'inscrit dans la file et l'exécute à son tour"""
+        priority = classify_priority(message)
+        self.counters.inc(f"{priority.name.lower()}.submitted")
+        if priority != Priority.NORMAL:
+            self.dispatch_escalation(message, session_id)
+
+        started = time.perf_counter()
+        await self._acquire(priority)
+        self.queue_wait[priority].observe(time.perf_counter() - started)
+        try:
+            result = await handler(message, session_id)
+        finally:
+            self._release()
+            self.latency[priority].observe(time.perf_counter() - started)
+        return {**result, "priority": priority.name.lower()}
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Profondeur de file, attente et latence par priorité"""
+        with self._lock:
+            depth, running = len(self._heap), self.running
+        counters = self.counters.snapshot()
+        return {
+            "queue_depth": depth,
+            "running": running,
+            "max_concurrent": self.max_concurrent,
+            "escalations_dispatched": counters.get("escalations_dispatched", 0),
+            "priorities": {
+                priority.name.lower(): {
+                    "submitted": counters.get(f"{priority.name.lower()}.submitted", 0),
+                    "queue_wait": self.queue_wait[priority].snapshot(),
+                    "latency": self.latency[priority].snapshot(),
+                }
+                for priority in Priority
+            },
+        }
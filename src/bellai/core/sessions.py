@@ -0,0 +1,197 @@
+"""Sérialisation des tours par session : ordre garanti par client, parallélisme entre clients"""
+import time
+import asyncio
+import itertools
+import threading
+from collections import deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, List, Optional
+from bellai.core.stats import LatencyHistogram, CounterSet
+
+# Session et tour en cours (propagés aux outils exécutés dans des threads)
+current_session: ContextVar[Optional[str]] = ContextVar("bellai_session", default=None)
+current_turn: ContextVar[Optional["TurnContext"]] = ContextVar("bellai_turn", default=None)
+
+_turn_ids = itertools.count(1)
+
+class TurnCancelled(Exception):
+    """Le tour en cours a été remplacé par un message plus récent"""
+
+class TurnContext:
+    """Tour de conversation en cours : message, tâche asyncio et signal d'annulation"""
+
+    def __init__(self, session_id: str, message: str):
+        self.turn_id = f"turn_{next(_turn_ids)}"
+        self.session_id = session_id
+        self.message = message
+        # Texte effectivement traité (fusionné avec le message remplacé, le cas échéant)
+        self.text = message
+        self.started_at = time.monotonic()
+        # Signal lisible depuis les threads des outils
+        self.cancelled = threading.Event()
+        self.superseded_by: Optional["TurnContext"] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.task: Optional[asyncio.Task] = None
+        self.finished = False
+        self.completed = False
+        # Échéance absolue du tour (time.monotonic), None si aucune
+        self.deadline: Optional[float] = None
+
+    def remaining(self) -> Optional[float]:
+        """Temps restant avant l'échéance du tour"""
+        return None if self.deadline is None else self.deadline - time.monotonic()
+
+    def attach(self, task: asyncio.Task) -> None:
+        """Associe la tâche qui exécute le tour"""
+        self.loop = task.get_loop()
+        self.task = task
+
+    def supersede(self, newer: "TurnContext") -> bool:
+        """Annule le tour au profit d'un message plus récent (False s'il est déjà terminé)"""
+        if self.finished or self.cancelled.is_set():
+            return False
+        self.superseded_by = newer
+        self.cancelled.set()
+        newer.text = f"{self.text}\n{newer.message}"
+        if self.task is not None:
+            # La tâche peut appartenir à une autre boucle (ex: Streamlit)
+            self.loop.call_soon_threadsafe(self.task.cancel)
+        return True
+
+class _AllCancelled:
+    """Signal levé seulement quand tous les tours participants sont annulés"""
+
+    def __init__(self, turns: List[Optional[TurnContext]]):
+        self.turns = turns
+
+    def is_set(self) -> bool:
+        return all(turn is not None and turn.cancelled.is_set() for turn in self.turns)
+
+class SharedTurn:
+    """Appel externe partagé entre plusieurs tours (single-flight) : annulé si tous le sont"""
+
+    def __init__(self, turn: Optional[TurnContext]):
+        self.turn_id = "shared"
+        self.turns = [turn]
+        self.cancelled = _AllCancelled(self.turns)
+
+    def join(self, turn: Optional[TurnContext]) -> None:
+        self.turns.append(turn)
+
+    def remaining(self) -> Optional[float]:
+        """L'appel partagé dispose du temps du tour le plus patient"""
+        remaining = [turn.remaining() if turn is not None else None for turn in self.turns]
+        return None if None in remaining else max(remaining)
+
+def raise_if_cancelled() -> None:
+    """À appeler avant un appel externe : évite le travail d'un tour déjà remplacé"""
+    turn = current_turn.get()
+    if turn is not None and turn.cancelled.is_set():
+        raise TurnCancelled(turn.turn_id)
+
+def remaining_time(default: float, minimum: float = 0.1) -> float:
+    """Timeout d'un appel externe : le défaut, borné par le temps restant du tour"""
+    turn = current_turn.get()
+    remaining = turn.remaining() if turn is not None else None
+    if remaining is None:
+        return default
+    return max(minimum, min(default, remaining))
+
+class SessionLocks:
+    """Verrous FIFO par session, utilisables depuis plusieurs boucles asyncio (ex: Streamlit)"""
+
+    def __init__(self):
+        # session -> file de (boucle, future) ; la tête détient le verrou
+        self._queues: Dict[str, deque] = {}
+        # session -> tour le plus récent (en cours ou en attente)
+        self._latest: Dict[str, TurnContext] = {}
+        self._lock = threading.Lock()
+        self.wait_time = LatencyHistogram()
+        self.counters = CounterSet()
+
+    @asynccontextmanager
+    async def hold(self, session_id: str):
+        """Exécute le bloc seul pour cette session, dans l'ordre d'arrivée"""
+        loop = asyncio.get_running_loop()
+        ticket = loop.create_future()
+        started = time.perf_counter()
+        with self._lock:
+            queue = self._queues.setdefault(session_id, deque())
+            queue.append((loop, ticket))
+            if len(queue) == 1:
+                ticket.set_result(None)
+            else:
+                self.counters.inc("contended")
+
+        try:
+            await ticket
+        except asyncio.CancelledError:
+            self._leave(session_id, ticket)
+            raise
+        self.wait_time.observe(time.perf_counter() - started)
+
+        try:
+            yield
+        finally:
+            self._leave(session_id, ticket)
+
+    def _leave(self, session_id: str, ticket: asyncio.Future) -> None:
+        """Quitte la file et passe la main au suivant"""
+        with self._lock:
+            queue = self._queues.get(session_id)
+            if not queue:
+                return
+            was_holder = queue[0][1] is ticket
+            for entry in queue:
+                if entry[1] is ticket:
+                    queue.remove(entry)
+                    break
+            if not queue:
+                del self._queues[session_id]
+            elif was_holder:
+                loop, successor = queue[0]
+                loop.call_soon_threadsafe(_wake, successor)
+
+    def effective_text(self, turn: TurnContext, previous: Optional[TurnContext]) -> str:
+        """Texte à traiter une fois le verrou obtenu (le tour remplacé a pu aboutir malgré tout)"""
+        if previous is not None and previous.superseded_by is turn and previous.completed:
+            return turn.message
+        return turn.text
+
+    def register(self, turn: TurnContext) -> Optional[TurnContext]:
+        """Déclare le tour le plus récent d'une session et retourne le précédent s'il est inachevé"""
+        with self._lock:
+            previous = self._latest.get(turn.session_id)
+            self._latest[turn.session_id] = turn
+        return previous if previous is not None and not previous.finished else None
+
+    def unregister(self, turn: TurnContext) -> None:
+        """Marque le tour terminé"""
+        turn.finished = True
+        with self._lock:
+            if self._latest.get(turn.session_id) is turn:
+                del self._latest[turn.session_id]
+
+    def is_busy(self, session_id: str) -> bool:
+        """Un tour est-il en cours pour cette session ?"""
+        with self._lock:
+            return session_id in self._queues
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Sessions actives, tours en attente et temps d'attente du verrou"""
+        with self._lock:
+            waiting = {session_id: len(queue) - 1 for session_id, queue in self._queues.items()}
+        return {
+            "active_sessions": len(waiting),
+            "waiting_turns": sum(waiting.values()),
+            "contended": self.counters.get("contended"),
+            "superseded": self.counters.get("superseded"),
+            "rolled_back_actions": self.counters.get("rolled_back_actions"),
+            "deadline_exceeded": self.counters.get("deadline_exceeded"),
+            "wait_time": self.wait_time.snapshot(),
+        }
+
+def _wake(ticket: asyncio.Future) -> None:
+    if not ticket.done():
+        ticket.set_result(None)
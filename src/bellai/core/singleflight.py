@@ -0,0 +1,135 @@
+"""Regroupement des appels externes identiques et simultanés (single-flight)"""
+import asyncio
+import threading
+from collections import Counter
+from concurrent.futures import Future
+from contextvars import copy_context
+from typing import Dict, Any, Callable, List, Tuple
+from langchain_core.tools import BaseTool, StructuredTool
+from bellai.core.prefetch import normalize_tool_args
+from bellai.core.sessions import SharedTurn, current_turn
+from bellai.core.stats import CounterSet
+
+# Nombre maximal de clés suivies dans les statistiques par clé
+MAX_TRACKED_KEYS = 1000
+
+class SingleFlight:
+    """Un seul appel en vol par clé : les appels concurrents identiques partagent son résultat"""
+
+    def __init__(self):
+        self._in_flight: Dict[str, Tuple[Future, List[int], SharedTurn]] = {}
+        self._lock = threading.Lock()
+        self.counters = CounterSet()
+        self.shared_by_key: Counter = Counter()
+        self.max_waiters = 0
+
+    def _join(self, key: str) -> Tuple[Future, bool, SharedTurn]:
+        """Rejoint l'appel en vol pour la clé, ou en devient le meneur"""
+        with self._lock:
+            self.counters.inc("calls")
+            entry = self._in_flight.get(key)
+            if entry is not None:
+                future, waiters, shared = entry
+                shared.join(current_turn.get())
+                waiters[0] += 1
+                self.max_waiters = max(self.max_waiters, waiters[0])
+                self.counters.inc("shared")
+                if key in self.shared_by_key or len(self.shared_by_key) < MAX_TRACKED_KEYS:
+                    self.shared_by_key[key] += 1
+                return future, False, shared
+            future, shared = Future(), SharedTurn(current_turn.get())
+            self._in_flight[key] = (future, [0], shared)
+            self.counters.inc("executions")
+            return future, True, shared
+
+    def _complete(self, key: str, future: Future, result: Any = None, error: BaseException = None) -> None:
+        with self._lock:
+            self._in_flight.pop(key, None)
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+            self.counters.inc("errors")
+        else:
+            future.set_result(result)
+
+    def do(self, key: str, fn: Callable, *args, **kwargs) -> Any:
+        """Exécute fn ou attend le résultat de l'appel identique déjà en cours"""
+        future, leader, shared = self._join(key)
+        if not leader:
+            # Attente bornée par le temps restant du tour de ce suiveur
+            turn = current_turn.get()
+            remaining = turn.remaining() if turn is not None else None
+            return future.result(timeout=None if remaining is None else max(0.0, remaining))
+        try:
+            result = copy_context().run(_run_shared, shared, fn, *args, **kwargs)
+        except BaseException as e:
+            self._complete(key, future, error=e)
+            raise
+        self._complete(key, future, result)
+        return result
+
+    async def ado(self, key: str, fn: Callable, *args, **kwargs) -> Any:
+        """Variante asynchrone : fn (synchrone) s'exécute dans un thread"""
+        future, leader, shared = self._join(key)
+        if not leader:
+            # Un suiveur annulé (échéance, tour remplacé) n'annule pas le résultat partagé des autres
+            return await asyncio.shield(asyncio.wrap_future(future))
+        call = asyncio.ensure_future(asyncio.to_thread(_run_shared, shared, fn, *args, **kwargs))
+        # Le résultat partagé ne dépend pas du meneur : s'il est annulé, l'appel aboutit pour les autres
+        call.add_done_callback(lambda done: self._complete_from(key, future, done))
+        return await asyncio.shield(call)
+
+    def _complete_from(self, key: str, future: Future, call: asyncio.Future) -> None:
+        if call.cancelled():
+            self._complete(key, future, error=asyncio.CancelledError())
+        elif call.exception() is not None:
+            self._complete(key, future, error=call.exception())
+        else:
+            self._complete(key, future, call.result())
+
+    def wrap_tool(self, tool: BaseTool) -> BaseTool:
+        """Enveloppe un outil pour regrouper ses appels identiques"""
+
+        def run(**kwargs):
+            return self.do(normalize_tool_args(tool, kwargs), tool.func, **kwargs)
+
+        async def arun(**kwargs):
+            return await self.ado(normalize_tool_args(tool, kwargs), tool.func, **kwargs)
+
+        return StructuredTool.from_function(
+            func=run,
+            coroutine=arun,
+            name=tool.name,
+            description=tool.description,
+            args_schema=tool.args_schema,
+            infer_schema=False,
+            return_direct=tool.return_direct,
+        )
+
+    def wrap_tools(self, tools: List[BaseTool], names: Tuple[str, ...] = ("get_route", "get_route_matrix", "search_places")) -> List[BaseTool]:
+        """Enveloppe les outils qui appellent des API externes"""
+        return [self.wrap_tool(tool) if tool.name in names else tool for tool in tools]
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Appels, exécutions réelles, appels partagés et attentes par clé"""
+        counters = self.counters.snapshot()
+        calls = counters.get("calls", 0)
+        with self._lock:
+            in_flight = {key: waiters[0] for key, (_, waiters, _) in self._in_flight.items()}
+            top_keys = dict(self.shared_by_key.most_common(10))
+        return {
+            **counters,
+            "saved_rate": round(counters.get("shared", 0) / calls, 3) if calls else None,
+            "max_waiters": self.max_waiters,
+            "in_flight": in_flight,
+            "top_shared_keys": top_keys,
+        }
+
+def _run_shared(shared: SharedTurn, fn: Callable, *args, **kwargs) -> Any:
+    """Exécute l'appel partagé : il n'est abandonné que si tous les tours en attente sont annulés"""
+    current_turn.set(shared)
+    return fn(*args, **kwargs)
+
+# Instance globale
+single_flight = SingleFlight()
@@ -0,0 +1,83 @@
+"""Primitives statistiques partagées par les composants de BellAI"""
+import threading
+from collections import deque
+from typing import Dict, Any, Iterable, Optional
+
+# Buckets de latence (secondes) communs à tous les histogrammes
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class LatencyHistogram:
+    """Histogramme de latences à buckets fixes avec réservoir pour les percentiles"""
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS, reservoir_size: int = 2048):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self._samples = deque(maxlen=reservoir_size)
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        """Enregistre une observation"""
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += value
+            self._samples.append(value)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Percentile approximatif calculé sur le réservoir récent"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        rank = min(len(samples) - 1, max(0, int(round(q / 100 * (len(samples) - 1)))))
+        return samples[rank]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Résumé sérialisable de l'histogramme"""
+        with self._lock:
+            counts = list(self.counts)
+            count, total = self.count, self.total
+        cumulative, buckets = 0, {}
+        for bound, n in zip(self.buckets, counts):
+            cumulative += n
+            buckets[str(bound)] = cumulative
+        buckets["+Inf"] = count
+        return {
+            "count": count,
+            "sum": round(total, 6),
+            "mean": round(total / count, 6) if count else None,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "buckets": buckets,
+        }
+
+
+class CounterSet:
+    """Ensemble de compteurs nommés protégé par un verrou"""
+
+    def __init__(self):
+        self._values: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, amount: float = 1) -> None:
+        """Incrémente un compteur"""
+        with self._lock:
+            self._values[name] = self._values.get(name, 0) + amount
+
+    def get(self, name: str) -> float:
+        """Valeur courante d'un compteur"""
+        return self._values.get(name, 0)
+
+    def snapshot(self) -> Dict[str, float]:
+        """Copie des compteurs"""
+        with self._lock:
+            return dict(self._values)
@@ -0,0 +1,482 @@
+"""Spans hiérarchiques des tours (tour → itération → appel au modèle / outil → requête HTTP)
+
+Les spans d'un tour restent en mémoire jusqu'à la fin du tour, puis le tour est gardé
+ou écarté (échantillonnage en fin de tour : erreurs et tours lents toujours gardés).
+Les tours gardés partent dans une file bornée vidée par un thread d'écriture : un
+tour n'attend jamais l'export, et si la file est pleine le tour est perdu (compté).
+Format : une ligne JSON par tour, au format OTLP/JSON (ExportTraceServiceRequest).
+
+Usage (vue d'une session):
+    python -m bellai.core.tracing traces.jsonl --session session_123
+    python -m bellai.core.tracing traces.jsonl --session session_123 --flame --last 3
+"""
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import random
+import argparse
+import threading
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit, urlunsplit
+from uuid import UUID
+import requests
+from dotenv import load_dotenv
+from langchain_core.callbacks import BaseCallbackHandler
+from bellai.core.stats import CounterSet
+
+load_dotenv()
+
+# Types de span OTLP
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_CLIENT = 3
+# Statuts OTLP
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+class Span:
+    """Span en cours d'enregistrement"""
+
+    recording = True
+
+    def __init__(self, tracer: "Tracer", trace: "_Trace", name: str, parent_id: Optional[str],
+                 kind: int = SPAN_KIND_INTERNAL, attributes: Optional[Dict[str, Any]] = None):
+        self.tracer = tracer
+        self.trace = trace
+        self.name = name
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.status = STATUS_OK
+        self.status_message = ""
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if value is not None:
+            self.attributes[key] = value
+
+    def set_attributes(self, attributes: Dict[str, Any]) -> None:
+        for key, value in attributes.items():
+            self.set_attribute(key, value)
+
+    def set_error(self, message: str) -> None:
+        self.status = STATUS_ERROR
+        self.status_message = message
+        self.trace.error = True
+
+    def end(self) -> None:
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        self.tracer._end(self)
+
+class _NoopSpan:
+    """Span d'un tour non tracé : toutes les opérations sont sans effet"""
+
+    recording = False
+    span_id = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_attributes(self, attributes: Dict[str, Any]) -> None:
+        pass
+
+    def set_error(self, message: str) -> None:
+        pass
+
+    def end(self) -> None:
+        pass
+
+NOOP_SPAN = _NoopSpan()
+
+class _Trace:
+    """Spans terminés d'un tour, en attente de la décision de garder le tour"""
+
+    def __init__(self):
+        self.trace_id = f"{random.getrandbits(128):032x}"
+        self.spans: List[Span] = []
+        self.error = False
+        self.closed = False
+        self.lock = threading.Lock()
+
+# Span courant (parent des requêtes HTTP émises par les outils)
+current_span: ContextVar = ContextVar("bellai_current_span", default=NOOP_SPAN)
+
+def _attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+def _otlp_span(span: Span) -> Dict[str, Any]:
+    otlp = {
+        "traceId": span.trace.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": span.kind,
+        "startTimeUnixNano": str(span.start_ns),
+        "endTimeUnixNano": str(span.end_ns),
+        "attributes": [_attribute(key, value) for key, value in span.attributes.items()],
+        "status": {"code": span.status, "message": span.status_message} if span.status_message else {"code": span.status},
+    }
+    if span.parent_id:
+        otlp["parentSpanId"] = span.parent_id
+    return otlp
+
+class Tracer:
+    """Création des spans, échantillonnage par tour et export asynchrone vers un fichier JSONL"""
+
+    def __init__(self, path: Optional[str] = None, sample_rate: Optional[float] = None,
+                 slow_ms: Optional[float] = None, max_buffer: Optional[int] = None):
+        self.path = path if path is not None else os.getenv("BELLAI_TRACE_FILE", "")
+        # Part des tours gardés ; les tours en erreur ou plus lents que slow_ms le sont toujours
+        self.sample_rate = sample_rate if sample_rate is not None else float(os.getenv("BELLAI_TRACE_SAMPLE", "1.0"))
+        self.slow_ms = slow_ms if slow_ms is not None else float(os.getenv("BELLAI_TRACE_SLOW_MS", "4000"))
+        self.max_buffer = max_buffer if max_buffer is not None else int(os.getenv("BELLAI_TRACE_BUFFER", "1000"))
+        self.counters = CounterSet()
+        self._queue: "queue.Queue" = queue.Queue(maxsize=self.max_buffer)
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def start_trace(self, name: str, attributes: Optional[Dict[str, Any]] = None):
+        """Span racine d'un tour (sans effet si le traçage est désactivé)"""
+        if not self.enabled:
+            return NOOP_SPAN
+        instrument_requests()
+        return Span(self, _Trace(), name, None, attributes=attributes)
+
+    def start_span(self, name: str, parent=None, kind: int = SPAN_KIND_INTERNAL,
+                   attributes: Optional[Dict[str, Any]] = None):
+        """Span enfant de `parent` (par défaut le span courant)"""
+        parent = parent if parent is not None else current_span.get()
+        if not parent.recording:
+            return NOOP_SPAN
+        return Span(parent.tracer, parent.trace, name, parent.span_id, kind, attributes)
+
+    def _end(self, span: Span) -> None:
+        trace = span.trace
+        with trace.lock:
+            if trace.closed:
+                # Span terminé après son tour (ex: préchargement non consommé) : non exporté
+                return
+            trace.spans.append(span)
+            if span.parent_id is not None:
+                return
+            trace.closed = True
+        duration_ms = (span.end_ns - span.start_ns) / 1e6
+        if not (trace.error or duration_ms >= self.slow_ms or random.random() < self.sample_rate):
+            self.counters.inc("sampled_out")
+            return
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait(trace.spans)
+            self.counters.inc("queued")
+        except queue.Full:
+            self.counters.inc("dropped")
+
+    def _ensure_writer(self) -> None:
+        if self._writer is not None:
+            return
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="bellai-tracing", daemon=True)
+                self._writer.start()
+                atexit.register(self.flush, 2.0)
+
+    def _write_loop(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    for spans in batch:
+                        f.write(json.dumps({"resourceSpans": [{
+                            "resource": {"attributes": [_attribute("service.name", "bellai")]},
+                            "scopeSpans": [{"scope": {"name": "bellai.core.tracing"},
+                                            "spans": [_otlp_span(span) for span in spans]}],
+                        }]}, ensure_ascii=False) + "\n")
+                self.counters.inc("exported", len(batch))
+            except OSError:
+                self.counters.inc("write_errors", len(batch))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Attend l'écriture des tours en file (tests, arrêt du process)"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "path": self.path,
+            "sample_rate": self.sample_rate,
+            "slow_ms": self.slow_ms,
+            "buffered": self._queue.qsize(),
+            **{key: self.counters.get(key) for key in ("queued", "exported", "sampled_out", "dropped", "write_errors")},
+        }
+
+# Instance globale
+tracer = Tracer()
+
+def instrument_requests() -> None:
+    """Span client pour chaque requête `requests` émise sous un span tracé (Google Routes, googlemaps)"""
+    original = requests.Session.send
+    if getattr(original, "_bellai_traced", False):
+        return
+
+    def send(session, request, **kwargs):
+        parent = current_span.get()
+        if not parent.recording:
+            return original(session, request, **kwargs)
+        parts = urlsplit(request.url)
+        span = parent.tracer.start_span(f"HTTP {request.method} {parts.hostname}", parent, SPAN_KIND_CLIENT, {
+            "http.request.method": request.method,
+            "server.address": parts.hostname,
+            # Sans la query string (clés d'API)
+            "url.full": urlunsplit(parts._replace(query="")),
+        })
+        try:
+            response = original(session, request, **kwargs)
+            span.set_attribute("http.response.status_code", response.status_code)
+            if response.status_code >= 400:
+                span.set_error(f"HTTP {response.status_code}")
+            return response
+        except Exception as e:
+            span.set_error(type(e).__name__)
+            raise
+        finally:
+            span.end()
+
+    send._bellai_traced = True
+    requests.Session.send = send
+
+class TracingCallback(BaseCallbackHandler):
+    """Callback LangChain : un span par itération de l'agent, avec ses appels au modèle et ses outils"""
+
+    run_inline = True
+
+    def __init__(self, turn_span):
+        self.turn_span = turn_span
+        self.iteration = 0
+        self.iteration_span = NOOP_SPAN
+        self._spans: Dict[UUID, Any] = {}
+        self._tokens: Dict[UUID, Any] = {}
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages, *, run_id: UUID, **kwargs) -> None:
+        self._start_llm(run_id, kwargs)
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts, *, run_id: UUID, **kwargs) -> None:
+        self._start_llm(run_id, kwargs)
+
+    def _start_llm(self, run_id: UUID, kwargs: Dict[str, Any]) -> None:
+        if not self.turn_span.recording:
+            return
+        # Chaque appel au modèle ouvre une itération, qui regroupe les outils qu'il demande
+        self.iteration_span.end()
+        self.iteration += 1
+        self.iteration_span = tracer.start_span("agent.iteration", self.turn_span,
+                                                attributes={"bellai.iteration": self.iteration})
+        params = kwargs.get("invocation_params") or {}
+        self._spans[run_id] = tracer.start_span("llm.call", self.iteration_span, SPAN_KIND_CLIENT, {
+            "gen_ai.request.model": params.get("model") or params.get("model_name") or params.get("_type"),
+        })
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs) -> None:
+        span = self._spans.pop(run_id, NOOP_SPAN)
+        input_tokens = output_tokens = cached_tokens = tool_calls = 0
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                usage = getattr(message, "usage_metadata", None)
+                if usage:
+                    input_tokens += usage.get("input_tokens", 0)
+                    output_tokens += usage.get("output_tokens", 0)
+                    cached_tokens += (usage.get("input_token_details") or {}).get("cache_read", 0)
+                tool_calls += len(getattr(message, "tool_calls", None) or [])
+        span.set_attributes({
+            "gen_ai.usage.input_tokens": input_tokens,
+            "gen_ai.usage.output_tokens": output_tokens,
+            "gen_ai.usage.cached_tokens": cached_tokens,
+            "bellai.tool_calls": tool_calls,
+            "bellai.outcome": "tool_calls" if tool_calls else "answer",
+        })
+        span.end()
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs) -> None:
+        span = self._spans.pop(run_id, NOOP_SPAN)
+        span.set_attribute("bellai.outcome", "error")
+        span.set_error(type(error).__name__)
+        span.end()
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID, **kwargs) -> None:
+        if not self.turn_span.recording:
+            return
+        name = (serialized or {}).get("name") or kwargs.get("name", "")
+        parent = self.iteration_span if self.iteration_span.recording else self.turn_span
+        span = tracer.start_span(f"tool {name}", parent, attributes={
+            "tool.name": name,
+            "bellai.session_id": self.turn_span.attributes.get("bellai.session_id"),
+        })
+        self._spans[run_id] = span
+        # Chaque outil s'exécute dans sa propre tâche : ses requêtes HTTP deviennent ses enfants
+        self._tokens[run_id] = current_span.set(span)
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs) -> None:
+        self._end_tool(run_id, None)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs) -> None:
+        self._end_tool(run_id, type(error).__name__)
+
+    def _end_tool(self, run_id: UUID, error: Optional[str]) -> None:
+        span = self._spans.pop(run_id, NOOP_SPAN)
+        token = self._tokens.pop(run_id, None)
+        if token is not None:
+            try:
+                current_span.reset(token)
+            except ValueError:
+                # Fin de l'outil notifiée depuis un autre contexte
+                pass
+        span.set_attribute("bellai.outcome", "error" if error else "success")
+        if error:
+            span.set_error(error)
+        span.end()
+
+    def finish(self) -> None:
+        """Ferme la dernière itération (fin du tour)"""
+        self.iteration_span.end()
+
+# --- Lecture et rendu d'un fichier de traces ---
+
+def _value(value: Dict[str, Any]) -> Any:
+    if "intValue" in value:
+        return int(value["intValue"])
+    for key in ("stringValue", "doubleValue", "boolValue"):
+        if key in value:
+            return value[key]
+    return None
+
+def load_traces(path: str) -> Dict[str, List[Dict[str, Any]]]:
+    """Spans par trace, attributs aplatis et durées en ms"""
+    traces: Dict[str, List[Dict[str, Any]]] = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            for resource in json.loads(line).get("resourceSpans", []):
+                for scope in resource.get("scopeSpans", []):
+                    for span in scope.get("spans", []):
+                        start, end = int(span["startTimeUnixNano"]), int(span["endTimeUnixNano"])
+                        traces.setdefault(span["traceId"], []).append({
+                            "span_id": span["spanId"],
+                            "parent_id": span.get("parentSpanId"),
+                            "name": span["name"],
+                            "start": start,
+                            "ms": (end - start) / 1e6,
+                            "error": span.get("status", {}).get("code") == STATUS_ERROR,
+                            "attributes": {a["key"]: _value(a["value"]) for a in span.get("attributes", [])},
+                        })
+    return traces
+
+def _root(spans: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    return next((span for span in spans if not span["parent_id"]), None)
+
+def session_traces(traces: Dict[str, List[Dict[str, Any]]], session_id: str) -> List[List[Dict[str, Any]]]:
+    """Tours de la session, par ordre chronologique"""
+    selected = [spans for spans in traces.values()
+                if (_root(spans) or {}).get("attributes", {}).get("bellai.session_id") == session_id]
+    return sorted(selected, key=lambda spans: _root(spans)["start"])
+
+# Attributs affichés dans l'arbre, par libellé court
+SUMMARY_ATTRIBUTES = {
+    "bellai.status": "status", "bellai.model_route": "route", "bellai.iteration": "#",
+    "gen_ai.usage.input_tokens": "in", "gen_ai.usage.output_tokens": "out",
+    "bellai.outcome": "outcome", "http.response.status_code": "http",
+}
+
+def _label(span: Dict[str, Any]) -> str:
+    details = " ".join(f"{short}={span['attributes'][key]}" for key, short in SUMMARY_ATTRIBUTES.items()
+                       if key in span["attributes"])
+    return f"{span['name']}  {span['ms']:.1f} ms{'  ERROR' if span['error'] else ''}{'  ' + details if details else ''}"
+
+def _children(spans: List[Dict[str, Any]]) -> Dict[Optional[str], List[Dict[str, Any]]]:
+    children: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    for span in sorted(spans, key=lambda s: s["start"]):
+        children.setdefault(span["parent_id"], []).append(span)
+    return children
+
+def render_tree(spans: List[Dict[str, Any]]) -> str:
+    """Arbre des spans d'un tour"""
+    children = _children(spans)
+    root = _root(spans)
+    lines = [_label(root)]
+
+    def walk(span_id: str, prefix: str) -> None:
+        kids = children.get(span_id, [])
+        for i, child in enumerate(kids):
+            last = i == len(kids) - 1
+            lines.append(f"{prefix}{'└─ ' if last else '├─ '}{_label(child)}")
+            walk(child["span_id"], prefix + ("   " if last else "│  "))
+
+    walk(root["span_id"], "")
+    return "\n".join(lines)
+
+def render_flame(spans: List[Dict[str, Any]], width: int = 60) -> str:
+    """Vue en cascade : position et longueur de chaque span à l'échelle du tour"""
+    children = _children(spans)
+    root = _root(spans)
+    scale = width / max(root["ms"], 1e-3)
+    lines = []
+
+    def walk(span: Dict[str, Any], depth: int) -> None:
+        offset = int((span["start"] - root["start"]) / 1e6 * scale)
+        length = max(1, int(span["ms"] * scale))
+        bar = (" " * offset + ("▒" if span["error"] else "█") * length)[:width].ljust(width)
+        lines.append(f"{('  ' * depth + span['name'])[:36]:<36} |{bar}| {span['ms']:8.1f} ms")
+        for child in children.get(span["span_id"], []):
+            walk(child, depth + 1)
+
+    walk(root, 0)
+    return "\n".join(lines)
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="Fichier de traces JSONL (BELLAI_TRACE_FILE)")
+    parser.add_argument("--session", required=True, help="Session à afficher")
+    parser.add_argument("--flame", action="store_true", help="Vue en cascade plutôt qu'en arbre")
+    parser.add_argument("--last", type=int, default=0, help="Seulement les N derniers tours")
+    args = parser.parse_args(argv)
+
+    turns = session_traces(load_traces(args.path), args.session)
+    if not turns:
+        parser.exit(1, f"Aucun tour tracé pour la session {args.session}\n")
+    for spans in turns[-args.last:] if args.last else turns:
+        print(render_flame(spans) if args.flame else render_tree(spans))
+        print()
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,180 @@
+"""Décomposition du temps et des tokens d'un tour (modèle, outils, mémoire) et agrégats du process"""
+import time
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional
+from uuid import UUID
+from pydantic import ConfigDict
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.memory import BaseMemory
+from bellai.core.stats import LatencyHistogram, CounterSet
+
+# Buckets du nombre d'itérations (appels au modèle) par tour
+ITERATION_BUCKETS = (1, 2, 3, 4, 5, 6, 8, 10)
+
+class TurnStatsCallback(BaseCallbackHandler):
+    """Callback LangChain qui chronomètre chaque appel au modèle et chaque outil du tour"""
+
+    # Horodatage au moment de l'événement, pas lors de l'exécution différée du handler
+    run_inline = True
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.llm_calls: List[Dict[str, Any]] = []
+        self.tools: List[Dict[str, Any]] = []
+        self.memory_ms = 0.0
+        self._llm_started: Dict[UUID, float] = {}
+        self._tools_started: Dict[UUID, tuple] = {}
+        self._lock = threading.Lock()
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages, *, run_id: UUID, **kwargs) -> None:
+        self._llm_started[run_id] = time.perf_counter()
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts, *, run_id: UUID, **kwargs) -> None:
+        self._llm_started[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs) -> None:
+        call = {"ms": self._elapsed(self._llm_started.pop(run_id, None)),
+                "prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0}
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    call["prompt_tokens"] += usage.get("input_tokens", 0)
+                    call["completion_tokens"] += usage.get("output_tokens", 0)
+                    call["cached_tokens"] += (usage.get("input_token_details") or {}).get("cache_read", 0)
+        with self._lock:
+            self.llm_calls.append(call)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs) -> None:
+        with self._lock:
+            self.llm_calls.append({"ms": self._elapsed(self._llm_started.pop(run_id, None)), "error": type(error).__name__})
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID, **kwargs) -> None:
+        name = (serialized or {}).get("name") or kwargs.get("name", "")
+        self._tools_started[run_id] = (name, time.perf_counter())
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs) -> None:
+        self._end_tool(run_id, None)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs) -> None:
+        self._end_tool(run_id, type(error).__name__)
+
+    def _end_tool(self, run_id: UUID, error: Optional[str]) -> None:
+        name, started = self._tools_started.pop(run_id, ("", None))
+        tool = {"name": name, "ms": self._elapsed(started)}
+        if error:
+            tool["error"] = error
+        with self._lock:
+            self.tools.append(tool)
+
+    @staticmethod
+    def _elapsed(started: Optional[float]) -> float:
+        return round((time.perf_counter() - started) * 1000, 2) if started is not None else 0.0
+
+    @contextmanager
+    def memory(self):
+        """Chronomètre une opération sur la mémoire de conversation"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.memory_ms += (time.perf_counter() - started) * 1000
+
+    def summary(self, wait_ms: float = 0.0) -> Dict[str, Any]:
+        """Décomposition du tour, jointe au résultat de process_message"""
+        with self._lock:
+            llm_calls, tools, memory_ms = list(self.llm_calls), list(self.tools), self.memory_ms
+        return {
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 2),
+            "wait_ms": round(wait_ms, 2),
+            "iterations": len(llm_calls),
+            "llm_ms": round(sum(call["ms"] for call in llm_calls), 2),
+            "tool_ms": round(sum(tool["ms"] for tool in tools), 2),
+            "memory_ms": round(memory_ms, 2),
+            "prompt_tokens": sum(call.get("prompt_tokens", 0) for call in llm_calls),
+            "completion_tokens": sum(call.get("completion_tokens", 0) for call in llm_calls),
+            "cached_tokens": sum(call.get("cached_tokens", 0) for call in llm_calls),
+            "llm_calls": llm_calls,
+            "tools": tools,
+        }
+
+class TimedMemory(BaseMemory):
+    """Mémoire LangChain de la session, dont les lectures et écritures sont chronométrées"""
+
+    inner: BaseMemory
+    stats: TurnStatsCallback
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    @property
+    def memory_variables(self) -> List[str]:
+        return self.inner.memory_variables
+
+    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        with self.stats.memory():
+            return self.inner.load_memory_variables(inputs)
+
+    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        with self.stats.memory():
+            self.inner.save_context(inputs, outputs)
+
+    # Mémoire en process : inutile de passer par un thread comme le fait BaseMemory
+    async def aload_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        return self.load_memory_variables(inputs)
+
+    async def asave_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        self.save_context(inputs, outputs)
+
+    def clear(self) -> None:
+        self.inner.clear()
+
+class TurnStatsAggregator:
+    """Histogrammes du process : tours, attente, appels au modèle, outils, mémoire, itérations"""
+
+    def __init__(self):
+        self.turn = LatencyHistogram()
+        self.wait = LatencyHistogram()
+        self.llm_call = LatencyHistogram()
+        self.memory = LatencyHistogram()
+        self.iterations = LatencyHistogram(buckets=ITERATION_BUCKETS)
+        self.tools: Dict[str, LatencyHistogram] = {}
+        self.counters = CounterSet()
+        self._lock = threading.Lock()
+
+    def record(self, summary: Dict[str, Any]) -> None:
+        """Ajoute la décomposition d'un tour (durées en ms, histogrammes en s)"""
+        self.turn.observe(summary["total_ms"] / 1000)
+        self.wait.observe(summary["wait_ms"] / 1000)
+        self.memory.observe(summary["memory_ms"] / 1000)
+        self.iterations.observe(summary["iterations"])
+        for call in summary["llm_calls"]:
+            self.llm_call.observe(call["ms"] / 1000)
+        for tool in summary["tools"]:
+            with self._lock:
+                histogram = self.tools.setdefault(tool["name"], LatencyHistogram())
+            histogram.observe(tool["ms"] / 1000)
+            if "error" in tool:
+                self.counters.inc("tool_errors")
+        self.counters.inc("turns")
+        self.counters.inc("llm_calls", summary["iterations"])
+        for key in ("prompt_tokens", "completion_tokens", "cached_tokens"):
+            self.counters.inc(key, summary[key])
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            tools = dict(self.tools)
+        return {
+            **{key: self.counters.get(key) for key in
+               ("turns", "llm_calls", "prompt_tokens", "completion_tokens", "cached_tokens", "tool_errors")},
+            "turn": self.turn.snapshot(),
+            "wait": self.wait.snapshot(),
+            "llm_call": self.llm_call.snapshot(),
+            "memory": self.memory.snapshot(),
+            "iterations": self.iterations.snapshot(),
+            "tools": {name: histogram.snapshot() for name, histogram in tools.items()},
+        }
+
+# Instance globale
+turn_stats = TurnStatsAggregator()
@@ -0,0 +1,18 @@
+"""Fonctions géographiques partagées par les routeurs locaux"""
+import numpy as np
+
+EARTH_RADIUS_M = 6371008.8
+
+# Vitesse de marche moyenne d'un piéton (m/s)
+WALKING_SPEED_MPS = 1.25
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """Distance orthodromique en mètres (scalaire ou vectorisée NumPy)"""
+    lat1, lon1 = np.radians(lat1), np.radians(lon1)
+    lat2, lon2 = np.radians(lat2), np.radians(lon2)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+def walking_seconds(distance_m: float) -> int:
+    """Durée de marche pour une distance donnée"""
+    return int(round(distance_m / WALKING_SPEED_MPS))
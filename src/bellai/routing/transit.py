@@ -0,0 +1,354 @@
+"""Routage hors ligne en transports en commun (GTFS + RAPTOR)"""
+import os
+import csv
+from functools import lru_cache
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+from bellai.routing.geo import haversine_m, walking_seconds
+from bellai.tools.route_result import RouteResult, RouteLeg, TransitLine
+
+INF = np.iinfo(np.int32).max
+
+# Types de véhicule GTFS (route_type) -> libellé
+VEHICLE_NAMES = {0: "Tramway", 1: "Métro", 2: "Train", 3: "Bus", 7: "Funiculaire"}
+
+# Rayons de marche pour l'accès aux arrêts et les correspondances (m)
+ACCESS_RADIUS_M = float(os.getenv("BELLAI_TRANSIT_ACCESS_RADIUS_M", "800"))
+TRANSFER_RADIUS_M = float(os.getenv("BELLAI_TRANSIT_TRANSFER_RADIUS_M", "250"))
+
+def _parse_time(value: str) -> int:
+    """HH:MM:SS (éventuellement > 24h) -> secondes depuis minuit"""
+    hours, minutes, seconds = value.strip().split(":")
+    return int(hours) * 3600 + int(minutes) * 60 + int(seconds)
+
+def _format_time(seconds: int) -> str:
+    return f"{(seconds // 3600) % 24:02d}:{(seconds % 3600) // 60:02d}"
+
+def _read(path: str, name: str) -> List[Dict[str, str]]:
+    file_path = os.path.join(path, name)
+    if not os.path.exists(file_path):
+        return []
+    with open(file_path, "r", encoding="utf-8-sig", newline="") as f:
+        return list(csv.DictReader(f))
+
+class TransitTimetable:
+    """Horaires GTFS compactés en tableaux NumPy, regroupés par motif d'arrêts"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._load_stops()
+        self._load_calendar()
+        self._load_patterns()
+        self._build_transfers()
+
+    def _load_stops(self) -> None:
+        rows = [row for row in _read(self.path, "stops.txt") if row.get("location_type", "0") in ("", "0")]
+        self.stop_ids = [row["stop_id"] for row in rows]
+        self.stop_names = [row["stop_name"] for row in rows]
+        self.stop_index = {stop_id: i for i, stop_id in enumerate(self.stop_ids)}
+        self.stop_lats = np.array([float(row["stop_lat"]) for row in rows], dtype=np.float64)
+        self.stop_lons = np.array([float(row["stop_lon"]) for row in rows], dtype=np.float64)
+
+    def _load_calendar(self) -> None:
+        self.calendar = {row["service_id"]: row for row in _read(self.path, "calendar.txt")}
+        self.calendar_dates: Dict[str, Dict[str, int]] = defaultdict(dict)
+        for row in _read(self.path, "calendar_dates.txt"):
+            self.calendar_dates[row["service_id"]][row["date"]] = int(row["exception_type"])
+
+    def _load_patterns(self) -> None:
+        routes = {row["route_id"]: row for row in _read(self.path, "routes.txt")}
+        trips = {row["trip_id"]: row for row in _read(self.path, "trips.txt")}
+
+        stop_times: Dict[str, List[Tuple[int, int, int, int]]] = defaultdict(list)
+        for row in _read(self.path, "stop_times.txt"):
+            stop = self.stop_index.get(row["stop_id"])
+            if stop is None:
+                continue
+            stop_times[row["trip_id"]].append(
+                (int(row["stop_sequence"]), stop, _parse_time(row["arrival_time"]), _parse_time(row["departure_time"]))
+            )
+
+        # Un motif = une ligne + une séquence d'arrêts identique
+        grouped: Dict[Tuple, List[Tuple[str, List]]] = defaultdict(list)
+        for trip_id, times in stop_times.items():
+            times.sort()
+            route_id = trips[trip_id]["route_id"]
+            grouped[(route_id, tuple(stop for _, stop, _, _ in times))].append((trip_id, times))
+
+        self.service_ids = sorted({trip["service_id"] for trip in trips.values()})
+        service_index = {service_id: i for i, service_id in enumerate(self.service_ids)}
+
+        self.pattern_stops: List[np.ndarray] = []
+        self.pattern_arrivals: List[np.ndarray] = []
+        self.pattern_departures: List[np.ndarray] = []
+        self.pattern_services: List[np.ndarray] = []
+        self.pattern_routes: List[Dict[str, str]] = []
+        self.pattern_headsigns: List[List[str]] = []
+        for (route_id, stops), pattern_trips in grouped.items():
+            pattern_trips.sort(key=lambda item: item[1][0][3])
+            self.pattern_stops.append(np.array(stops, dtype=np.int32))
+            self.pattern_arrivals.append(np.array([[t[2] for t in times] for _, times in pattern_trips], dtype=np.int32))
+            self.pattern_departures.append(np.array([[t[3] for t in times] for _, times in pattern_trips], dtype=np.int32))
+            self.pattern_services.append(np.array([service_index[trips[trip_id]["service_id"]] for trip_id, _ in pattern_trips], dtype=np.int32))
+            self.pattern_routes.append(routes.get(route_id, {"route_id": route_id}))
+            self.pattern_headsigns.append([trips[trip_id].get("trip_headsign") or self.stop_names[stops[-1]] for trip_id, _ in pattern_trips])
+
+        # Index arrêt -> (motif, position) au format CSR
+        pairs = sorted((int(stop), p, pos) for p, stops in enumerate(self.pattern_stops) for pos, stop in enumerate(stops))
+        counts = np.bincount(np.array([stop for stop, _, _ in pairs], dtype=np.int64), minlength=len(self.stop_ids))
+        self.stop_pattern_offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int32)
+        self.stop_pattern_ids = np.array([p for _, p, _ in pairs], dtype=np.int32)
+        self.stop_pattern_positions = np.array([pos for _, _, pos in pairs], dtype=np.int32)
+
+    def _build_transfers(self) -> None:
+        """Correspondances à pied : transfers.txt + arrêts proches (grille spatiale)"""
+        transfers: Dict[Tuple[int, int], int] = {}
+
+        # Cellules d'environ TRANSFER_RADIUS_M de côté (longitude corrigée de la latitude)
+        cell = TRANSFER_RADIUS_M / 111_000
+        lon_scale = np.cos(np.radians(self.stop_lats.mean())) if len(self.stop_ids) else 1.0
+        grid: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+        cells = np.floor(np.stack([self.stop_lats, self.stop_lons * lon_scale], axis=1) / cell).astype(np.int64)
+        for stop, (x, y) in enumerate(cells):
+            grid[(int(x), int(y))].append(stop)
+        for stop, (x, y) in enumerate(cells):
+            neighbours = np.array([n for dx in (-1, 0, 1) for dy in (-1, 0, 1) for n in grid.get((int(x) + dx, int(y) + dy), []) if n != stop], dtype=np.int64)
+            if neighbours.size == 0:
+                continue
+            distances = haversine_m(self.stop_lats[stop], self.stop_lons[stop], self.stop_lats[neighbours], self.stop_lons[neighbours])
+            for neighbour, distance in zip(neighbours[distances <= TRANSFER_RADIUS_M], distances[distances <= TRANSFER_RADIUS_M]):
+                transfers[(stop, int(neighbour))] = walking_seconds(float(distance))
+
+        for row in _read(self.path, "transfers.txt"):
+            source, target = self.stop_index.get(row["from_stop_id"]), self.stop_index.get(row["to_stop_id"])
+            if source is None or target is None or source == target or row.get("transfer_type") == "3":
+                continue
+            transfers[(source, target)] = int(row.get("min_transfer_time") or 0)
+
+        ordered = sorted(transfers.items())
+        counts = np.bincount(np.array([source for (source, _), _ in ordered], dtype=np.int64), minlength=len(self.stop_ids))
+        self.transfer_offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int32)
+        self.transfer_targets = np.array([target for (_, target), _ in ordered], dtype=np.int32)
+        self.transfer_seconds = np.array([seconds for _, seconds in ordered], dtype=np.int32)
+
+    def active_services(self, day: date) -> np.ndarray:
+        """Masque des services circulant le jour donné (tous si pas de calendrier)"""
+        if not self.calendar and not self.calendar_dates:
+            return np.ones(len(self.service_ids), dtype=bool)
+
+        weekday = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"][day.weekday()]
+        day_str = day.strftime("%Y%m%d")
+        active = np.zeros(len(self.service_ids), dtype=bool)
+        for i, service_id in enumerate(self.service_ids):
+            row = self.calendar.get(service_id)
+            if row:
+                active[i] = row[weekday] == "1" and row["start_date"] <= day_str <= row["end_date"]
+            exception = self.calendar_dates.get(service_id, {}).get(day_str)
+            if exception == 1:
+                active[i] = True
+            elif exception == 2:
+                active[i] = False
+        return active
+
+    def stops_near(self, lat: float, lon: float, radius_m: float = ACCESS_RADIUS_M) -> Dict[int, int]:
+        """Arrêts accessibles à pied depuis un point -> durée de marche (s)"""
+        distances = haversine_m(lat, lon, self.stop_lats, self.stop_lons)
+        nearby = np.nonzero(distances <= radius_m)[0]
+        return {int(stop): walking_seconds(float(distances[stop])) for stop in nearby}
+
+class RaptorRouter:
+    """Recherche d'itinéraires au plus tôt (Round-bAsed Public Transit Optimized Router)"""
+
+    def __init__(self, timetable: TransitTimetable, max_rounds: int = 5):
+        self.timetable = timetable
+        self.max_rounds = max_rounds
+
+    def _earliest_trip(self, pattern: int, pos: int, time: int, active: np.ndarray) -> int:
+        """Premier voyage actif partant de la position après l'heure donnée, ou -1"""
+        departures = self.timetable.pattern_departures[pattern][:, pos]
+        services = self.timetable.pattern_services[pattern]
+        for trip in range(bisect_left(departures, time), len(departures)):
+            if active[services[trip]]:
+                return trip
+        return -1
+
+    def earliest_arrival(self, sources: Dict[int, int], targets: Dict[int, int], departure: int,
+                         day: date) -> Optional[Dict[str, Any]]:
+        """RAPTOR depuis des arrêts sources (marche d'accès) vers des arrêts cibles"""
+        tt = self.timetable
+        n_stops = len(tt.stop_ids)
+        active = tt.active_services(day)
+
+        tau = np.full((self.max_rounds + 1, n_stops), INF, dtype=np.int64)
+        best = np.full(n_stops, INF, dtype=np.int64)
+        labels: List[Dict[int, Tuple]] = [dict() for _ in range(self.max_rounds + 1)]
+
+        for stop, walk in sources.items():
+            tau[0, stop] = best[stop] = departure + walk
+            labels[0][stop] = ("access", walk)
+        marked = set(sources)
+        target_bound = INF
+
+        for k in range(1, self.max_rounds + 1):
+            # Motifs à parcourir, depuis la première position marquée
+            queue: Dict[int, int] = {}
+            for stop in marked:
+                for i in range(tt.stop_pattern_offsets[stop], tt.stop_pattern_offsets[stop + 1]):
+                    pattern, pos = int(tt.stop_pattern_ids[i]), int(tt.stop_pattern_positions[i])
+                    if pos < queue.get(pattern, INF):
+                        queue[pattern] = pos
+            marked = set()
+
+            for pattern, start in queue.items():
+                stops = tt.pattern_stops[pattern]
+                arrivals = tt.pattern_arrivals[pattern]
+                departures = tt.pattern_departures[pattern]
+                trip, board = -1, -1
+                for pos in range(start, len(stops)):
+                    stop = int(stops[pos])
+                    if trip >= 0:
+                        arrival = int(arrivals[trip, pos])
+                        if arrival < min(best[stop], target_bound):
+                            tau[k, stop] = best[stop] = arrival
+                            labels[k][stop] = ("transit", pattern, trip, board, pos)
+                            marked.add(stop)
+                    previous = tau[k - 1, stop]
+                    if previous < INF and (trip < 0 or previous <= departures[trip, pos]):
+                        candidate = self._earliest_trip(pattern, pos, int(previous), active)
+                        if candidate >= 0 and (trip < 0 or candidate < trip):
+                            trip, board = candidate, pos
+
+            # Correspondances à pied depuis les arrêts atteints en transport
+            for stop in [s for s in marked if labels[k][s][0] == "transit"]:
+                for i in range(tt.transfer_offsets[stop], tt.transfer_offsets[stop + 1]):
+                    target, walk = int(tt.transfer_targets[i]), int(tt.transfer_seconds[i])
+                    arrival = tau[k, stop] + walk
+                    if arrival < min(best[target], target_bound):
+                        tau[k, target] = best[target] = arrival
+                        labels[k][target] = ("walk", stop, walk)
+                        marked.add(target)
+
+            for stop, egress in targets.items():
+                if tau[k, stop] < INF:
+                    target_bound = min(target_bound, int(tau[k, stop]) + egress)
+            if not marked:
+                break
+
+        # Meilleure arrivée finale (marche de sortie incluse)
+        best_arrival, best_round, best_stop = INF, -1, -1
+        for k in range(1, self.max_rounds + 1):
+            for stop, egress in targets.items():
+                if tau[k, stop] < INF and tau[k, stop] + egress < best_arrival:
+                    best_arrival, best_round, best_stop = int(tau[k, stop] + egress), k, stop
+        if best_round < 0:
+            return None
+
+        # Reconstruction du trajet en remontant les étiquettes
+        segments, stop, k = [], best_stop, best_round
+        while True:
+            label = labels[k][stop]
+            if label[0] == "access":
+                segments.append(("access", stop, label[1]))
+                break
+            if label[0] == "walk":
+                segments.append(("walk", label[1], stop, label[2]))
+                stop = label[1]
+            else:
+                _, pattern, trip, board, alight = label
+                segments.append(("transit", pattern, trip, board, alight))
+                stop = int(tt.pattern_stops[pattern][board])
+                k -= 1
+        segments.reverse()
+        return {"arrival": best_arrival, "egress": targets[best_stop], "target_stop": best_stop, "segments": segments, "rounds": best_round}
+
+    def route(self, origin: Tuple[float, float], destination: Tuple[float, float], departure_time: datetime,
+              origin_name: str = "", destination_name: str = "") -> Optional[RouteResult]:
+        """Itinéraire au plus tôt entre deux coordonnées, au format get_route"""
+        tt = self.timetable
+        sources = tt.stops_near(*origin)
+        targets = tt.stops_near(*destination)
+        if not sources or not targets:
+            return None
+
+        departure = departure_time.hour * 3600 + departure_time.minute * 60 + departure_time.second
+        journey = self.earliest_arrival(sources, targets, departure, departure_time.date())
+        if journey is None:
+            return None
+
+        legs: List[RouteLeg] = []
+        steps: List[Dict[str, Any]] = []
+        distance_total = 0
+
+        def add_walk(distance: float, seconds: int, instruction: str) -> None:
+            nonlocal distance_total
+            distance_total += int(distance)
+            if legs and legs[-1].mode == "WALK":
+                legs[-1].distance_meters += int(distance)
+                legs[-1].duration_seconds += seconds
+                legs[-1].instructions.append(instruction)
+            else:
+                legs.append(RouteLeg(mode="WALK", distance_meters=int(distance), duration_seconds=seconds, instructions=[instruction]))
+            steps.append({"travelMode": "WALK", "distanceMeters": int(distance), "staticDuration": f"{seconds}s",
+                          "navigationInstruction": {"instructions": instruction}})
+
+        for segment in journey["segments"]:
+            if segment[0] == "access":
+                stop = segment[1]
+                distance = float(haversine_m(origin[0], origin[1], tt.stop_lats[stop], tt.stop_lons[stop]))
+                add_walk(distance, segment[2], f"Marcher jusqu'à {tt.stop_names[stop]}")
+            elif segment[0] == "walk":
+                _, source, target, seconds = segment
+                distance = float(haversine_m(tt.stop_lats[source], tt.stop_lons[source], tt.stop_lats[target], tt.stop_lons[target]))
+                add_walk(distance, seconds, f"Correspondance vers {tt.stop_names[target]}")
+            else:
+                _, pattern, trip, board, alight = segment
+                stops = tt.pattern_stops[pattern][board:alight + 1]
+                distance = int(np.sum(haversine_m(tt.stop_lats[stops[:-1]], tt.stop_lons[stops[:-1]],
+                                                   tt.stop_lats[stops[1:]], tt.stop_lons[stops[1:]])))
+                departure_at = int(tt.pattern_departures[pattern][trip, board])
+                arrival_at = int(tt.pattern_arrivals[pattern][trip, alight])
+                route = tt.pattern_routes[pattern]
+                line = TransitLine(
+                    name=route.get("route_short_name") or route.get("route_long_name") or route["route_id"],
+                    vehicle=VEHICLE_NAMES.get(int(route.get("route_type") or -1), "Transport"),
+                    headsign=tt.pattern_headsigns[pattern][trip],
+                    departure_stop=tt.stop_names[stops[0]],
+                    arrival_stop=tt.stop_names[stops[-1]],
+                    departure_time=_format_time(departure_at),
+                    arrival_time=_format_time(arrival_at),
+                    stop_count=int(alight - board),
+                )
+                distance_total += distance
+                legs.append(RouteLeg(mode="TRANSIT", distance_meters=distance, duration_seconds=arrival_at - departure_at, transit=line))
+                steps.append({"travelMode": "TRANSIT", "distanceMeters": distance, "staticDuration": f"{arrival_at - departure_at}s",
+                              "transitDetails": {"headsign": line.headsign, "stopCount": line.stop_count,
+                                                 "transitLine": {"name": line.name, "vehicle": {"name": {"text": line.vehicle}}},
+                                                 "stopDetails": {"departureStop": {"name": line.departure_stop}, "arrivalStop": {"name": line.arrival_stop}},
+                                                 "localizedValues": {"departureTime": {"time": {"text": line.departure_time}},
+                                                                     "arrivalTime": {"time": {"text": line.arrival_time}}}}})
+
+        target = journey["target_stop"]
+        egress_distance = float(haversine_m(tt.stop_lats[target], tt.stop_lons[target], destination[0], destination[1]))
+        add_walk(egress_distance, journey["egress"], "Marcher jusqu'à destination")
+
+        return RouteResult(
+            origin=origin_name,
+            destination=destination_name,
+            travel_mode="TRANSIT",
+            distance_meters=distance_total,
+            duration_seconds=journey["arrival"] - departure,
+            legs=legs,
+            steps=steps,
+            source="gtfs",
+        )
+
+@lru_cache(maxsize=1)
+def get_transit_router() -> Optional[RaptorRouter]:
+    """Routeur hors ligne chargé au premier appel si BELLAI_GTFS_PATH est configuré"""
+    path = os.getenv("BELLAI_GTFS_PATH")
+    if not path or not os.path.isdir(path):
+        return None
+    return RaptorRouter(TransitTimetable(path))
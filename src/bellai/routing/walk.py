@@ -0,0 +1,179 @@
+"""Routage piéton local sur un graphe de rues OSM (CSR + A*)"""
+import os
+import json
+import heapq
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+from bellai.routing.geo import haversine_m, walking_seconds
+from bellai.tools.route_result import RouteResult, RouteLeg
+
+# Distance maximale entre un point demandé et le nœud du graphe le plus proche (m)
+MAX_SNAP_DISTANCE_M = float(os.getenv("BELLAI_WALK_MAX_SNAP_M", "300"))
+
+def _bearing(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Cap en degrés (0 = nord) d'un point vers un autre"""
+    lat1, lat2 = np.radians(lat1), np.radians(lat2)
+    dlon = np.radians(lon2 - lon1)
+    x = np.sin(dlon) * np.cos(lat2)
+    y = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(dlon)
+    return float((np.degrees(np.arctan2(x, y)) + 360) % 360)
+
+def _turn(previous_bearing: float, bearing: float) -> str:
+    """Instruction de changement de direction"""
+    delta = (bearing - previous_bearing + 540) % 360 - 180
+    if abs(delta) < 30:
+        return "Continuer"
+    if abs(delta) > 150:
+        return "Faire demi-tour"
+    side = "droite" if delta > 0 else "gauche"
+    return f"Tourner légèrement à {side}" if abs(delta) < 60 else f"Tourner à {side}"
+
+class WalkGraph:
+    """Graphe piéton en tableaux CSR (offsets, cibles, longueurs, noms de rue)"""
+
+    def __init__(self, path: str):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        node_ids = [node[0] for node in data["nodes"]]
+        index = {node_id: i for i, node_id in enumerate(node_ids)}
+        self.node_ids = node_ids
+        self.lats = np.array([node[1] for node in data["nodes"]], dtype=np.float64)
+        self.lons = np.array([node[2] for node in data["nodes"]], dtype=np.float64)
+
+        self.street_names: List[str] = []
+        name_index: Dict[str, int] = {}
+        edges: List[Tuple[int, int, float, int]] = []
+        for edge in data["edges"]:
+            u, v = index[edge[0]], index[edge[1]]
+            length = float(edge[2]) if len(edge) > 2 and edge[2] is not None else float(haversine_m(self.lats[u], self.lons[u], self.lats[v], self.lons[v]))
+            name = edge[3] if len(edge) > 3 and edge[3] else ""
+            if name not in name_index:
+                name_index[name] = len(self.street_names)
+                self.street_names.append(name)
+            edges.append((u, v, length, name_index[name]))
+            # Les piétons circulent dans les deux sens, sauf mention contraire
+            if not (len(edge) > 4 and edge[4] == "oneway"):
+                edges.append((v, u, length, name_index[name]))
+
+        edges.sort()
+        sources = np.array([e[0] for e in edges], dtype=np.int64)
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(sources, minlength=len(node_ids)))]).astype(np.int32)
+        self.targets = np.array([e[1] for e in edges], dtype=np.int32)
+        self.lengths = np.array([e[2] for e in edges], dtype=np.float32)
+        self.names = np.array([e[3] for e in edges], dtype=np.int32)
+
+    def nearest_node(self, lat: float, lon: float) -> Tuple[int, float]:
+        """Nœud le plus proche d'un point et distance associée"""
+        distances = haversine_m(lat, lon, self.lats, self.lons)
+        node = int(np.argmin(distances))
+        return node, float(distances[node])
+
+    def astar(self, source: int, target: int) -> Optional[Tuple[List[int], List[int]]]:
+        """Plus court chemin A* (heuristique haversine) -> (nœuds, arêtes)"""
+        target_lat, target_lon = self.lats[target], self.lons[target]
+        offsets, targets, lengths = self.offsets, self.targets, self.lengths
+
+        n = len(self.node_ids)
+        g = np.full(n, np.inf)
+        parent_node = np.full(n, -1, dtype=np.int64)
+        parent_edge = np.full(n, -1, dtype=np.int64)
+        closed = np.zeros(n, dtype=bool)
+        g[source] = 0.0
+        heap = [(float(haversine_m(self.lats[source], self.lons[source], target_lat, target_lon)), source)]
+
+        while heap:
+            _, node = heapq.heappop(heap)
+            if node == target:
+                nodes, edges = [node], []
+                while parent_node[node] >= 0:
+                    edges.append(int(parent_edge[node]))
+                    node = int(parent_node[node])
+                    nodes.append(node)
+                return nodes[::-1], edges[::-1]
+            if closed[node]:
+                continue
+            closed[node] = True
+
+            start, end = offsets[node], offsets[node + 1]
+            if start == end:
+                continue
+            neighbours = targets[start:end]
+            costs = g[node] + lengths[start:end]
+            # Relâchement et heuristique vectorisés sur tous les voisins
+            improved = (costs < g[neighbours]) & ~closed[neighbours]
+            if not improved.any():
+                continue
+            better = neighbours[improved]
+            g[better] = costs[improved]
+            parent_node[better] = node
+            parent_edge[better] = np.arange(start, end)[improved]
+            h = haversine_m(target_lat, target_lon, self.lats[better], self.lons[better])
+            for neighbour, f in zip(better.tolist(), (costs[improved] + h).tolist()):
+                heapq.heappush(heap, (f, neighbour))
+        return None
+
+class WalkRouter:
+    """Itinéraires à pied au format get_route"""
+
+    def __init__(self, graph: WalkGraph):
+        self.graph = graph
+
+    def route(self, origin: Tuple[float, float], destination: Tuple[float, float],
+              origin_name: str = "", destination_name: str = "") -> Optional[RouteResult]:
+        graph = self.graph
+        source, source_snap = graph.nearest_node(*origin)
+        target, target_snap = graph.nearest_node(*destination)
+        if max(source_snap, target_snap) > MAX_SNAP_DISTANCE_M:
+            return None
+
+        path = graph.astar(source, target)
+        if path is None:
+            return None
+        nodes, edges = path
+
+        # Regrouper les arêtes consécutives d'une même rue en manœuvres
+        maneuvers: List[Dict[str, Any]] = []
+        previous_bearing = None
+        for node, next_node, edge in zip(nodes[:-1], nodes[1:], edges):
+            name = graph.street_names[graph.names[edge]] or "voie sans nom"
+            length = float(graph.lengths[edge])
+            bearing = _bearing(graph.lats[node], graph.lons[node], graph.lats[next_node], graph.lons[next_node])
+            if maneuvers and maneuvers[-1]["street"] == name:
+                maneuvers[-1]["distance"] += length
+            else:
+                action = "Partir" if previous_bearing is None else _turn(previous_bearing, bearing)
+                maneuvers.append({"street": name, "distance": length, "instruction": f"{action} sur {name}"})
+            previous_bearing = bearing
+
+        distance = int(round(source_snap + target_snap + sum(m["distance"] for m in maneuvers)))
+        duration = walking_seconds(distance)
+        steps = [
+            {
+                "travelMode": "WALK",
+                "distanceMeters": int(round(m["distance"])),
+                "staticDuration": f"{walking_seconds(m['distance'])}s",
+                "navigationInstruction": {"instructions": m["instruction"]},
+            }
+            for m in maneuvers
+        ]
+        return RouteResult(
+            origin=origin_name,
+            destination=destination_name,
+            travel_mode="WALK",
+            distance_meters=distance,
+            duration_seconds=duration,
+            legs=[RouteLeg(mode="WALK", distance_meters=distance, duration_seconds=duration,
+                           instructions=[m["instruction"] for m in maneuvers])],
+            steps=steps,
+            source="osm",
+        )
+
+@lru_cache(maxsize=1)
+def get_walk_router() -> Optional[WalkRouter]:
+    """Routeur piéton chargé au premier appel si BELLAI_WALK_GRAPH_PATH est configuré"""
+    path = os.getenv("BELLAI_WALK_GRAPH_PATH")
+    if not path or not os.path.exists(path):
+        return None
+    return WalkRouter(WalkGraph(path))
@@ -14,6 +14,7 @@ st.set_page_config(
 try:
     from bellai.core.agent import bellai_agent
     from bellai.core.memory import chat_memory
+    from bellai.core.profiling import turn_profiler
     from bellai.tools.intention_service import action_manager
 except ImportError:
     st.error("⚠️ Impossible d'importer les modules BellAI. Vérifiez votre structure de projet.")
@@ -226,6 +227,10 @@ def main():
                 "pending_actions": len(pending_actions)
             })
 
+            # Profils CPU et mémoire des prochains tours de cette session (BELLAI_PROFILE_DIR)
+            profiling = st.checkbox("Profiler cette session", value=st.session_state.session_id in turn_profiler.sessions)
+            bellai_agent.profile_session(st.session_state.session_id, profiling)
+
 # =============================================================================
 # FONCTIONS DE TRAITEMENT
 # =============================================================================
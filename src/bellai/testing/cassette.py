@@ -0,0 +1,230 @@
+"""Enregistrement et rejeu des échanges Azure OpenAI et HTTP (Google Routes / Places)
+
+En mode "record", chaque requête au modèle et chaque échange HTTP passé par `requests`
+est ajouté à une cassette JSONL (gzip si le fichier finit par .gz), indexée par le
+hash de la requête. En mode "replay", les réponses sont servies dans l'ordre
+d'enregistrement, avec la latence d'origine ou sans latence.
+"""
+import os
+import re
+import json
+import gzip
+import time
+import asyncio
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import requests
+from pydantic import ConfigDict
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+# Paramètres d'URL jamais enregistrés (clés d'API)
+SECRET_PARAMS = {"key", "client", "signature"}
+
+# Identifiants générés à chaque run (itinéraires, actions) masqués dans le hash des requêtes
+VOLATILE_IDS = re.compile(r"\b(route_)?\d{13}_\d+\b")
+
+class CassetteMiss(Exception):
+    """Requête absente de la cassette en mode rejeu"""
+
+def request_hash(kind: str, request: Any) -> str:
+    """Hash stable d'une requête normalisée"""
+    payload = json.dumps([kind, request], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:20]
+
+def _strip_secrets(url: str) -> str:
+    parts = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query) if k not in SECRET_PARAMS]
+    return urlunsplit(parts._replace(query=urlencode(sorted(query))))
+
+def _llm_request(messages: List[BaseMessage], kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """Requête au modèle sans les identifiants d'appels d'outils (aléatoires d'un run à l'autre)"""
+    normalized = []
+    for message in messages:
+        content = message.content
+        entry = {"type": message.type, "content": VOLATILE_IDS.sub("<id>", content) if isinstance(content, str) else content}
+        tool_calls = getattr(message, "tool_calls", None)
+        if tool_calls:
+            entry["tool_calls"] = [{"name": call["name"], "args": json.loads(VOLATILE_IDS.sub("<id>", json.dumps(call["args"])))}
+                                   for call in tool_calls]
+        normalized.append(entry)
+    tools = sorted(tool.get("function", {}).get("name", "") for tool in kwargs.get("tools", []))
+    return {"messages": normalized, "tools": tools}
+
+class Cassette:
+    """Fichier d'échanges enregistrés, indexés par hash de requête"""
+
+    def __init__(self, path: str, mode: str = "replay", latency: str = "zero"):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Mode de cassette inconnu: {mode}")
+        self.path = path
+        self.mode = mode
+        # "original" : latence enregistrée reproduite ; "zero" : réponse immédiate
+        self.latency = latency
+        self.entries: Dict[str, List[Dict[str, Any]]] = {}
+        self._positions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.counters = {"recorded": 0, "replayed": 0, "misses": 0}
+        if mode == "replay":
+            self.load()
+
+    def _open(self, mode: str):
+        if self.path.endswith(".gz"):
+            return gzip.open(self.path, mode + "t", encoding="utf-8")
+        return open(self.path, mode, encoding="utf-8")
+
+    def load(self) -> None:
+        """Charge la cassette (une entrée JSON par ligne)"""
+        with self._open("r") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self.entries.setdefault(entry["hash"], []).append(entry)
+
+    def record(self, kind: str, key: str, request: Any, response: Any, duration: float) -> None:
+        """Ajoute un échange à la cassette (écrit immédiatement)"""
+        entry = {"hash": key, "kind": kind, "request": request, "response": response, "duration": round(duration, 4)}
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            self.entries.setdefault(key, []).append(entry)
+            with self._open("a") as f:
+                f.write(line + "\n")
+            self.counters["recorded"] += 1
+
+    def lookup(self, kind: str, key: str, request: Any) -> Dict[str, Any]:
+        """Prochaine réponse enregistrée pour cette requête (la dernière est resservie ensuite)"""
+        with self._lock:
+            entries = self.entries.get(key)
+            if not entries:
+                self.counters["misses"] += 1
+                raise CassetteMiss(f"{kind} {key} absent de {self.path}: {json.dumps(request, ensure_ascii=False)[:200]}")
+            position = self._positions.get(key, 0)
+            self._positions[key] = position + 1
+            self.counters["replayed"] += 1
+            return entries[min(position, len(entries) - 1)]
+
+    def delay(self, entry: Dict[str, Any]) -> float:
+        return entry["duration"] if self.latency == "original" else 0.0
+
+    # --- HTTP (requests) ---
+
+    def _send(self, original, session: requests.Session, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        body = request.body.decode("utf-8") if isinstance(request.body, bytes) else request.body
+        described = {"method": request.method, "url": _strip_secrets(request.url), "body": body}
+        key = request_hash("http", described)
+        if self.mode == "replay":
+            entry = self.lookup("http", key, described)
+            if self.delay(entry):
+                time.sleep(self.delay(entry))
+            return _build_response(request, entry["response"])
+
+        started = time.perf_counter()
+        response = original(session, request, **kwargs)
+        self.record("http", key, described, {
+            "status": response.status_code,
+            "headers": {"Content-Type": response.headers.get("Content-Type", "application/json")},
+            "body": response.text,
+        }, time.perf_counter() - started)
+        return response
+
+    @contextmanager
+    def intercept_http(self):
+        """Détourne les requêtes HTTP de `requests` (Google Routes, client googlemaps) vers la cassette"""
+        original = requests.Session.send
+        cassette = self
+
+        def send(session, request, **kwargs):
+            return cassette._send(original, session, request, **kwargs)
+
+        requests.Session.send = send
+        try:
+            yield self
+        finally:
+            requests.Session.send = original
+
+def _build_response(request: requests.PreparedRequest, recorded: Dict[str, Any]) -> requests.Response:
+    response = requests.Response()
+    response.status_code = recorded["status"]
+    response.headers.update(recorded.get("headers", {}))
+    response._content = recorded["body"].encode("utf-8")
+    response.encoding = "utf-8"
+    response.url = request.url
+    response.request = request
+    return response
+
+class CassetteChatModel(BaseChatModel):
+    """Modèle de chat enregistré ou rejoué depuis une cassette"""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    inner: Optional[BaseChatModel] = None
+    cassette: Cassette
+
+    @property
+    def _llm_type(self) -> str:
+        return f"cassette-{self.inner._llm_type if self.inner is not None else 'replay'}"
+
+    def bind_tools(self, tools, **kwargs):
+        if self.inner is None:
+            return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+        binding = self.inner.bind_tools(tools, **kwargs)
+        return self.bind(**binding.kwargs)
+
+    def _result(self, entry: Dict[str, Any]) -> ChatResult:
+        messages = messages_from_dict(entry["response"])
+        return ChatResult(generations=[ChatGeneration(message=message) for message in messages])
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        request = _llm_request(messages, kwargs)
+        key = request_hash("llm", request)
+        if self.cassette.mode == "replay":
+            entry = self.cassette.lookup("llm", key, request)
+            if self.cassette.delay(entry):
+                time.sleep(self.cassette.delay(entry))
+            return self._result(entry)
+        started = time.perf_counter()
+        result = self.inner._generate(messages, stop=stop, **kwargs)
+        self._store(key, request, result, time.perf_counter() - started)
+        return result
+
+    async def _agenerate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        request = _llm_request(messages, kwargs)
+        key = request_hash("llm", request)
+        if self.cassette.mode == "replay":
+            entry = self.cassette.lookup("llm", key, request)
+            if self.cassette.delay(entry):
+                await asyncio.sleep(self.cassette.delay(entry))
+            return self._result(entry)
+        started = time.perf_counter()
+        result = await self.inner._agenerate(messages, stop=stop, **kwargs)
+        self._store(key, request, result, time.perf_counter() - started)
+        return result
+
+    def _store(self, key: str, request: Dict[str, Any], result: ChatResult, duration: float) -> None:
+        response = [message_to_dict(generation.message) for generation in result.generations]
+        self.cassette.record("llm", key, request, response, duration)
+
+_cassette: Optional[Cassette] = None
+_cassette_lock = threading.Lock()
+
+def get_cassette() -> Optional[Cassette]:
+    """Cassette configurée par BELLAI_CASSETTE (HTTP détourné dès le premier appel), sinon None"""
+    global _cassette
+    path = os.getenv("BELLAI_CASSETTE")
+    if not path:
+        return None
+    with _cassette_lock:
+        if _cassette is None:
+            _cassette = Cassette(
+                path,
+                mode=os.getenv("BELLAI_CASSETTE_MODE", "replay"),
+                latency=os.getenv("BELLAI_CASSETTE_LATENCY", "zero"),
+            )
+            # Actif pour toute la durée du process
+            _cassette.intercept_http().__enter__()
+        return _cassette
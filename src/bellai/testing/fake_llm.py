@@ -0,0 +1,80 @@
+"""Modèle de chat factice pour les tests de charge et benchmarks (sans appel Azure)"""
+import asyncio
+import itertools
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+# Étape scriptée : texte final, ou appel d'outil (nom, arguments)
+ScriptStep = Union[str, Tuple[str, Dict[str, Any]]]
+
+class FakeChatModel(BaseChatModel):
+    """Répond selon un script par tour, ou renvoie l'écho du message client"""
+
+    script: List[ScriptStep] = []
+    # Scripts choisis par mot-clé du message client (prioritaires sur script)
+    scripts: Dict[str, List[ScriptStep]] = {}
+    latency: float = 0.0
+    prompt_tokens: int = 100
+    completion_tokens: int = 10
+    # Nombre d'appels reçus (itérations de l'agent)
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "bellai-fake"
+
+    def bind_tools(self, tools, **kwargs):
+        # Même forme de liaison qu'un modèle OpenAI (outils transmis à chaque appel)
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    def _script_for(self, text: str) -> List[ScriptStep]:
+        text = text.lower()
+        for keyword, script in self.scripts.items():
+            if keyword in text:
+                return script
+        return self.script
+
+    def _next_step(self, messages: List[BaseMessage]) -> ScriptStep:
+        """Étape du script correspondant au nombre d'observations déjà reçues dans ce tour"""
+        self.calls += 1
+        last_human = max((i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=-1)
+        text = str(messages[last_human].content) if last_human >= 0 else ""
+        script = self._script_for(text)
+        if not script:
+            return f"Réponse à: {text}"
+        # Observations d'outils depuis le dernier message client
+        observations = sum(isinstance(m, ToolMessage) for m in messages[last_human + 1:])
+        return script[min(observations, len(script) - 1)]
+
+    def _result(self, step: ScriptStep) -> ChatResult:
+        usage = {
+            "input_tokens": self.prompt_tokens,
+            "output_tokens": self.completion_tokens,
+            "total_tokens": self.prompt_tokens + self.completion_tokens,
+        }
+        if isinstance(step, str):
+            message = AIMessage(content=step, usage_metadata=usage)
+        else:
+            name, args = step
+            message = AIMessage(
+                content="",
+                tool_calls=[{"name": name, "args": args, "id": f"call_{next(_call_ids)}"}],
+                usage_metadata=usage,
+            )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._result(self._next_step(messages))
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._result(self._next_step(messages))
+
+_call_ids = itertools.count(1)
@@ -0,0 +1,117 @@
+"""Serveur HTTP local imitant Google Routes et Google Places (benchmarks et tests de charge)"""
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import urlparse, parse_qs
+
+def _route_payload(body: Dict[str, Any]) -> Dict[str, Any]:
+    """Réponse computeRoutes plausible : marche, métro, marche"""
+    if body.get("travelMode") != "TRANSIT":
+        return {"routes": [{"distanceMeters": 2400, "duration": "1800s", "legs": [{"steps": [
+            {"travelMode": body.get("travelMode", "WALK"), "distanceMeters": 2400, "staticDuration": "1800s",
+             "navigationInstruction": {"instructions": "Continuer tout droit"}},
+        ]}]}]}
+    return {"routes": [{"distanceMeters": 5200, "duration": "1380s", "legs": [{"steps": [
+        {"travelMode": "WALK", "distanceMeters": 300, "staticDuration": "240s",
+         "navigationInstruction": {"instructions": "Rejoindre la station Charles Michels"}},
+        {"travelMode": "TRANSIT", "distanceMeters": 4600, "staticDuration": "900s", "transitDetails": {
+            "headsign": "Créteil-Préfecture",
+            "stopCount": 9,
+            "stopDetails": {"departureStop": {"name": "Charles Michels"}, "arrivalStop": {"name": "Opéra"}},
+            "localizedValues": {"departureTime": {"time": {"text": "10:02"}}, "arrivalTime": {"time": {"text": "10:17"}}},
+            "transitLine": {"nameShort": "8", "vehicle": {"name": {"text": "Métro"}}},
+        }},
+        {"travelMode": "WALK", "distanceMeters": 300, "staticDuration": "240s",
+         "navigationInstruction": {"instructions": "Marcher jusqu'à destination"}},
+    ]}]}]}
+
+def _matrix_payload(body: Dict[str, Any]) -> Any:
+    return [
+        {"originIndex": 0, "destinationIndex": i, "condition": "ROUTE_EXISTS",
+         "distanceMeters": 800 + 400 * i, "duration": f"{600 + 240 * i}s"}
+        for i in range(len(body.get("destinations", [])))
+    ]
+
+def _places_payload(query: str) -> Dict[str, Any]:
+    return {"status": "OK", "results": [{"place_id": f"stub_{i}", "name": f"{query} {i}"} for i in range(1, 4)]}
+
+def _place_details_payload(place_id: str) -> Dict[str, Any]:
+    return {"status": "OK", "result": {
+        "name": f"Lieu {place_id}",
+        "formatted_address": "10 Rue de la Convention, 75015 Paris",
+        "formatted_phone_number": "01 45 00 00 00",
+        "website": "https://example.org",
+        "place_id": place_id,
+    }}
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "GoogleStubServer"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, payload: Any) -> None:
+        self.server.count(urlparse(self.path).path)
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self.path.endswith(":computeRouteMatrix"):
+            self._reply((self.server.matrix or _matrix_payload)(body))
+        else:
+            self._reply(_route_payload(body))
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        if url.path.endswith("/place/details/json"):
+            self._reply(_place_details_payload(params.get("place_id", "")))
+        else:
+            self._reply(_places_payload(params.get("query", "")))
+
+class GoogleStubServer(ThreadingHTTPServer):
+    """Routes (computeRoutes, computeRouteMatrix) et Places (textsearch, details) sur 127.0.0.1"""
+
+    daemon_threads = True
+
+    def __init__(self, latency: float = 0.0, matrix: Optional[Callable[[Dict[str, Any]], Any]] = None):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.latency = latency
+        # Réponse computeRouteMatrix personnalisée (corps de la requête -> réponse), sinon plausible
+        self.matrix = matrix
+        self.requests: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, path: str) -> None:
+        with self._lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+
+    def start(self) -> "GoogleStubServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self) -> "GoogleStubServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
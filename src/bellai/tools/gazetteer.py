@@ -0,0 +1,172 @@
+"""Gazetteer local des lieux parisiens et présélection du mode de déplacement"""
+import os
+import re
+import json
+import difflib
+from typing import Dict, Any, List, Optional
+import numpy as np
+from langchain.tools import tool
+from bellai.routing.geo import haversine_m
+from bellai.tools.route_table import normalize_place
+
+GAZETTEER_PATH = os.getenv(
+    "BELLAI_GAZETTEER_PATH",
+    os.path.join(os.path.dirname(__file__), "data", "paris_gazetteer.json"),
+)
+
+# En dessous de cette distance, on privilégie la marche (règle du prompt)
+WALK_THRESHOLD_M = float(os.getenv("BELLAI_WALK_THRESHOLD_M", "1000"))
+
+# Mots (normalisés) qui désignent chaque catégorie du référentiel, au-delà de son nom
+CATEGORY_ALIASES = {
+    "monument": ["monument", "eglise", "basilique", "cathedrale"],
+    "musee": ["musee", "exposition"],
+    "gare": ["gare", "train", "tgv", "sncf"],
+    "metro": ["metro", "station"],
+    "parc": ["parc", "jardin", "square", "bois"],
+    "shopping": ["shopping", "magasin", "boutique", "commercial"],
+    "spectacle": ["spectacle", "theatre", "opera", "concert", "cabaret"],
+    "stade": ["stade", "match", "football", "rugby", "tennis"],
+    "hopital": ["hopital", "urgences", "clinique"],
+    "aeroport": ["aeroport", "avion"],
+    "loisirs": ["loisirs", "piscine", "attractions"],
+    "quartier": ["quartier", "place"],
+}
+
+# Mots qui peuvent entourer un nom de lieu sans en désigner un autre ("aller a la tour eiffel")
+_FILLER_WORDS = {"a", "au", "aux", "de", "des", "du", "d", "l", "la", "le", "les", "vers", "jusqu'a", "pres", "paris", "france"}
+
+def _singular(token: str) -> str:
+    """Singulier approximatif d'un mot normalisé ("hopitaux" -> "hopital", "musees" -> "musee")"""
+    if token.endswith("aux") and len(token) > 4:
+        return token[:-3] + "al"
+    if token.endswith(("s", "x")) and len(token) > 3:
+        return token[:-1]
+    return token
+
+def _tokens(text: str) -> List[str]:
+    return [_singular(token) for token in re.split(r"[\s'-]+", normalize_place(text)) if len(token) >= 3]
+
+class Gazetteer:
+    """Lieux parisiens avec coordonnées, recherche approchée et distances vectorisées"""
+
+    def __init__(self, path: str = GAZETTEER_PATH):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        self.hotel = data["hotel"]
+        self.places: List[Dict[str, Any]] = data["places"]
+        self.lats = np.array([place["lat"] for place in self.places], dtype=np.float64)
+        self.lons = np.array([place["lon"] for place in self.places], dtype=np.float64)
+        self.categories = np.array([normalize_place(place.get("category", "")) for place in self.places])
+
+        # Index nom/alias normalisé -> position dans le tableau
+        self.index: Dict[str, int] = {}
+        for i, place in enumerate(self.places):
+            for name in [place["name"]] + place.get("aliases", []):
+                self.index.setdefault(normalize_place(name), i)
+
+        # Mot normalisé -> catégorie : mots des catégories du fichier, puis synonymes connus
+        self.category_tokens: Dict[str, str] = {}
+        for category in sorted(set(self.categories)):
+            for token in _tokens(category):
+                self.category_tokens.setdefault(token, category)
+        for category, aliases in CATEGORY_ALIASES.items():
+            for alias in aliases:
+                self.category_tokens.setdefault(_singular(alias), category)
+
+        # Distances depuis l'hôtel précalculées une fois pour toutes
+        self.hotel_distances = self.distances_from(self.hotel["lat"], self.hotel["lon"])
+
+    def match(self, query: str, cutoff: float = 0.8) -> Optional[Dict[str, Any]]:
+        """Lieu correspondant à une requête (exacte, inclusion puis approchée)"""
+        key = normalize_place(query)
+        if not key:
+            return None
+        if key in self.index:
+            return self._place(self.index[key])
+
+        # "le Louvre à Paris" désigne le musée ; pas "Pizzeria Montmartre, 10 rue de Lyon" (mots en plus)
+        contained = [name for name in self.index if len(name) >= 4 and f" {name} " in f" {key} "
+                     and set(f" {key} ".replace(f" {name} ", " ").split()) <= _FILLER_WORDS]
+        if contained:
+            return self._place(self.index[max(contained, key=len)])
+
+        # Faute de frappe seulement : même nombre de mots que le nom retenu
+        words = len(key.split())
+        candidates = [name for name in self.index if len(name.split()) == words]
+        close = difflib.get_close_matches(key, candidates, n=1, cutoff=cutoff)
+        if close:
+            return self._place(self.index[close[0]])
+        return None
+
+    def lookup(self, query: str) -> Optional[Dict[str, Any]]:
+        """Lieu dont le nom ou un alias correspond exactement à la requête (sans inclusion ni approximation)"""
+        key = normalize_place(query)
+        return self._place(self.index[key]) if key in self.index else None
+
+    def resolve_category(self, query: str) -> Optional[str]:
+        """Catégorie désignée par une requête ("station de métro" -> "metro", "musées" -> "musee"), si elle existe"""
+        for token in _tokens(query):
+            category = self.category_tokens.get(token)
+            if category:
+                return category
+        return None
+
+    def _place(self, i: int) -> Dict[str, Any]:
+        return {**self.places[i], "distance_from_hotel_m": int(self.hotel_distances[i])}
+
+    def distances_from(self, lat: float, lon: float) -> np.ndarray:
+        """Distances (m) de toutes les entrées depuis un point, en une passe vectorisée"""
+        return haversine_m(lat, lon, self.lats, self.lons)
+
+    def closest(self, category: Optional[str] = None, lat: Optional[float] = None,
+                lon: Optional[float] = None, n: int = 3) -> List[Dict[str, Any]]:
+        """Les n lieux les plus proches (d'une catégorie donnée) d'un point, l'hôtel par défaut"""
+        if lat is None or lon is None:
+            distances = self.hotel_distances
+        else:
+            distances = self.distances_from(lat, lon)
+
+        candidates = np.arange(len(self.places))
+        if category:
+            # Nom de catégorie, pluriel ou synonyme ("station de métro", "musées", "théâtre")
+            candidates = candidates[self.categories == self.resolve_category(category)]
+        if candidates.size == 0:
+            return []
+
+        n = min(n, candidates.size)
+        nearest = candidates[np.argpartition(distances[candidates], n - 1)[:n]]
+        nearest = nearest[np.argsort(distances[nearest])]
+        return [{**self.places[i], "distance_m": int(distances[i])} for i in nearest]
+
+    def distance_from_hotel(self, destination: str) -> Optional[float]:
+        """Distance à vol d'oiseau depuis l'hôtel, si la destination est connue (nom ou alias exact)"""
+        place = self.lookup(destination)
+        return place["distance_from_hotel_m"] if place else None
+
+def choose_travel_mode(distance_m: Optional[float]) -> str:
+    """Mode par défaut selon la distance : marche sous le seuil, transports sinon"""
+    if distance_m is not None and distance_m < WALK_THRESHOLD_M:
+        return "WALK"
+    return "TRANSIT"
+
+# Instance globale
+gazetteer = Gazetteer()
+
+@tool
+def find_closest_places(category: str, max_results: int = 3) -> str:
+    """
+    Trouve les lieux connus les plus proches de l'hôtel pour une catégorie, sans appel externe.
+
+    Args:
+        category (str): "monument", "musée", "gare", "métro", "parc", "shopping", "spectacle", "stade", "hôpital", "aéroport", "loisirs"
+        max_results (int): Nombre de résultats (défaut: 3)
+
+    Returns:
+        str: Lieux triés par distance depuis l'hôtel
+    """
+    places = gazetteer.closest(category, n=max_results)
+    if not places:
+        return f"Aucun lieu de catégorie '{category}' dans le référentiel local (utiliser search_places)"
+    return "\n".join(f"{i}. {place['name']} • {place['distance_m']} m" for i, place in enumerate(places, 1))
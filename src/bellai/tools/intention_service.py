@@ -2,6 +2,35 @@ from langchain.tools import tool
 from datetime import datetime
 from bellai.core.intention import BackendAction
 from bellai.core.intention import action_manager
+from bellai.core.sessions import current_session, current_turn
+
+# Mots-clés par service
+BOOKING_KEYWORDS = {
+    "restaurant": ["manger", "faim", "dîner", "déjeuner", "table", "restaurant", "repas"],
+    "spa": ["massage", "détente", "relaxer", "spa", "soin", "bien-être"],
+    "room_service": ["chambre", "livrer", "apporter", "room service", "service chambre"]
+}
+
+ESCALATION_TRIGGERS = [
+    "parler à quelqu'un", "responsable", "manager", "plainte", "problème grave",
+    "insatisfait", "remboursement", "annulation", "urgence", "aide humaine"
+]
+
+# Déclencheurs qui rendent l'escalade prioritaire
+URGENT_TRIGGERS = ["urgence", "problème grave", "plainte"]
+
+CONCIERGE_KEYWORDS = [
+    "transport", "taxi", "réservation externe", "théâtre", "spectacle",
+    "restaurant ville", "activité", "visite", "tour", "excursion",
+    "shopping", "recommandation", "billet", "ticket"
+]
+
+# Demandes d'itinéraire et de taxi (routage du modèle et préchargement de get_route)
+ROUTE_KEYWORDS = [
+    "itinéraire", "trajet", "comment aller", "comment y aller", "comment me rendre",
+    "aller à", "aller au", "métro", "bus", "à pied"
+]
+TAXI_KEYWORDS = ["taxi", "uber", "vtc", "voiture"]
 
 def _store_pending_action(action: BackendAction) -> None:
     """Fonction helper pour stocker une action"""
@@ -11,12 +40,7 @@ def _store_pending_action(action: BackendAction) -> None:
 def detect_booking_intention(user_message: str, service_type: str = None) -> str:
     """Détecte une intention de réservation et prépare l'action backend"""
 
-    # Mots-clés par service
-    booking_keywords = {
-        "restaurant": ["manger", "faim", "dîner", "déjeuner", "table", "restaurant", "repas"],
-        "spa": ["massage", "détente", "relaxer", "spa", "soin", "bien-être"],
-        "room_service": ["chambre", "livrer", "apporter", "room service", "service chambre"]
-    }
+    booking_keywords = BOOKING_KEYWORDS
 
     message_lower = user_message.lower()
     detected_service = service_type
@@ -53,10 +77,7 @@ def detect_booking_intention(user_message: str, service_type: str = None) -> str
 def detect_escalation_need(user_message: str, context: str = "") -> str:
     """Détecte si escalade vers humain nécessaire"""
     
-    escalation_triggers = [
-        "parler à quelqu'un", "responsable", "manager", "plainte", "problème grave",
-        "insatisfait", "remboursement", "annulation", "urgence", "aide humaine"
-    ]
+    escalation_triggers = ESCALATION_TRIGGERS
     
     message_lower = user_message.lower()
     context_lower = context.lower()
@@ -66,6 +87,15 @@ def detect_escalation_need(user_message: str, context: str = "") -> str:
                     if word in message_lower or word in context_lower]
     
     if triggered_words:
+        # L'escalade a pu être déclenchée avant le modèle par l'ordonnanceur, pour ce même tour
+        # (texte passé par le modèle souvent reformulé, ou fusionné après remplacement : seul le tour compte)
+        session_id, turn = current_session.get(), current_turn.get()
+        if turn is not None:
+            for action in action_manager.get_pending_actions(session_id):
+                if (action.action_type == "escalate_to_human" and action.session_id == session_id
+                        and action.turn_id == turn.turn_id):
+                    return f"ESCALATION_NEEDED | ACTION_PREPARED: {action.id}"
+
         action = BackendAction(
             action_type="escalate_to_human",
             data={
@@ -73,7 +103,7 @@ def detect_escalation_need(user_message: str, context: str = "") -> str:
                 "triggered_words": triggered_words,
                 "user_message": user_message,
                 "context": context,
-                "priority": "high" if any(word in ["urgence", "grave", "plainte"] 
+                "priority": "high" if any(word in URGENT_TRIGGERS
                                         for word in triggered_words) else "normal"
             },
             confirmation_needed=False  # Escalade immédiate
@@ -125,11 +155,7 @@ def detect_notification_need(user_message: str, notification_type: str = None) -
 def detect_concierge_request(user_message: str) -> str:
     """Détecte demande pour la conciergerie"""
     
-    concierge_keywords = [
-        "transport", "taxi", "réservation externe", "théâtre", "spectacle",
-        "restaurant ville", "activité", "visite", "tour", "excursion",
-        "shopping", "recommandation", "billet", "ticket"
-    ]
+    concierge_keywords = CONCIERGE_KEYWORDS
     
     message_lower = user_message.lower()
     matched_keywords = [kw for kw in concierge_keywords if kw in message_lower]
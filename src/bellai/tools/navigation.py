@@ -1,30 +1,99 @@
 import os
+import re
 import json
+import dataclasses
+import time
+import itertools
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Any, List, Optional
 import requests
 from dotenv import load_dotenv
 from langchain.tools import tool
+from langchain_core.callbacks import BaseCallbackHandler
+from bellai.tools.route_result import MODE_LABELS, RouteResult, parse_routes_response, render_route_summary
+from bellai.tools.route_table import route_table, normalize_place
+from bellai.routing.geo import haversine_m
+from bellai.routing.transit import get_transit_router
+from bellai.routing.walk import get_walk_router
+from bellai.core.sessions import raise_if_cancelled, remaining_time
+from bellai.core.breaker import CircuitOpen, StaleCache, get_breaker, stale_notice, unavailable_message
+from bellai.tools.gazetteer import gazetteer, choose_travel_mode
 
 load_dotenv()
 
 GOOGLE_ROUTE_API = os.getenv("GOOGLE_ROUTE_API")
 
-@tool
-def get_route(origin: str, destination: str, travel_mode="TRANSIT", departure_time=None, vehicle_type="car"):
-    """
-    Récupère l'itinéraire et retourne une description formatée.
-    
-    Args:
-        origin (str): Adresse de départ (ex: "Tour Eiffel, Paris" ou "1 Rue de Rivoli, 75001 Paris")
-        destination (str): Adresse d'arrivée (ex: "Arc de Triomphe, Paris")
-        travel_mode: "TRANSIT", "WALK", "DRIVE", "BICYCLE"
-        departure_time: datetime, timedelta, string ISO ou None (défaut: maintenant + 1 min)
-        vehicle_type: "car" ou "taxi" (juste pour l'affichage si DRIVE)
-    
-    Returns:
-        str: Description formatée de l'itinéraire ou message d'erreur
-    """
-    url = "https://routes.googleapis.com/directions/v2:computeRoutes"
-    
+# Surchargeable pour les benchmarks (ex: bellai.testing.google_stub)
+GOOGLE_ROUTES_URL = os.getenv("BELLAI_GOOGLE_ROUTES_URL", "https://routes.googleapis.com")
+ROUTES_API_URL = f"{GOOGLE_ROUTES_URL}/directions/v2:computeRoutes"
+ROUTE_MATRIX_API_URL = f"{GOOGLE_ROUTES_URL}/distanceMatrix/v2:computeRouteMatrix"
+
+# Niveau de détail du résumé renvoyé au modèle : "minimal", "compact" ou "detailed"
+ROUTE_VERBOSITY = os.getenv("BELLAI_ROUTE_VERBOSITY", "compact")
+
+_ROUTE_ID_PATTERN = re.compile(r"ROUTE_ID: (route_\d+_\d+)")
+
+class RouteError(Exception):
+    """Erreur renvoyée par l'API Google Routes"""
+
+class RouteUnavailable(RouteError):
+    """Erreur côté serveur Google Routes (5xx, quota) : compte comme une panne"""
+
+# Disjoncteur de l'API Google Routes (itinéraires et matrices)
+routes_breaker = get_breaker("google_routes")
+# Pannes comptées par le disjoncteur ; les autres erreurs sont des réponses valides
+ROUTES_FAILURES = (requests.exceptions.RequestException, ValueError, RouteUnavailable)
+
+def _check_error(r: Dict[str, Any]) -> None:
+    """Lève l'erreur renvoyée par l'API, en distinguant les pannes du service"""
+    error = r.get('error') or {}
+    if error.get('code', 0) >= 500 or error.get('code') == 429:
+        raise RouteUnavailable(error.get('message', "Service indisponible"))
+    raise RouteError(error.get('message', "Réponse inattendue"))
+
+class RouteDetailsStore:
+    """Conserve les itinéraires complets pour le frontend (hors prompt)"""
+
+    def __init__(self, max_routes: int = 500):
+        self.routes: "OrderedDict[str, RouteResult]" = OrderedDict()
+        self.max_routes = max_routes
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def store(self, route: RouteResult) -> str:
+        """Enregistre un itinéraire et retourne son identifiant"""
+        with self._lock:
+            route_id = f"route_{int(time.time() * 1000)}_{next(self._counter)}"
+            route.route_id = route_id
+            self.routes[route_id] = route
+            while len(self.routes) > self.max_routes:
+                self.routes.popitem(last=False)
+        return route_id
+
+    def get(self, route_id: str) -> Optional[RouteResult]:
+        """Récupère un itinéraire complet"""
+        return self.routes.get(route_id)
+
+    def get_for_frontend(self, route_ids: List[str]) -> List[Dict[str, Any]]:
+        """Itinéraires complets (étapes incluses) au format API"""
+        return [self.routes[route_id].to_dict() for route_id in route_ids if route_id in self.routes]
+
+class RouteDetailsCallback(BaseCallbackHandler):
+    """Relève les itinéraires réellement observés par le modèle pendant un tour"""
+
+    def __init__(self):
+        self.route_ids: List[str] = []
+
+    def on_tool_end(self, output: Any, **kwargs) -> None:
+        content = getattr(output, "content", output)
+        if isinstance(content, str):
+            self.route_ids.extend(_ROUTE_ID_PATTERN.findall(content))
+
+def fetch_route(origin: str, destination: str, travel_mode: str = "TRANSIT", departure_time=None,
+                vehicle_type: str = "car") -> RouteResult:
+    """Appelle l'API Google Routes et retourne l'itinéraire structuré"""
     # FieldMask adapté selon le mode
     if travel_mode == "TRANSIT":
         field_mask = "routes.duration,routes.distanceMeters,routes.legs.steps,routes.legs.steps.transitDetails,routes.legs.steps.transitDetails.stopDetails,routes.legs.steps.transitDetails.localizedValues,routes.legs.steps.travelMode,routes.legs.steps.distanceMeters,routes.legs.steps.staticDuration,routes.legs.steps.navigationInstruction,routes.legs.steps.localizedValues"
@@ -58,99 +127,223 @@ def get_route(origin: str, destination: str, travel_mode="TRANSIT", departure_ti
         data['routingPreference'] = 'TRAFFIC_AWARE'
         if departure_time:
             data['departureTime'] = departure_time
-    try:
-        r = requests.post(url, headers=headers, data=json.dumps(data), timeout=10).json()
 
+    raise_if_cancelled()
+    with routes_breaker.guard(ROUTES_FAILURES):
+        r = requests.post(ROUTES_API_URL, headers=headers, data=json.dumps(data), timeout=remaining_time(10)).json()
         # Vérifier s'il y a une erreur
         if 'error' in r:
-            return f"❌ Erreur: {r['error']['message']}"
-
-        # Construire la string de résultat
-        result = []
-
-        route = r['routes'][0]
-        leg = route['legs'][0]
-
-        # En-tête
-        distance_km = route['distanceMeters'] / 1000
-        duree_min = int(route['duration'].replace('s', '')) // 60
-
-        # Emoji et texte selon le mode
-        if travel_mode == "WALK":
-            mode_emoji = "🚶"
-            mode_text = "À PIED"
-        elif travel_mode == "TRANSIT":
-            mode_emoji = "🚇"
-            mode_text = "TRANSPORT EN COMMUN"
-        elif travel_mode == "BICYCLE":
-            mode_emoji = "🚴"
-            mode_text = "VÉLO"
-        elif travel_mode == "DRIVE":
-            if vehicle_type == "taxi":
-                mode_emoji = "🚕"
-                mode_text = "TAXI"
-            else:
-                mode_emoji = "🚗"
-                mode_text = "VOITURE"
-        else:
-            mode_text = travel_mode
-            mode_emoji = ""
-
-        result.append(f"{mode_emoji} Mode: {mode_text}")
-        result.append(f"📍 Distance totale: {distance_km:.1f} km")
-        result.append(f"⏱️  Durée totale: {duree_min} minutes")
-        result.append(f"\n{'='*60}")
-        result.append("ITINÉRAIRE DÉTAILLÉ")
-        result.append(f"{'='*60}\n")
-
-        # Parcourir les étapes
-        for i, step in enumerate(leg['steps'], 1):
-            mode = step.get('travelMode', 'UNKNOWN')
-
-            # Récupérer distance et durée de manière sécurisée
-            distance = step.get('localizedValues', {}).get('distance', {}).get('text', 'N/A')
-            duree = step.get('localizedValues', {}).get('staticDuration', {}).get('text', 'N/A')
-
-            if mode == 'WALK':
-                # Récupérer l'instruction de manière sécurisée
-                instruction = step.get('navigationInstruction', {}).get('instructions', 'Marcher')
-                result.append(f"Étape {i}: 🚶 MARCHE")
-                result.append(f"  ➜ {instruction}")
-                result.append(f"  📏 {distance} • ⏱️ {duree}")
-                result.append("")
-
-            elif mode == 'TRANSIT':
-                transit = step.get('transitDetails', {})
-                ligne = transit.get('transitLine', {}).get('name', 'N/A')
-                direction = transit.get('headsign', 'N/A')
-
-                depart_stop = transit.get('stopDetails', {}).get('departureStop', {}).get('name', 'N/A')
-                arrivee_stop = transit.get('stopDetails', {}).get('arrivalStop', {}).get('name', 'N/A')
-                
-                depart_time = transit.get('localizedValues', {}).get('departureTime', {}).get('time', {}).get('text', 'N/A')
-                arrivee_time = transit.get('localizedValues', {}).get('arrivalTime', {}).get('time', {}).get('text', 'N/A')
-
-                nb_arrets = transit.get('stopCount', 0)
-                vehicle_type_transit = transit.get('transitLine', {}).get('vehicle', {}).get('name', {}).get('text', 'Transport')
-
-                result.append(f"Étape {i}: 🚇 {vehicle_type_transit.upper()} LIGNE {ligne}")
-                result.append(f"  ➜ Direction: {direction}")
-                result.append(f"  🚏 Montée: {depart_stop} à {depart_time}")
-                result.append(f"  🚏 Descente: {arrivee_stop} à {arrivee_time}")
-                result.append(f"  📊 {nb_arrets} arrêts • 📏 {distance} • ⏱️ {duree}")
-                result.append("")
-
-            else:
-                # Pour DRIVE, BICYCLE, etc.
-                instruction = step.get('navigationInstruction', {}).get('instructions', 'Continuer')
-                result.append(f"Étape {i}: {mode_emoji} {instruction}")
-                result.append(f"  📏 {distance} • ⏱️ {duree}")
-                result.append("")
-
-        result.append(f"{'='*60}")
-
-        return "\n".join(result)
+            _check_error(r)
+    if not r.get('routes'):
+        raise RouteError("Aucun itinéraire trouvé")
 
+    return parse_routes_response(r, origin, destination, travel_mode, vehicle_type)
+
+def _stale_key(origin: str, destination: str, travel_mode: str) -> str:
+    return f"route:{normalize_place(origin)}|{normalize_place(destination)}|{travel_mode}"
+
+def _stale_matrix_key(origin: str, destinations: List[str], travel_mode: str) -> str:
+    # Préfixe distinct : une matrice à une destination ne doit pas être relue comme un itinéraire
+    return "matrix:" + "|".join([normalize_place(origin), *map(normalize_place, destinations), travel_mode])
+
+def resolve_travel_mode(origin: str, destination: str, travel_mode: str) -> str:
+    """Choisit le mode localement quand il n'est pas imposé (marche si < 1 km), sur nom ou alias exact uniquement"""
+    if travel_mode not in (None, "", "AUTO"):
+        return travel_mode
+
+    if normalize_place(origin) == normalize_place(gazetteer.hotel["address"]):
+        distance = gazetteer.distance_from_hotel(destination)
+    else:
+        # Origine hors hôtel : distance entre deux lieux connus, si possible
+        start, end = gazetteer.lookup(origin), gazetteer.lookup(destination)
+        distance = float(haversine_m(start["lat"], start["lon"], end["lat"], end["lon"])) if start and end else None
+    return choose_travel_mode(distance)
+
+def _coordinates(place: str) -> Optional[tuple]:
+    """Coordonnées d'un lieu connu du gazetteer (l'hôtel inclus), sur nom ou alias exact uniquement"""
+    if normalize_place(place) == normalize_place(gazetteer.hotel["address"]):
+        return gazetteer.hotel["lat"], gazetteer.hotel["lon"]
+    # Pas de correspondance approchée : une adresse inconnue part vers Google plutôt que vers un lieu voisin
+    match = gazetteer.lookup(place)
+    return (match["lat"], match["lon"]) if match else None
+
+def _departure_datetime(departure_time) -> datetime:
+    """Heure de départ demandée, ou maintenant"""
+    if isinstance(departure_time, datetime):
+        return departure_time
+    if isinstance(departure_time, str):
+        try:
+            return datetime.fromisoformat(departure_time.replace("Z", "+00:00")).astimezone().replace(tzinfo=None)
+        except ValueError:
+            pass
+    return datetime.now()
+
+def local_transit_route(origin: str, destination: str, departure_time=None) -> Optional[RouteResult]:
+    """Itinéraire TRANSIT calculé hors ligne sur le flux GTFS, si possible"""
+    router = get_transit_router()
+    if router is None:
+        return None
+    start, end = _coordinates(origin), _coordinates(destination)
+    if not start or not end:
+        return None
+    return router.route(start, end, _departure_datetime(departure_time), origin, destination)
+
+def local_walk_route(origin: str, destination: str) -> Optional[RouteResult]:
+    """Itinéraire WALK calculé sur le graphe piéton local, si possible"""
+    router = get_walk_router()
+    if router is None:
+        return None
+    start, end = _coordinates(origin), _coordinates(destination)
+    if not start or not end:
+        return None
+    return router.route(start, end, origin, destination)
+
+@tool
+def get_route(origin: str, destination: str, travel_mode="AUTO", departure_time=None, vehicle_type="car"):
+    """
+    Récupère l'itinéraire et retourne un résumé condensé.
+    
+    Args:
+        origin (str): Adresse de départ (ex: "Tour Eiffel, Paris" ou "1 Rue de Rivoli, 75001 Paris")
+        destination (str): Adresse d'arrivée (ex: "Arc de Triomphe, Paris")
+        travel_mode: "AUTO" (choix local selon la distance), "TRANSIT", "WALK", "DRIVE", "BICYCLE"
+        departure_time: datetime, timedelta, string ISO ou None (défaut: maintenant + 1 min)
+        vehicle_type: "car" ou "taxi" (juste pour l'affichage si DRIVE)
+    
+    Returns:
+        str: Résumé de l'itinéraire (totaux, correspondances) ou message d'erreur
+    """
+    try:
+        # Présélection du mode sans appel externe
+        travel_mode = resolve_travel_mode(origin, destination, travel_mode)
+
+        # Routeurs locaux (GTFS, graphe piéton), puis table précalculée si encore fraîche
+        route = None
+        if travel_mode == "TRANSIT":
+            route = local_transit_route(origin, destination, departure_time)
+        elif travel_mode == "WALK":
+            route = local_walk_route(origin, destination)
+        if route is None:
+            route = route_table.lookup(origin, destination, travel_mode, departure_time)
+        notice = None
+        if route is None:
+            key = _stale_key(origin, destination, travel_mode)
+            try:
+                route = fetch_route(origin, destination, travel_mode, departure_time, vehicle_type)
+                stale_routes.store(key, route)
+            except CircuitOpen as e:
+                # API coupée : dernier itinéraire connu, signalé comme tel
+                stale = stale_routes.get(key)
+                if stale is None:
+                    return unavailable_message(e)
+                route, age = stale
+                notice = stale_notice(age)
+
+        # Les étapes complètes restent disponibles pour le frontend via ROUTE_ID ;
+        # copie avant toute écriture : l'itinéraire peut venir d'un cache partagé (table, routeur local, repli)
+        route = dataclasses.replace(route, vehicle_type=vehicle_type)
+        route_details.store(route)
+        summary = render_route_summary(route, ROUTE_VERBOSITY)
+        return f"{notice}\n{summary}" if notice else summary
+
+    except RouteError as e:
+        return f"❌ Erreur: {e}"
+    except requests.exceptions.Timeout:
+        return "❌ Timeout: La requête a pris trop de temps"
+    except requests.exceptions.RequestException as e:
+        return f"❌ Erreur de requête: {e}"
+    except Exception as e:
+        return f"❌ Erreur inattendue: {e}"
+
+def fetch_route_matrix(origin: str, destinations: List[str], travel_mode: str = "TRANSIT") -> List[Dict[str, Any]]:
+    """Durées et distances d'une origine vers plusieurs destinations en une seule requête"""
+    headers = {
+        'Content-Type': 'application/json; charset=utf-8',
+        'X-Goog-Api-Key': GOOGLE_ROUTE_API,
+        'X-Goog-FieldMask': 'originIndex,destinationIndex,duration,distanceMeters,status,condition'
+    }
+
+    data = {
+        'origins': [{'waypoint': {'address': origin}}],
+        'destinations': [{'waypoint': {'address': destination}} for destination in destinations],
+        'travelMode': travel_mode
+    }
+    if travel_mode == "DRIVE":
+        data['routingPreference'] = 'TRAFFIC_AWARE'
+
+    raise_if_cancelled()
+    with routes_breaker.guard(ROUTES_FAILURES):
+        r = requests.post(ROUTE_MATRIX_API_URL, headers=headers, data=json.dumps(data), timeout=remaining_time(10)).json()
+        # Une erreur globale est renvoyée sous forme d'objet, sinon une liste d'éléments
+        if isinstance(r, dict):
+            _check_error(r)
+
+    results = []
+    for element in r:
+        destination = destinations[element.get('destinationIndex', 0)]
+        if element.get('condition') != 'ROUTE_EXISTS':
+            results.append({'destination': destination, 'found': False})
+            continue
+        results.append({
+            'destination': destination,
+            'found': True,
+            'distance_meters': element.get('distanceMeters', 0),
+            'duration_seconds': int(float(element.get('duration', '0s').rstrip('s') or 0)),
+        })
+    return results
+
+def resolve_matrix_travel_mode(origin: str, destinations: List[str], travel_mode: str) -> str:
+    """Mode commun à toute la matrice : marche seulement si toutes les destinations sont proches"""
+    if travel_mode not in (None, "", "AUTO"):
+        return travel_mode
+    modes = {resolve_travel_mode(origin, destination, "AUTO") for destination in destinations}
+    return "WALK" if modes == {"WALK"} else "TRANSIT"
+
+@tool
+def get_route_matrix(origin: str, destinations: List[str], travel_mode="AUTO"):
+    """
+    Compare les temps de trajet d'une origine vers plusieurs destinations en un seul appel.
+
+    Args:
+        origin (str): Adresse de départ (ex: "52 Rue d'Oradour-sur-Glane, 75015 Paris")
+        destinations (List[str]): Adresses candidates (ex: les résultats de search_places)
+        travel_mode: "AUTO" (marche si toutes < 1km, sinon TRANSIT), "TRANSIT", "WALK", "DRIVE", "BICYCLE"
+
+    Returns:
+        str: Destinations triées par durée, de la plus proche à la plus éloignée
+    """
+    if not destinations:
+        return "❌ Erreur: aucune destination fournie"
+    try:
+        travel_mode = resolve_matrix_travel_mode(origin, destinations, travel_mode)
+        key = _stale_matrix_key(origin, destinations, travel_mode)
+        notice = None
+        try:
+            results = fetch_route_matrix(origin, destinations, travel_mode)
+            stale_routes.store(key, results)
+        except CircuitOpen as e:
+            stale = stale_routes.get(key)
+            if stale is None:
+                return unavailable_message(e)
+            results, age = stale
+            notice = stale_notice(age)
+
+        found = sorted((r for r in results if r['found']), key=lambda r: r['duration_seconds'])
+        missing = [r['destination'] for r in results if not r['found']]
+
+        label = MODE_LABELS.get(travel_mode, travel_mode)
+        lines = [notice] if notice else []
+        lines.append(f"{label} depuis {origin}")
+        for i, r in enumerate(found, 1):
+            distance = r['distance_meters']
+            distance_text = f"{distance / 1000:.1f} km" if distance >= 1000 else f"{distance} m"
+            lines.append(f"{i}. {r['destination']} • {max(1, r['duration_seconds'] // 60)} min • {distance_text}")
+        if missing:
+            lines.append(f"Aucun itinéraire : {', '.join(missing)}")
+        return "\n".join(lines)
+
+    except RouteError as e:
+        return f"❌ Erreur: {e}"
     except requests.exceptions.Timeout:
         return "❌ Timeout: La requête a pris trop de temps"
     except requests.exceptions.RequestException as e:
@@ -158,6 +351,11 @@ def get_route(origin: str, destination: str, travel_mode="TRANSIT", departure_ti
     except Exception as e:
         return f"❌ Erreur inattendue: {e}"
 
+# Instances globales
+route_details = RouteDetailsStore()
+# Derniers résultats Google Routes, servis quand le disjoncteur est ouvert
+stale_routes = StaleCache()
+
 if __name__ == "__main__":
 
     origin="Louvre Museum, Paris",
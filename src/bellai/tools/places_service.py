@@ -1,10 +1,23 @@
 """Service de conciergerie utilisant Google Places API pour BellAI"""
+import os
 from langchain.tools import tool
 from langchain_google_community import GooglePlacesAPIWrapper
+from bellai.core.sessions import raise_if_cancelled, remaining_time
+from bellai.core.breaker import CircuitOpen, StaleCache, get_breaker, stale_notice, unavailable_message
 
 HOTEL_LOCATION = "52 Rue d'Oradour-sur-Glane, 75015 Paris"
 
+# Temps minimal restant pour lancer une recherche Places (s)
+MIN_SEARCH_SECONDS = 1.0
+
 google_places = GooglePlacesAPIWrapper(top_k_results=3)
+# Surchargeable pour les benchmarks (ex: bellai.testing.google_stub)
+if os.getenv("BELLAI_GOOGLE_MAPS_URL"):
+    google_places.google_map_client.base_url = os.getenv("BELLAI_GOOGLE_MAPS_URL")
+
+# Disjoncteur Google Places et derniers résultats par requête
+places_breaker = get_breaker("google_places")
+stale_places = StaleCache()
 
 @tool
 def search_places(query: str) -> str:
@@ -18,7 +31,20 @@ def search_places(query: str) -> str:
         str: top 3 Résultats de la recherche depuis l'API google_places.
     """
     full_query = f"{query} near {HOTEL_LOCATION}"
-    result = google_places.run(full_query)
+    raise_if_cancelled()
+    # Le client Places n'accepte pas de timeout par appel : ne pas lancer une recherche vouée à dépasser l'échéance
+    if remaining_time(MIN_SEARCH_SECONDS, minimum=0.0) < MIN_SEARCH_SECONDS:
+        return "❌ Timeout: temps de réponse épuisé pour cette demande"
+    try:
+        with places_breaker.guard():
+            result = google_places.run(full_query)
+    except CircuitOpen as e:
+        stale = stale_places.get(full_query.lower())
+        if stale is None:
+            return unavailable_message(e)
+        result, age = stale
+        return f"{stale_notice(age)}\n{result}"
+    stale_places.store(full_query.lower(), result)
     return result
 
 # Exemple d'utilisation
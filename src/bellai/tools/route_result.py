@@ -0,0 +1,170 @@
+"""Représentation structurée et rendu condensé des itinéraires"""
+from dataclasses import dataclass, field, asdict
+from typing import Dict, Any, List, Optional
+
+# Libellés par mode de déplacement
+MODE_LABELS = {
+    "WALK": "À pied",
+    "TRANSIT": "Transport en commun",
+    "BICYCLE": "Vélo",
+    "DRIVE": "Voiture",
+    "TAXI": "Taxi",
+}
+
+VERBOSITY_LEVELS = ("minimal", "compact", "detailed")
+
+@dataclass
+class TransitLine:
+    """Tronçon en transport en commun (montée et descente uniquement)"""
+    name: str
+    vehicle: str
+    headsign: str
+    departure_stop: str
+    arrival_stop: str
+    departure_time: Optional[str] = None
+    arrival_time: Optional[str] = None
+    stop_count: int = 0
+
+@dataclass
+class RouteLeg:
+    """Segment homogène d'un itinéraire (marches consécutives fusionnées)"""
+    mode: str
+    distance_meters: int
+    duration_seconds: int
+    instructions: List[str] = field(default_factory=list)
+    transit: Optional[TransitLine] = None
+
+@dataclass
+class RouteResult:
+    """Itinéraire complet : totaux, segments et étapes brutes pour le frontend"""
+    origin: str
+    destination: str
+    travel_mode: str
+    distance_meters: int
+    duration_seconds: int
+    legs: List[RouteLeg] = field(default_factory=list)
+    vehicle_type: str = "car"
+    steps: List[Dict[str, Any]] = field(default_factory=list)
+    route_id: Optional[str] = None
+    source: str = "google_routes"
+
+    @property
+    def duration_minutes(self) -> int:
+        return self.duration_seconds // 60
+
+    @property
+    def transit_lines(self) -> List[TransitLine]:
+        return [leg.transit for leg in self.legs if leg.transit]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convertit en dictionnaire pour l'API (étapes complètes incluses)"""
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RouteResult":
+        """Reconstruit un itinéraire sérialisé avec to_dict"""
+        legs = [
+            RouteLeg(**{**leg, "transit": TransitLine(**leg["transit"]) if leg.get("transit") else None})
+            for leg in data.get("legs", [])
+        ]
+        return cls(**{**data, "legs": legs})
+
+def _seconds(value: Any) -> int:
+    """Convertit une durée Google ("123s") en secondes"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str) and value.endswith("s"):
+        try:
+            return int(float(value[:-1]))
+        except ValueError:
+            return 0
+    return 0
+
+def parse_routes_response(payload: Dict[str, Any], origin: str, destination: str,
+                          travel_mode: str, vehicle_type: str = "car") -> RouteResult:
+    """Construit un RouteResult à partir d'une réponse computeRoutes"""
+    route = payload["routes"][0]
+    steps = [step for leg in route.get("legs", []) for step in leg.get("steps", [])]
+
+    legs: List[RouteLeg] = []
+    for step in steps:
+        mode = step.get("travelMode", travel_mode)
+        distance = step.get("distanceMeters", 0)
+        duration = _seconds(step.get("staticDuration"))
+        instruction = step.get("navigationInstruction", {}).get("instructions")
+
+        if mode == "TRANSIT":
+            transit = step.get("transitDetails", {})
+            stops = transit.get("stopDetails", {})
+            times = transit.get("localizedValues", {})
+            line = transit.get("transitLine", {})
+            legs.append(RouteLeg(
+                mode="TRANSIT",
+                distance_meters=distance,
+                duration_seconds=duration,
+                transit=TransitLine(
+                    name=line.get("nameShort") or line.get("name", "N/A"),
+                    vehicle=line.get("vehicle", {}).get("name", {}).get("text", "Transport"),
+                    headsign=transit.get("headsign", "N/A"),
+                    departure_stop=stops.get("departureStop", {}).get("name", "N/A"),
+                    arrival_stop=stops.get("arrivalStop", {}).get("name", "N/A"),
+                    departure_time=times.get("departureTime", {}).get("time", {}).get("text"),
+                    arrival_time=times.get("arrivalTime", {}).get("time", {}).get("text"),
+                    stop_count=transit.get("stopCount", 0),
+                ),
+            ))
+            continue
+
+        # Fusionner les sous-étapes consécutives du même mode
+        if legs and legs[-1].mode == mode and legs[-1].transit is None:
+            legs[-1].distance_meters += distance
+            legs[-1].duration_seconds += duration
+            if instruction:
+                legs[-1].instructions.append(instruction)
+        else:
+            legs.append(RouteLeg(mode=mode, distance_meters=distance, duration_seconds=duration,
+                                 instructions=[instruction] if instruction else []))
+
+    return RouteResult(
+        origin=origin,
+        destination=destination,
+        travel_mode=travel_mode,
+        vehicle_type=vehicle_type,
+        distance_meters=route.get("distanceMeters", 0),
+        duration_seconds=_seconds(route.get("duration")),
+        legs=legs,
+        steps=steps,
+    )
+
+def _format_distance(meters: int) -> str:
+    return f"{meters / 1000:.1f} km" if meters >= 1000 else f"{meters} m"
+
+def _format_minutes(seconds: int) -> str:
+    return f"{max(1, seconds // 60)} min"
+
+def render_route_summary(route: RouteResult, verbosity: str = "compact") -> str:
+    """Rendu texte condensé d'un itinéraire pour le modèle"""
+    if verbosity not in VERBOSITY_LEVELS:
+        verbosity = "compact"
+
+    mode_key = "TAXI" if route.travel_mode == "DRIVE" and route.vehicle_type == "taxi" else route.travel_mode
+    lines = [f"{MODE_LABELS.get(mode_key, mode_key)} • {_format_distance(route.distance_meters)} • {route.duration_minutes} min"]
+
+    # Un segment unique non-transit n'apporte rien de plus que les totaux
+    single_leg = len(route.legs) == 1 and route.legs[0].transit is None
+    if verbosity == "detailed" or (verbosity == "compact" and not single_leg):
+        for i, leg in enumerate(route.legs, 1):
+            if leg.transit:
+                t = leg.transit
+                boarding = f"{t.departure_stop} {t.departure_time}" if t.departure_time else t.departure_stop
+                alighting = f"{t.arrival_stop} {t.arrival_time}" if t.arrival_time else t.arrival_stop
+                lines.append(f"{i}. {t.vehicle} {t.name} dir. {t.headsign} : {boarding} → {alighting} ({t.stop_count} arrêts)")
+            else:
+                label = MODE_LABELS.get(leg.mode, leg.mode)
+                lines.append(f"{i}. {label} {_format_distance(leg.distance_meters)} ({_format_minutes(leg.duration_seconds)})")
+                if verbosity == "detailed":
+                    lines.extend(f"   - {instruction}" for instruction in leg.instructions)
+
+    if route.route_id:
+        lines.append(f"ROUTE_ID: {route.route_id}")
+    return "\n".join(lines)
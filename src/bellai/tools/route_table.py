@@ -0,0 +1,309 @@
+"""Table d'itinéraires précalculés depuis l'hôtel vers les destinations populaires"""
+import os
+import re
+import json
+import time
+import sqlite3
+import argparse
+import threading
+import unicodedata
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional, Tuple
+from dotenv import load_dotenv
+from bellai.core.stats import CounterSet
+from bellai.tools.places_service import HOTEL_LOCATION
+from bellai.tools.route_result import RouteResult
+
+load_dotenv()
+
+ROUTE_TABLE_PATH = os.getenv("BELLAI_ROUTE_TABLE_PATH", os.path.join("data", "route_table.sqlite3"))
+ROUTE_TABLE_MAX_AGE_HOURS = float(os.getenv("BELLAI_ROUTE_TABLE_MAX_AGE_HOURS", "24"))
+ROUTE_TABLE_TOP_N = int(os.getenv("BELLAI_ROUTE_TABLE_TOP_N", "15"))
+
+TRAVEL_MODES = ["TRANSIT", "WALK", "DRIVE", "BICYCLE"]
+
+# Créneaux horaires (heure de départ représentative de chaque créneau)
+TIME_BUCKETS = {
+    "matin": 8,
+    "midi": 12,
+    "soir": 18,
+    "nuit": 22,
+}
+
+# Destinations les plus demandées, par ordre de popularité (nom canonique + alias)
+TOP_DESTINATIONS: List[Dict[str, Any]] = [
+    {"name": "Tour Eiffel, Paris", "aliases": ["tour eiffel", "eiffel tower", "la tour eiffel"]},
+    {"name": "Musée du Louvre, Paris", "aliases": ["louvre", "musee du louvre", "le louvre"]},
+    {"name": "Paris Expo Porte de Versailles, Paris", "aliases": ["paris expo", "porte de versailles", "parc des expositions"]},
+    {"name": "Arc de Triomphe, Paris", "aliases": ["arc de triomphe"]},
+    {"name": "Cathédrale Notre-Dame de Paris, Paris", "aliases": ["notre dame", "notre-dame", "cathedrale notre dame"]},
+    {"name": "Basilique du Sacré-Cœur, Paris", "aliases": ["sacre coeur", "sacre-coeur", "montmartre"]},
+    {"name": "Champs-Élysées, Paris", "aliases": ["champs elysees", "les champs elysees"]},
+    {"name": "Musée d'Orsay, Paris", "aliases": ["orsay", "musee d'orsay"]},
+    {"name": "Gare Montparnasse, Paris", "aliases": ["montparnasse", "gare montparnasse"]},
+    {"name": "Gare de Lyon, Paris", "aliases": ["gare de lyon"]},
+    {"name": "Gare du Nord, Paris", "aliases": ["gare du nord"]},
+    {"name": "Aéroport de Paris-Orly", "aliases": ["orly", "aeroport d'orly", "aeroport orly"]},
+    {"name": "Aéroport Paris-Charles de Gaulle", "aliases": ["cdg", "roissy", "charles de gaulle", "aeroport cdg"]},
+    {"name": "Opéra Garnier, Paris", "aliases": ["opera", "opera garnier", "palais garnier"]},
+    {"name": "Centre Pompidou, Paris", "aliases": ["pompidou", "beaubourg", "centre pompidou"]},
+    {"name": "Jardin du Luxembourg, Paris", "aliases": ["luxembourg", "jardin du luxembourg"]},
+    {"name": "Disneyland Paris", "aliases": ["disney", "disneyland"]},
+    {"name": "Château de Versailles", "aliases": ["chateau de versailles", "versailles"]},
+]
+
+def normalize_place(name: str) -> str:
+    """Normalise un nom de lieu (accents, casse, ville, articles)"""
+    text = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii").lower()
+    text = re.sub(r",?\s*(\d{5}\s*)?paris( france)?$", "", text.strip())
+    text = re.sub(r"^(la|le|les|l')\s*", "", text)
+    return " ".join(re.sub(r"[^\w' -]", " ", text).split())
+
+def time_bucket(departure_time: Any = None) -> str:
+    """Créneau horaire correspondant à une heure de départ (maintenant par défaut)"""
+    moment = None
+    if isinstance(departure_time, datetime):
+        moment = departure_time
+    elif isinstance(departure_time, str):
+        try:
+            moment = datetime.fromisoformat(departure_time.replace("Z", "+00:00"))
+        except ValueError:
+            moment = None
+    # Créneaux en heure locale : "2025-06-02T06:30:00Z" est à 8h30 à Paris
+    if moment is not None and moment.tzinfo is not None:
+        moment = moment.astimezone()
+    hour = (moment or datetime.now()).hour
+
+    # Créneau dont l'heure représentative précède l'heure demandée
+    bucket = "nuit"
+    for name, start in sorted(TIME_BUCKETS.items(), key=lambda item: item[1]):
+        if hour >= start:
+            bucket = name
+    return bucket
+
+def _next_departure(hour: int) -> str:
+    """Prochaine occurrence de l'heure donnée au format RFC 3339"""
+    now = datetime.now().astimezone()
+    departure = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+    if departure <= now:
+        departure += timedelta(days=1)
+    return departure.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")
+
+class RouteTable:
+    """Stockage local indexé des itinéraires précalculés"""
+
+    def __init__(self, path: str = ROUTE_TABLE_PATH, max_age_hours: float = ROUTE_TABLE_MAX_AGE_HOURS,
+                 destinations: Optional[List[Dict[str, Any]]] = None):
+        self.path = path
+        self.max_age_seconds = max_age_hours * 3600
+        self.destinations = destinations or self._load_destinations()
+        self.aliases = self._build_aliases(self.destinations)
+        self.counters = CounterSet()
+        self._local = threading.local()
+
+    def _load_destinations(self) -> List[Dict[str, Any]]:
+        """Liste configurable via BELLAI_ROUTE_TABLE_DESTINATIONS (fichier JSON)"""
+        custom = os.getenv("BELLAI_ROUTE_TABLE_DESTINATIONS")
+        if custom and os.path.exists(custom):
+            with open(custom, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return TOP_DESTINATIONS
+
+    @staticmethod
+    def _build_aliases(destinations: List[Dict[str, Any]]) -> Dict[str, str]:
+        aliases = {}
+        for destination in destinations:
+            key = normalize_place(destination["name"])
+            aliases[key] = key
+            for alias in destination.get("aliases", []):
+                aliases[normalize_place(alias)] = key
+        return aliases
+
+    def _connection(self) -> sqlite3.Connection:
+        """Connexion SQLite propre au thread courant"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path)
+            connection.execute(
+                """CREATE TABLE IF NOT EXISTS routes (
+                    destination_key TEXT NOT NULL,
+                    travel_mode TEXT NOT NULL,
+                    time_bucket TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    PRIMARY KEY (destination_key, travel_mode, time_bucket)
+                )"""
+            )
+            connection.commit()
+            self._local.connection = connection
+        return connection
+
+    def resolve(self, destination: str) -> Optional[str]:
+        """Clé de la destination précalculée correspondante, si elle existe"""
+        return self.aliases.get(normalize_place(destination))
+
+    def lookup(self, origin: str, destination: str, travel_mode: str, departure_time: Any = None) -> Optional[RouteResult]:
+        """Itinéraire précalculé encore frais, ou None"""
+        if normalize_place(origin) != normalize_place(HOTEL_LOCATION):
+            return None
+        key = self.resolve(destination)
+        if key is None or not os.path.exists(self.path):
+            self.counters.inc("misses")
+            return None
+
+        row = self._connection().execute(
+            "SELECT payload, fetched_at FROM routes WHERE destination_key = ? AND travel_mode = ? AND time_bucket = ?",
+            (key, travel_mode, time_bucket(departure_time)),
+        ).fetchone()
+        if row is None:
+            self.counters.inc("misses")
+            return None
+        if time.time() - row[1] > self.max_age_seconds:
+            self.counters.inc("stale")
+            return None
+
+        self.counters.inc("hits")
+        route = RouteResult.from_dict(json.loads(row[0]))
+        route.origin, route.destination, route.source = origin, destination, "route_table"
+        # Les horaires précis de passage ne sont pas valables pour un autre jour
+        for line in route.transit_lines:
+            line.departure_time = line.arrival_time = None
+        return route
+
+    def store(self, destination_key: str, travel_mode: str, bucket: str, route: RouteResult) -> None:
+        """Enregistre (ou remplace) un itinéraire précalculé"""
+        connection = self._connection()
+        connection.execute(
+            "INSERT OR REPLACE INTO routes VALUES (?, ?, ?, ?, ?)",
+            (destination_key, travel_mode, bucket, json.dumps(route.to_dict(), ensure_ascii=False), time.time()),
+        )
+        connection.commit()
+
+    def rebuild(self, top_n: int = ROUTE_TABLE_TOP_N, modes: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Recalcule les itinéraires des top-N destinations pour chaque mode et créneau"""
+        from bellai.tools.navigation import fetch_route
+
+        report = {"fetched": 0, "errors": []}
+        for destination in self.destinations[:top_n]:
+            key = normalize_place(destination["name"])
+            for mode in modes or TRAVEL_MODES:
+                for bucket, hour in TIME_BUCKETS.items():
+                    departure = _next_departure(hour) if mode in ("TRANSIT", "DRIVE") else None
+                    try:
+                        route = fetch_route(HOTEL_LOCATION, destination["name"], mode, departure)
+                        self.store(key, mode, bucket, route)
+                        report["fetched"] += 1
+                    except Exception as e:
+                        report["errors"].append({"destination": destination["name"], "mode": mode, "bucket": bucket, "error": str(e)})
+        return report
+
+    def coverage(self) -> Dict[str, Any]:
+        """Nombre d'entrées fraîches par destination"""
+        if not os.path.exists(self.path):
+            return {"entries": 0, "fresh": 0, "destinations": {}}
+        rows = self._connection().execute("SELECT destination_key, fetched_at FROM routes").fetchall()
+        now = time.time()
+        destinations: Dict[str, int] = {}
+        fresh = 0
+        for key, fetched_at in rows:
+            if now - fetched_at <= self.max_age_seconds:
+                fresh += 1
+                destinations[key] = destinations.get(key, 0) + 1
+        expected = len(TRAVEL_MODES) * len(TIME_BUCKETS)
+        return {
+            "entries": len(rows),
+            "fresh": fresh,
+            "destinations": {key: f"{count}/{expected}" for key, count in sorted(destinations.items())},
+        }
+
+    def log_coverage(self, conversations: Dict[str, List[Dict]]) -> Dict[str, Any]:
+        """Part des demandes d'itinéraire des journaux servies par la table"""
+        from bellai.core.prefetch import extract_destination
+
+        requested: List[Tuple[str, Optional[str]]] = []
+        for messages in conversations.values():
+            for msg in messages:
+                if msg.get("role") != "user":
+                    continue
+                destination = extract_destination(msg.get("content", ""))
+                if destination:
+                    requested.append((destination, self.resolve(destination)))
+
+        covered = [destination for destination, key in requested if key]
+        missing: Dict[str, int] = {}
+        for destination, key in requested:
+            if not key:
+                missing[destination] = missing.get(destination, 0) + 1
+        return {
+            "route_requests": len(requested),
+            "covered": len(covered),
+            "coverage": round(len(covered) / len(requested), 3) if requested else None,
+            "top_missing": sorted(missing.items(), key=lambda item: item[1], reverse=True)[:10],
+        }
+
+ROUTE_TABLE_SCHEDULE_HOURS = float(os.getenv("BELLAI_ROUTE_TABLE_SCHEDULE_HOURS", "0"))
+
+_scheduler: Optional[threading.Thread] = None
+_scheduler_lock = threading.Lock()
+
+def start_scheduler(table: "RouteTable", interval_hours: float = 12.0, top_n: int = ROUTE_TABLE_TOP_N) -> threading.Thread:
+    """Reconstruit périodiquement la table dans un thread de fond (un seul par process)"""
+    global _scheduler
+
+    def loop():
+        # Table encore fraîche (redémarrage) : première reconstruction à l'échéance suivante
+        expected = min(top_n, len(table.destinations)) * len(TRAVEL_MODES) * len(TIME_BUCKETS)
+        if table.coverage()["fresh"] < expected:
+            table.rebuild(top_n)
+        while True:
+            time.sleep(interval_hours * 3600)
+            table.rebuild(top_n)
+
+    with _scheduler_lock:
+        if _scheduler is None or not _scheduler.is_alive():
+            _scheduler = threading.Thread(target=loop, name="bellai-route-table", daemon=True)
+            _scheduler.start()
+        return _scheduler
+
+def start_scheduler_from_env() -> Optional[threading.Thread]:
+    """Démarre la reconstruction périodique si BELLAI_ROUTE_TABLE_SCHEDULE_HOURS est défini (> 0)"""
+    if ROUTE_TABLE_SCHEDULE_HOURS <= 0:
+        return None
+    return start_scheduler(route_table, ROUTE_TABLE_SCHEDULE_HOURS)
+
+# Instance globale
+route_table = RouteTable()
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Table d'itinéraires précalculés BellAI")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    rebuild_parser = subparsers.add_parser("rebuild", help="Recalcule la table depuis l'API Google Routes")
+    rebuild_parser.add_argument("--top-n", type=int, default=ROUTE_TABLE_TOP_N)
+    rebuild_parser.add_argument("--modes", nargs="*", choices=TRAVEL_MODES)
+
+    schedule_parser = subparsers.add_parser("schedule", help="Reconstruit la table périodiquement (premier plan)")
+    schedule_parser.add_argument("--interval-hours", type=float, default=ROUTE_TABLE_SCHEDULE_HOURS or 12.0)
+    schedule_parser.add_argument("--top-n", type=int, default=ROUTE_TABLE_TOP_N)
+
+    coverage_parser = subparsers.add_parser("coverage", help="Couverture de la table (et des journaux)")
+    coverage_parser.add_argument("--logs", help="Export JSON de ChatMemoryManager.save_to_file")
+
+    args = parser.parse_args(argv)
+    if args.command == "schedule":
+        start_scheduler(route_table, args.interval_hours, args.top_n).join()
+        return
+    if args.command == "rebuild":
+        report = route_table.rebuild(args.top_n, args.modes)
+    else:
+        report = route_table.coverage()
+        if args.logs:
+            with open(args.logs, "r", encoding="utf-8") as f:
+                report["logs"] = route_table.log_coverage(json.load(f))
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+if __name__ == "__main__":
+    main()
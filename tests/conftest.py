@@ -0,0 +1,12 @@
+# tests/conftest.py
+import os
+
+# Clés factices : les clients Google/Azure valident leur format dès l'import des modules
+os.environ.setdefault("GPLACES_API_KEY", "AIza" + "x" * 35)
+os.environ.setdefault("AZURE_OPENAI_API_KEY", "test")
+os.environ.setdefault("AZURE_OPENAI_ENDPOINT", "https://test.openai.azure.com/")
+os.environ.setdefault("AZURE_OPENAI_DEPLOYMENT_NAME", "bellai")
+
+# Rejeu d'une cassette (BELLAI_CASSETTE, BELLAI_CASSETTE_MODE=replay) : suite exécutable sans réseau
+from bellai.testing.cassette import get_cassette
+get_cassette()
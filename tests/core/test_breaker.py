@@ -0,0 +1,98 @@
+# tests/core/test_breaker.py
+import time
+import pytest
+import requests
+from bellai.core.breaker import BreakerState, CircuitBreaker, CircuitOpen
+from bellai.tools import navigation
+from bellai.tools.route_result import RouteResult
+
+def make_breaker(**overrides) -> CircuitBreaker:
+    breaker = CircuitBreaker("test", slow_call_seconds=1.0)
+    breaker.min_calls = 4
+    breaker.open_seconds = 0.05
+    breaker.half_open_probes = 1
+    for name, value in overrides.items():
+        setattr(breaker, name, value)
+    return breaker
+
+def fail(breaker: CircuitBreaker) -> None:
+    with pytest.raises(ValueError):
+        with breaker.guard((ValueError,)):
+            raise ValueError("500")
+
+def test_opens_on_error_rate_then_recovers_through_half_open_probe():
+    breaker = make_breaker()
+    with breaker.guard():
+        pass
+    for _ in range(3):
+        fail(breaker)
+    assert breaker.state == BreakerState.OPEN
+
+    # Ouvert : refus immédiat sans appeler la dépendance
+    with pytest.raises(CircuitOpen):
+        breaker.allow()
+
+    time.sleep(0.06)
+    with breaker.guard():
+        # Une seule sonde à la fois en demi-ouverture
+        assert breaker.state == BreakerState.HALF_OPEN
+        with pytest.raises(CircuitOpen):
+            breaker.allow()
+    assert breaker.state == BreakerState.CLOSED
+    assert breaker.get_metrics()["opened"] == 1
+
+def test_functional_errors_and_slow_calls():
+    breaker = make_breaker(slow_call_seconds=0.0)
+    # Une erreur fonctionnelle ne compte pas comme panne, mais la lenteur oui
+    for _ in range(4):
+        with pytest.raises(KeyError):
+            with breaker.guard((ValueError,)):
+                raise KeyError("aucun itinéraire")
+    assert breaker.get_metrics()["failures"] == 0
+    assert breaker.state == BreakerState.OPEN
+
+def test_get_route_serves_stale_result_when_routes_api_is_down(monkeypatch):
+    breaker = make_breaker(open_seconds=60)
+    monkeypatch.setattr(navigation, "routes_breaker", breaker)
+    monkeypatch.setattr(navigation.route_table, "lookup", lambda *args: None)
+
+    route = RouteResult(origin="Hôtel", destination="Opéra Garnier", travel_mode="DRIVE",
+                        duration_seconds=900, distance_meters=6000)
+    monkeypatch.setattr(navigation.requests, "post", lambda *a, **k: type("R", (), {"json": lambda self: {"routes": [{}]}})())
+    monkeypatch.setattr(navigation, "parse_routes_response", lambda *args: route)
+    assert "❌" not in navigation.get_route.func("Hôtel", "Opéra Garnier", "DRIVE")
+
+    def down(*args, **kwargs):
+        raise requests.exceptions.ConnectionError("down")
+    monkeypatch.setattr(navigation.requests, "post", down)
+    for _ in range(4):
+        assert navigation.get_route.func("Gare de Lyon", "Opéra Garnier", "DRIVE").startswith("❌")
+    assert breaker.state == BreakerState.OPEN
+
+    stale = navigation.get_route.func("Hôtel", "Opéra Garnier", "DRIVE")
+    assert stale.startswith("⚠️ RÉSULTAT EN CACHE")
+    assert navigation.get_route.func("Gare de Lyon", "Opéra Garnier", "DRIVE").startswith("❌ Service indisponible")
+
+def test_stale_route_and_single_destination_matrix_do_not_collide(monkeypatch):
+    breaker = make_breaker(open_seconds=60)
+    monkeypatch.setattr(navigation, "routes_breaker", breaker)
+    monkeypatch.setattr(navigation.route_table, "lookup", lambda *args: None)
+    monkeypatch.setattr(navigation, "stale_routes", navigation.StaleCache())
+
+    route = RouteResult(origin="Hôtel", destination="Opéra Garnier", travel_mode="DRIVE",
+                        duration_seconds=900, distance_meters=6000)
+    monkeypatch.setattr(navigation, "fetch_route", lambda *args: route)
+    monkeypatch.setattr(navigation, "fetch_route_matrix", lambda *args: [
+        {"destination": "Opéra Garnier", "found": True, "distance_meters": 6000, "duration_seconds": 900}])
+    navigation.get_route.func("Hôtel", "Opéra Garnier", "DRIVE")
+    navigation.get_route_matrix.func("Hôtel", ["Opéra Garnier"], "DRIVE")
+    assert route.route_id is None
+
+    def down(*args):
+        raise CircuitOpen("google_routes", 30)
+    monkeypatch.setattr(navigation, "fetch_route", down)
+    monkeypatch.setattr(navigation, "fetch_route_matrix", down)
+    stale_route = navigation.get_route.func("Hôtel", "Opéra Garnier", "DRIVE")
+    stale_matrix = navigation.get_route_matrix.func("Hôtel", ["Opéra Garnier"], "DRIVE")
+    assert stale_route.startswith("⚠️ RÉSULTAT EN CACHE") and "❌" not in stale_route
+    assert stale_matrix.startswith("⚠️ RÉSULTAT EN CACHE") and "1. Opéra Garnier" in stale_matrix
@@ -0,0 +1,75 @@
+# tests/core/test_budget.py
+import asyncio
+import pytest
+from bellai.core import agent as agent_module
+from bellai.core.agent import BellAIAgent
+from bellai.core.budget import TokenLedger
+from bellai.core.intention import action_manager
+from bellai.core.metrics import TURNS
+from bellai.core.turn_stats import turn_stats
+from bellai.core.memory import chat_memory
+from bellai.core.router import ModelRoute
+from bellai.testing.fake_llm import FakeChatModel
+
+@pytest.fixture
+def token_ledger(monkeypatch):
+    # Registre vierge : les autres tests de la suite alimentent le registre global
+    ledger = TokenLedger()
+    ledger.session_soft, ledger.session_hard = 150, 400
+    monkeypatch.setattr(agent_module, "token_ledger", ledger)
+    return ledger
+
+def test_budgets_shrink_then_stop_model_calls(monkeypatch, token_ledger):
+    model = FakeChatModel(script=["Volontiers."] * 10, prompt_tokens=100, completion_tokens=10)
+    max_tokens = []
+    original = FakeChatModel._agenerate
+
+    async def spy(self, messages, stop=None, run_manager=None, **kwargs):
+        max_tokens.append(kwargs.get("max_tokens"))
+        return await original(self, messages, stop=stop, run_manager=run_manager, **kwargs)
+    monkeypatch.setattr(FakeChatModel, "_agenerate", spy)
+
+    agent = BellAIAgent(models={route: model for route in ModelRoute})
+    session_id = "budget_guest_20250101_120000"
+    results = [asyncio.run(agent.process_message("Une question", session_id)) for _ in range(5)]
+
+    assert [result["budget"] for result in results] == ["ok", "ok", "soft", "soft", "hard"]
+    assert max_tokens == [None, None, token_ledger.soft_max_tokens, token_ledger.soft_max_tokens]
+    assert chat_memory.get_langchain_memory(session_id).k == token_ledger.soft_history
+    assert results[-1]["status"] == "budget_exhausted"
+
+    ledger = agent.get_token_ledger(session_id=session_id)
+    assert (ledger["turns"], ledger["prompt_tokens"], ledger["completion_tokens"]) == (4, 400, 40)
+    assert ledger["guest_id"] == "budget_guest"
+    assert agent.get_token_ledger(guest_id="budget_guest")["sessions"] == [session_id]
+    report = agent.get_token_ledger()
+    assert report["totals"]["total_tokens"] == ledger["total_tokens"] == 440
+    assert report["turns_by_budget"] == {"ok": 2, "soft": 2, "hard": 1}
+    chat_memory.clear_session(session_id)
+
+def test_budget_exhausted_turn_returns_this_turn_escalation(token_ledger):
+    model = FakeChatModel(script=["Volontiers."] * 5, prompt_tokens=400, completion_tokens=10)
+    agent = BellAIAgent(models={route: model for route in ModelRoute})
+    session_id = "budget_escalation_20250101_120000"
+    asyncio.run(agent.process_message("Une question", session_id))
+
+    refused = TURNS.samples().get(("budget_exhausted", ModelRoute.MAIN.value), 0)
+    turns = turn_stats.counters.get("turns")
+
+    # Escalade créée par l'ordonnanceur avant l'exécution du tour, sans appel au modèle
+    result = asyncio.run(agent.process_message("Je veux déposer une plainte auprès du responsable", session_id))
+    assert result["status"] == "budget_exhausted"
+    assert [action["action_type"] for action in result["backend_actions"]] == ["escalate_to_human"]
+    assert result["intentions_detected"]
+    assert result["stats"]["iterations"] == 0
+    # Refus visibles dans les agrégats et dans bellai_turns_total{status="budget_exhausted"}
+    assert turn_stats.counters.get("turns") == turns + 1
+    assert TURNS.samples()[("budget_exhausted", ModelRoute.MAIN.value)] == refused + 1
+
+    # Tour suivant : l'escalade précédente n'est plus celle de ce tour
+    result = asyncio.run(agent.process_message("Merci", session_id))
+    assert result["backend_actions"] == []
+    assert set(result["stats"]) >= {"total_ms", "wait_ms", "prompt_tokens"}
+    for action in action_manager.get_pending_actions(session_id):
+        action_manager.cancel_action(action.id)
+    chat_memory.clear_session(session_id)
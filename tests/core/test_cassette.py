@@ -0,0 +1,43 @@
+# tests/core/test_cassette.py
+import asyncio
+from bellai.core.agent import BellAIAgent
+from bellai.core.memory import chat_memory
+from bellai.core.router import ModelRoute
+from bellai.testing.cassette import Cassette, CassetteChatModel
+from bellai.testing.fake_llm import FakeChatModel
+from bellai.testing.google_stub import GoogleStubServer
+from bellai.tools import navigation
+
+SCRIPT = [
+    ("get_route", {"origin": "Hôtel BellAI", "destination": "Basilique de Saint-Denis", "travel_mode": "DRIVE"}),
+    "Comptez environ 30 minutes en voiture.",
+]
+
+def run_turn(model, session_id: str):
+    agent = BellAIAgent(models={route: model for route in ModelRoute})
+    agent.turn_deadline = 0
+    result = asyncio.run(agent.process_message("Comment aller à Saint-Denis en voiture ?", session_id))
+    chat_memory.clear_session(session_id)
+    return result
+
+def test_recorded_turn_replays_offline(tmp_path, monkeypatch):
+    path = str(tmp_path / "turn.jsonl.gz")
+
+    with GoogleStubServer(latency=0.05) as google:
+        monkeypatch.setattr(navigation, "ROUTES_API_URL", f"{google.url}/directions/v2:computeRoutes")
+        recorder = Cassette(path, mode="record")
+        with recorder.intercept_http():
+            recorded = run_turn(CassetteChatModel(inner=FakeChatModel(script=SCRIPT), cassette=recorder), "cassette_rec")
+        # Deux appels au modèle, plus les itinéraires demandés (préchargement compris)
+        exchanges = 2 + sum(google.requests.values())
+    assert recorder.counters["recorded"] == exchanges
+
+    # Serveur arrêté et aucun modèle : tout vient de la cassette
+    player = Cassette(path, mode="replay", latency="zero")
+    with player.intercept_http():
+        replayed = run_turn(CassetteChatModel(cassette=player), "cassette_play")
+
+    assert replayed["status"] == "success"
+    assert replayed["response"] == recorded["response"] == "Comptez environ 30 minutes en voiture."
+    assert replayed["route_details"][0]["duration_seconds"] == recorded["route_details"][0]["duration_seconds"]
+    assert player.counters == {"recorded": 0, "replayed": exchanges, "misses": 0}
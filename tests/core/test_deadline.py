@@ -0,0 +1,48 @@
+# tests/core/test_deadline.py
+import time
+import asyncio
+from bellai.core.agent import BellAIAgent
+from bellai.core.deadline import FALLBACK_MESSAGE, build_partial_answer
+from bellai.core.intention import BackendAction, action_manager
+from bellai.core.memory import chat_memory
+from bellai.core.router import ModelRoute
+from bellai.testing.fake_llm import FakeChatModel
+
+def test_partial_answer_keeps_presentable_results_and_actions():
+    observations = [
+        ("get_client_preferences", "Cuisine: française"),
+        ("get_route", "À pied • 600 m • 8 min\nROUTE_ID: route_1_1"),
+        ("search_places", "❌ Timeout"),
+    ]
+    answer = build_partial_answer(observations, [{"action_type": "create_booking_restaurant"}])
+    assert answer.splitlines() == [
+        "Voici ce que j'ai pu trouver :",
+        "À pied • 600 m • 8 min",
+        "Voulez-vous que j'ouvre l'interface de réservation ?",
+    ]
+    assert build_partial_answer([], []) == FALLBACK_MESSAGE
+
+def test_turn_returns_partial_answer_at_deadline():
+    script = [("find_closest_places", {"category": "gare"}), "Réponse trop tardive"]
+    agent = BellAIAgent(models={route: FakeChatModel(script=script, latency=0.2) for route in ModelRoute})
+    agent.turn_deadline = 0.3
+    session_id = "deadline_session"
+    # Réservation encore en attente, détectée à un tour précédent de la session
+    earlier = BackendAction("create_booking_restaurant", {"service": "restaurant"})
+    earlier.session_id, earlier.turn_id = session_id, "earlier_turn"
+    action_manager.store_action(earlier)
+
+    started = time.perf_counter()
+    result = asyncio.run(agent.process_message("Quelle est la gare la plus proche ?", session_id))
+    elapsed = time.perf_counter() - started
+
+    assert result["status"] == "partial"
+    assert result["response"].startswith("Voici ce que j'ai pu trouver :")
+    assert "Réponse trop tardive" not in result["response"]
+    assert "réservation" not in result["response"]
+    # Borne large : le statut et le contenu suffisent à montrer que le tour a été interrompu
+    assert elapsed < 5
+    assert chat_memory.get_conversation_history(session_id)[-1]["content"] == result["response"]
+    assert agent.get_session_metrics()["deadline_exceeded"] == 1
+    action_manager.cancel_action(earlier.id)
+    chat_memory.clear_session(session_id)
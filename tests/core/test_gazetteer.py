@@ -0,0 +1,108 @@
+# tests/core/test_gazetteer.py
+import json
+import pytest
+from bellai.tools.gazetteer import WALK_THRESHOLD_M, Gazetteer, choose_travel_mode, find_closest_places, gazetteer
+from bellai.tools.navigation import resolve_travel_mode
+
+@pytest.mark.parametrize("query, name", [
+    ("Tour Eiffel", "Tour Eiffel"),                              # nom exact
+    ("la tour eiffel, Paris", "Tour Eiffel"),                    # article, casse, ville
+    ("le louvre", "Musée du Louvre"),                            # alias
+    ("le Louvre à Paris", "Musée du Louvre"),                    # inclusion, mots de liaison seulement
+    ("Tour Eifel", "Tour Eiffel"),                               # approchée
+])
+def test_match_rules(query, name):
+    assert gazetteer.match(query)["name"] == name
+
+@pytest.mark.parametrize("query", [
+    "", "Boulangerie Dupont", "navette cdg terminal 2",
+    # Nom d'établissement ou adresse contenant un nom connu : un autre lieu
+    "Pizzeria Montmartre, 10 rue de Lyon",
+    "Restaurant Le Louvre Ripaille, Rue du Commerce",
+    "Musée du Louvre, rue de Rivoli",
+    "Opéra Bastille",
+    "Pharmacie de la Convention",
+])
+def test_match_rejects_unknown_and_short_contained_names(query):
+    # Alias de moins de 4 caractères ("cdg") : jamais retenu par inclusion
+    assert gazetteer.match(query) is None
+
+def test_lookup_is_exact_or_alias_only():
+    assert gazetteer.lookup("Eiffel Tower")["name"] == "Tour Eiffel"
+    assert gazetteer.lookup("Tour Eifel") is None
+    assert gazetteer.lookup("Musée du Louvre, rue de Rivoli") is None
+
+@pytest.mark.parametrize("query, category", [
+    ("métro", "metro"),
+    ("station de métro", "metro"),
+    ("Musées", "musee"),
+    ("les hôpitaux", "hopital"),
+    ("un théâtre", "spectacle"),
+    ("jardin", "parc"),
+    ("restaurant", None),
+])
+def test_resolve_category(query, category):
+    assert gazetteer.resolve_category(query) == category
+
+def test_closest_by_category_sorted_by_distance():
+    stations = gazetteer.closest("station de métro", n=10)
+    assert len(stations) == 4
+    assert {place["category"] for place in stations} == {"métro"}
+    assert [place["distance_m"] for place in stations] == sorted(place["distance_m"] for place in stations)
+    assert stations == gazetteer.closest("métro", n=10)
+
+    assert gazetteer.closest("restaurant") == []
+    assert "search_places" in find_closest_places.invoke({"category": "restaurant"})
+
+def test_closest_from_point_and_limit():
+    eiffel = gazetteer.lookup("Tour Eiffel")
+    nearest = gazetteer.closest(lat=eiffel["lat"], lon=eiffel["lon"], n=2)
+    assert nearest[0]["name"] == "Tour Eiffel"
+    assert nearest[0]["distance_m"] == 0
+    assert len(nearest) == 2
+
+def test_categories_of_a_custom_file(tmp_path):
+    path = tmp_path / "gazetteer.json"
+    path.write_text(json.dumps({
+        "hotel": {"name": "Hôtel", "address": "1 rue de Test, 75015 Paris", "lat": 48.84, "lon": 2.29},
+        "places": [
+            {"name": "Le Bistrot", "category": "restaurant", "lat": 48.841, "lon": 2.291},
+            {"name": "Café de la Gare", "category": "café", "lat": 48.85, "lon": 2.30},
+        ],
+    }), encoding="utf-8")
+    local = Gazetteer(str(path))
+    assert [place["name"] for place in local.closest("restaurants")] == ["Le Bistrot"]
+    assert [place["name"] for place in local.closest("un café")] == ["Café de la Gare"]
+
+@pytest.mark.parametrize("distance, mode", [
+    (0, "WALK"),
+    (WALK_THRESHOLD_M - 1, "WALK"),
+    (WALK_THRESHOLD_M, "TRANSIT"),
+    (5000, "TRANSIT"),
+    (None, "TRANSIT"),
+])
+def test_walk_threshold(distance, mode):
+    assert WALK_THRESHOLD_M == 1000
+    assert choose_travel_mode(distance) == mode
+
+@pytest.mark.parametrize("destination", [
+    "Pizzeria Montmartre, 10 rue de Lyon",
+    "Restaurant Le Louvre Ripaille, Rue du Commerce",
+    "Opéra Bastille",
+    "Pharmacie de la Convention",
+])
+def test_unknown_business_address_gets_no_mode_preselection(destination):
+    # Aucune distance locale : mode par défaut, sans emprunter la position d'un lieu voisin par le nom
+    assert gazetteer.distance_from_hotel(destination) is None
+    assert resolve_travel_mode(gazetteer.hotel["address"], destination, "AUTO") == choose_travel_mode(None)
+    assert resolve_travel_mode("Tour Eiffel", destination, "AUTO") == choose_travel_mode(None)
+
+def test_known_place_keeps_mode_preselection():
+    assert resolve_travel_mode(gazetteer.hotel["address"], "Paris Expo Porte de Versailles", "AUTO") == "WALK"
+    assert resolve_travel_mode(gazetteer.hotel["address"], "Tour Eiffel", "AUTO") == "TRANSIT"
+    assert resolve_travel_mode(gazetteer.hotel["address"], "Tour Eiffel", "DRIVE") == "DRIVE"
+
+def test_distance_from_hotel():
+    assert gazetteer.distance_from_hotel("Paris Expo Porte de Versailles") < WALK_THRESHOLD_M
+    assert gazetteer.distance_from_hotel("Tour Eiffel") > WALK_THRESHOLD_M
+    assert gazetteer.distance_from_hotel("Boulangerie Dupont") is None
@@ -0,0 +1,72 @@
+# tests/core/test_governor.py
+import time
+import asyncio
+import pytest
+from typing import Any, List
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from bellai.core.governor import GovernedChatModel, GovernorRejected, RateGovernor
+
+class Throttled(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after_ms: str):
+        super().__init__("429")
+        self.response = type("Response", (), {"headers": {"retry-after-ms": retry_after_ms}})()
+
+class ScriptedModel(BaseChatModel):
+    """Modèle factice : lève les erreurs prévues puis répond après un délai"""
+    errors: List[Any] = []
+    delay: float = 0.0
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        raise NotImplementedError
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        await asyncio.sleep(self.delay)
+        message = AIMessage(content="ok", usage_metadata={"input_tokens": 10, "output_tokens": 5, "total_tokens": 15})
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+def test_retry_after_is_honoured_and_concurrency_halved():
+    governor = RateGovernor("test")
+    model = GovernedChatModel(inner=ScriptedModel(errors=[Throttled("200")]), governor=governor)
+
+    started = time.perf_counter()
+    assert asyncio.run(model.ainvoke([HumanMessage(content="bonjour")])).content == "ok"
+
+    assert time.perf_counter() - started >= 0.2
+    metrics = governor.get_metrics()
+    assert metrics["throttled"] == 1 and metrics["retries"] == 1
+    assert metrics["concurrency_limit"] < 8
+
+def test_requests_queue_behind_concurrency_limit():
+    governor = RateGovernor("test")
+    governor.concurrency_limit = 2
+    governor.max_concurrency = 2
+    model = GovernedChatModel(inner=ScriptedModel(delay=0.1), governor=governor)
+
+    async def burst():
+        return await asyncio.gather(*(model.ainvoke([HumanMessage(content="x")]) for _ in range(4)))
+
+    started = time.perf_counter()
+    assert len(asyncio.run(burst())) == 4
+    assert time.perf_counter() - started >= 0.2
+    metrics = governor.get_metrics()
+    assert metrics["max_queue_depth"] >= 2 and metrics["queued"] >= 2
+    assert metrics["in_flight"] == 0 and metrics["queue_depth"] == 0
+
+def test_full_queue_rejects():
+    governor = RateGovernor("test")
+    governor.max_queue = 0
+    with pytest.raises(GovernorRejected):
+        asyncio.run(governor.acquire(10))
+    assert governor.get_metrics()["rejected_queue_full"] == 1
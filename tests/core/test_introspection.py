@@ -0,0 +1,32 @@
+# tests/core/test_introspection.py
+import asyncio
+from bellai.core.agent import BellAIAgent
+from bellai.core.introspection import approx_sizeof, memory_introspector
+from bellai.core.memory import chat_memory
+from bellai.core.router import ModelRoute
+from bellai.testing.fake_llm import FakeChatModel
+
+def test_sampled_sizeof_stays_close_to_exact_size():
+    rows = [{"role": "user", "content": "x" * (50 + i % 100)} for i in range(2000)]
+    exact = approx_sizeof(rows, sample=len(rows))
+    assert abs(approx_sizeof(rows, sample=200) - exact) / exact < 0.25
+
+def test_report_ranks_heaviest_session_and_diffs_allocations():
+    agent = BellAIAgent(models={route: FakeChatModel(script=["D'accord."] * 20) for route in ModelRoute})
+    agent.get_allocation_diff()
+    for _ in range(5):
+        asyncio.run(agent.process_message("Bonjour " + "détails " * 200, "heavy_session"))
+    asyncio.run(agent.process_message("Bonjour", "light_session"))
+
+    report = agent.get_memory_report(top=50)
+    sizes = {entry["session_id"]: entry["bytes"] for entry in report["top_sessions"]}
+    # Cinq messages de plus de 1600 caractères, dans l'historique et dans la mémoire LangChain
+    assert sizes["heavy_session"] - sizes["light_session"] > 2 * 5 * 1600
+    assert report["subsystems"]["chat_history"]["bytes"] > 0
+    assert report["total_bytes"] == sum(s["bytes"] for s in report["subsystems"].values())
+
+    diff = agent.get_allocation_diff()
+    assert diff["size_diff"] > 0 and diff["top"]
+    memory_introspector.stop_allocation_tracking()
+    chat_memory.clear_session("heavy_session")
+    chat_memory.clear_session("light_session")
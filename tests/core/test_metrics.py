@@ -0,0 +1,61 @@
+# tests/core/test_metrics.py
+import asyncio
+import threading
+from bellai.core.agent import BellAIAgent, bellai_agent
+from bellai.core.memory import chat_memory
+from bellai.core.metrics import MetricsRegistry, metrics_app, registry
+from bellai.core.router import ModelRoute
+from bellai.testing.fake_llm import FakeChatModel
+
+def test_per_thread_samples_are_merged_in_exposition():
+    metrics = MetricsRegistry()
+    requests = metrics.counter("demo_requests", "Requêtes", ("kind",))
+    latency = metrics.histogram("demo_latency_seconds", "Latence", buckets=(0.1, 1.0))
+
+    def work():
+        for _ in range(1000):
+            requests.inc(kind='a"b')
+            latency.observe(0.5)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    text = metrics.exposition()
+    assert '# TYPE demo_requests counter' in text
+    assert 'demo_requests_total{kind="a\\"b"} 4000' in text
+    assert 'demo_latency_seconds_bucket{le="0.1"} 0' in text
+    assert 'demo_latency_seconds_bucket{le="1.0"} 4000' in text
+    assert 'demo_latency_seconds_bucket{le="+Inf"} 4000' in text
+    assert 'demo_latency_seconds_count 4000' in text
+
+def test_agent_turn_is_exported_over_asgi():
+    model = FakeChatModel(script=[("get_client_preferences", {}), "Le Patio vous attend ce soir."])
+    agent = BellAIAgent(models={route: model for route in ModelRoute})
+    asyncio.run(agent.process_message("J'ai faim", "metrics_session"))
+    chat_memory.clear_session("metrics_session")
+
+    sent = []
+    async def send(message):
+        sent.append(message)
+    asyncio.run(metrics_app({"type": "http", "path": "/metrics"}, None, send))
+
+    assert sent[0]["status"] == 200
+    body = sent[1]["body"].decode()
+    assert 'bellai_turns_total{status="success"' in body
+    assert 'bellai_tool_duration_seconds_count{tool="get_client_preferences"}' in body
+    assert 'bellai_actions{state="pending"}' in body
+    assert 'bellai_cache_hits_total{cache="prefetch"}' in body
+    assert "bellai_scheduler_queue_depth 0" in body
+
+def test_new_agent_does_not_rebind_gauges(monkeypatch):
+    # Un agent créé après l'instance globale (tests, benchmarks) ne remplace pas ses jauges
+    agent = BellAIAgent(models={route: FakeChatModel(script=["ok"]) for route in ModelRoute})
+    monkeypatch.setattr(agent.sessions, "get_metrics", lambda: {"active_sessions": 99, "waiting_turns": 99})
+    monkeypatch.setattr(agent.scheduler, "get_metrics", lambda: {"queue_depth": 99, "running": 99})
+
+    body = registry.exposition()
+    assert f"bellai_active_sessions {bellai_agent.sessions.get_metrics()['active_sessions']}" in body
+    assert f"bellai_scheduler_running {bellai_agent.scheduler.get_metrics()['running']}" in body
@@ -0,0 +1,151 @@
+# tests/core/test_navigation.py
+import pytest
+from bellai.core.breaker import StaleCache
+from bellai.testing.google_stub import GoogleStubServer
+from bellai.tools import navigation
+from bellai.tools.gazetteer import gazetteer
+from bellai.tools.route_result import RouteResult
+
+HOTEL = gazetteer.hotel["address"]
+
+class RecordingRouter:
+    """Routeur local factice : enregistre les coordonnées demandées"""
+
+    def __init__(self):
+        self.calls = []
+
+    def route(self, start, end, *args):
+        self.calls.append((start, end))
+        return "local"
+
+@pytest.fixture
+def transit_router(monkeypatch):
+    router = RecordingRouter()
+    monkeypatch.setattr(navigation, "get_transit_router", lambda: router)
+    return router
+
+@pytest.fixture
+def walk_router(monkeypatch):
+    router = RecordingRouter()
+    monkeypatch.setattr(navigation, "get_walk_router", lambda: router)
+    return router
+
+def test_coordinates_accept_exact_name_and_alias():
+    assert navigation._coordinates("Tour Eiffel") == (48.8584, 2.2945)
+    assert navigation._coordinates("sacré-coeur") == navigation._coordinates("Montmartre")
+    assert navigation._coordinates(HOTEL) == (gazetteer.hotel["lat"], gazetteer.hotel["lon"])
+
+def test_coordinates_reject_partial_match():
+    # L'alias "montmartre" est contenu dans l'adresse, mais ce n'est pas la basilique
+    assert gazetteer.match("Pizzeria Montmartre, 10 rue de Lyon") is None
+    assert navigation._coordinates("Pizzeria Montmartre, 10 rue de Lyon") is None
+
+def test_transit_route_falls_back_for_unknown_address(transit_router):
+    assert navigation.local_transit_route(HOTEL, "Pizzeria Montmartre, 10 rue de Lyon") is None
+    assert transit_router.calls == []
+
+    assert navigation.local_transit_route(HOTEL, "Tour Eiffel") == "local"
+    assert transit_router.calls[0][1] == (48.8584, 2.2945)
+
+@pytest.mark.parametrize("destination", ["Pizzeria Montmartre, 10 rue de Lyon", "Café du Louvre Rivoli", "12 rue Inconnue"])
+def test_walk_route_falls_back_for_unknown_or_partial_destination(walk_router, destination):
+    assert navigation.local_walk_route(HOTEL, destination) is None
+    assert walk_router.calls == []
+
+def test_walk_route_uses_exact_alias(walk_router):
+    assert navigation.local_walk_route("Tour Eiffel", "louvre") == "local"
+    assert walk_router.calls == [((48.8584, 2.2945), (48.8606, 2.3376))]
+
+def test_travel_mode_ignores_partial_match():
+    # Pas de présélection de mode d'après un lieu voisin par le nom
+    assert gazetteer.distance_from_hotel("Pizzeria Montmartre, 10 rue de Lyon") is None
+
+def test_cached_route_is_copied_before_any_write(monkeypatch):
+    # Même objet rendu à chaque appel, comme un cache partagé
+    cached = RouteResult(origin=HOTEL, destination="Orly", travel_mode="DRIVE", distance_meters=15000, duration_seconds=1500)
+    monkeypatch.setattr(navigation.route_table, "lookup", lambda *args: cached)
+
+    car = navigation.get_route.invoke({"origin": HOTEL, "destination": "Orly", "travel_mode": "DRIVE"})
+    taxi = navigation.get_route.invoke({"origin": HOTEL, "destination": "Orly", "travel_mode": "DRIVE", "vehicle_type": "taxi"})
+
+    assert taxi.startswith("Taxi • 15.0 km • 25 min")
+    assert not car.startswith("Taxi")
+    assert (cached.vehicle_type, cached.route_id) == ("car", None)
+
+def _google(monkeypatch, matrix=None) -> GoogleStubServer:
+    google = GoogleStubServer(matrix=matrix).start()
+    monkeypatch.setattr(navigation, "ROUTE_MATRIX_API_URL", f"{google.url}/distanceMatrix/v2:computeRouteMatrix")
+    monkeypatch.setattr(navigation, "stale_routes", StaleCache())
+    return google
+
+def test_fetch_route_matrix_parses_elements(monkeypatch):
+    bodies = []
+
+    def matrix(body):
+        bodies.append(body)
+        return [
+            {"originIndex": 0, "destinationIndex": 1, "condition": "ROUTE_EXISTS", "distanceMeters": 2500, "duration": "754.5s"},
+            {"originIndex": 0, "destinationIndex": 0, "condition": "ROUTE_EXISTS"},
+        ]
+
+    google = _google(monkeypatch, matrix)
+    try:
+        results = navigation.fetch_route_matrix(HOTEL, ["Musée Rodin", "Tour Eiffel"], "DRIVE")
+    finally:
+        google.stop()
+
+    # Éléments dans l'ordre de la réponse, rattachés par destinationIndex ; champs absents à 0
+    assert results == [
+        {"destination": "Tour Eiffel", "found": True, "distance_meters": 2500, "duration_seconds": 754},
+        {"destination": "Musée Rodin", "found": True, "distance_meters": 0, "duration_seconds": 0},
+    ]
+    assert bodies[0]["travelMode"] == "DRIVE"
+    assert bodies[0]["routingPreference"] == "TRAFFIC_AWARE"
+    assert [d["waypoint"]["address"] for d in bodies[0]["destinations"]] == ["Musée Rodin", "Tour Eiffel"]
+
+def test_route_matrix_sorted_by_duration_with_partial_failures(monkeypatch):
+    elements = [
+        {"originIndex": 0, "destinationIndex": 0, "condition": "ROUTE_EXISTS", "distanceMeters": 6100, "duration": "1980s"},
+        {"originIndex": 0, "destinationIndex": 1, "condition": "ROUTE_NOT_FOUND"},
+        {"originIndex": 0, "destinationIndex": 2, "condition": "ROUTE_EXISTS", "distanceMeters": 900, "duration": "420s"},
+        {"originIndex": 0, "destinationIndex": 3, "status": {"code": 3, "message": "Adresse invalide"}},
+    ]
+    google = _google(monkeypatch, lambda body: elements)
+    try:
+        summary = navigation.get_route_matrix.invoke({
+            "origin": HOTEL,
+            "destinations": ["Gare du Nord", "Île inconnue", "Parc Georges-Brassens", "???"],
+            "travel_mode": "TRANSIT",
+        })
+    finally:
+        google.stop()
+
+    assert summary.splitlines() == [
+        f"Transport en commun depuis {HOTEL}",
+        "1. Parc Georges-Brassens • 7 min • 900 m",
+        "2. Gare du Nord • 33 min • 6.1 km",
+        "Aucun itinéraire : Île inconnue, ???",
+    ]
+
+def test_route_matrix_auto_mode_and_stub_defaults(monkeypatch):
+    google = _google(monkeypatch)
+    try:
+        near = navigation.get_route_matrix.invoke({"origin": HOTEL, "destinations": ["Paris Expo Porte de Versailles"]})
+        mixed = navigation.get_route_matrix.invoke({"origin": HOTEL, "destinations": ["Paris Expo Porte de Versailles", "Tour Eiffel"]})
+    finally:
+        google.stop()
+
+    # Marche seulement si toutes les destinations sont à moins de 1 km
+    assert near.splitlines() == [f"À pied depuis {HOTEL}", "1. Paris Expo Porte de Versailles • 10 min • 800 m"]
+    assert mixed.splitlines()[0] == f"Transport en commun depuis {HOTEL}"
+    assert mixed.splitlines()[1:] == ["1. Paris Expo Porte de Versailles • 10 min • 800 m", "2. Tour Eiffel • 14 min • 1.2 km"]
+    assert google.requests == {"/distanceMatrix/v2:computeRouteMatrix": 2}
+
+def test_route_matrix_errors(monkeypatch):
+    google = _google(monkeypatch, lambda body: {"error": {"code": 400, "message": "Adresse d'origine invalide"}})
+    try:
+        assert navigation.get_route_matrix.invoke({"origin": "?", "destinations": ["Tour Eiffel"], "travel_mode": "WALK"}) \
+            == "❌ Erreur: Adresse d'origine invalide"
+    finally:
+        google.stop()
+    assert navigation.get_route_matrix.invoke({"origin": HOTEL, "destinations": []}) == "❌ Erreur: aucune destination fournie"
@@ -0,0 +1,119 @@
+# tests/core/test_prefetch.py
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from langchain.tools import tool
+from bellai.core import prefetch
+from bellai.core.prefetch import SpeculativePrefetcher, extract_destination, normalize_tool_args
+from bellai.tools.navigation import get_route as real_get_route
+from bellai.tools.places_service import HOTEL_LOCATION
+
+release = threading.Event()
+calls = []
+
+@tool
+def get_route(origin: str, destination: str, travel_mode="AUTO", departure_time=None, vehicle_type="car"):
+    """Itinéraire factice, bloqué jusqu'à `release`"""
+    calls.append(("get_route", destination, travel_mode))
+    release.wait(5)
+    return f"Itinéraire vers {destination}"
+
+@tool
+def get_client_preferences() -> str:
+    """Préférences factices"""
+    calls.append(("get_client_preferences",))
+    return "Cuisine: française"
+
+@tool
+def get_services_hours() -> str:
+    """Horaires factices"""
+    calls.append(("get_services_hours",))
+    release.wait(5)
+    return "Restaurant: 19h-23h"
+
+def _wait_until(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+@pytest.fixture
+def prefetcher(monkeypatch):
+    release.clear()
+    calls.clear()
+    monkeypatch.setenv("BELLAI_PREFETCH_ENABLED", "true")
+    # Un seul worker : le deuxième appel lancé reste en file (annulable)
+    monkeypatch.setattr(prefetch, "_executor", ThreadPoolExecutor(max_workers=1))
+    yield SpeculativePrefetcher([get_route, get_client_preferences, get_services_hours])
+    release.set()
+
+@pytest.mark.parametrize("message, destination", [
+    ("Comment aller à la Tour Eiffel ?", "Tour Eiffel, Paris"),
+    ("Je voudrais me rendre au Louvre en métro.", "Louvre, Paris"),
+    ("Un trajet vers le Sacré-Cœur", "Sacré-Cœur, Paris"),
+    ("Il me faut un taxi pour l'aéroport d'Orly", "Aéroport d'Orly, Paris"),
+    ("Comment aller jusqu'à la gare de Lyon à pied ?", "Gare de Lyon, Paris"),
+    ("Un uber vers Montmartre en taxi", "Montmartre, Paris"),
+    ("Quel trajet me conseillez-vous ?", None),
+    ("Aller à " + "x" * 90, None),
+])
+def test_extract_destination(message, destination):
+    assert extract_destination(message) == destination
+
+def test_predicted_route_matches_the_model_call():
+    predicted = {"origin": HOTEL_LOCATION, "destination": "Tour Eiffel, Paris", "travel_mode": "AUTO"}
+    # Appel du modèle : valeurs par défaut explicites, casse et espaces différents
+    model_call = {"origin": HOTEL_LOCATION.upper(), "destination": "tour  eiffel, paris",
+                  "travel_mode": "AUTO", "departure_time": None, "vehicle_type": "car"}
+    assert normalize_tool_args(real_get_route, predicted) == normalize_tool_args(real_get_route, model_call)
+
+    assert normalize_tool_args(real_get_route, predicted) != normalize_tool_args(real_get_route, {**predicted, "travel_mode": "WALK"})
+    assert normalize_tool_args(real_get_route, predicted) != normalize_tool_args(real_get_route, {**predicted, "vehicle_type": "taxi"})
+
+def test_predict(prefetcher):
+    assert prefetcher.predict("Une table au restaurant ce soir") == [("get_client_preferences", {}), ("get_services_hours", {})]
+    assert prefetcher.predict("Un taxi pour la Tour Eiffel") == [("get_route", {
+        "origin": HOTEL_LOCATION, "destination": "Tour Eiffel, Paris", "travel_mode": "DRIVE", "vehicle_type": "taxi",
+    })]
+    assert prefetcher.predict("Quel temps fait-il ?") == []
+
+def test_wrapped_tool_serves_prefetched_result(prefetcher):
+    wrapped = {t.name: t for t in prefetcher.wrap_tools([get_route, get_client_preferences])}
+    batch = prefetcher.start("Comment aller à la Tour Eiffel ?")
+    release.set()
+
+    result = wrapped["get_route"].invoke({"origin": HOTEL_LOCATION, "destination": "tour eiffel, paris", "travel_mode": "AUTO"})
+    assert result == "Itinéraire vers Tour Eiffel, Paris"
+    assert calls == [("get_route", "Tour Eiffel, Paris", "AUTO")]  # pas de second appel
+
+    # Autre destination : appel réel
+    wrapped["get_route"].invoke({"origin": HOTEL_LOCATION, "destination": "Louvre, Paris"})
+    prefetcher.finish(batch)
+
+    metrics = prefetcher.get_metrics()
+    assert (metrics["launched"], metrics["hits"], metrics["misses"]) == (1, 1, 1)
+    assert metrics.get("wasted", 0) == 0
+    assert metrics["hit_rate"] == 1.0
+
+def test_finish_accounts_wasted_prefetches(prefetcher):
+    # Lancés dans l'ordre : préférences, horaires (bloqué sur le seul worker), itinéraire (en file)
+    wrapped = {t.name: t for t in prefetcher.wrap_tools([get_route, get_client_preferences, get_services_hours])}
+    batch = prefetcher.start("Après le dîner au restaurant, un taxi pour le Louvre")
+    assert prefetcher.counters.get("launched") == 3
+
+    assert wrapped["get_client_preferences"].invoke({}) == "Cuisine: française"
+    _wait_until(lambda: ("get_services_hours",) in calls)
+    prefetcher.finish(batch)
+
+    # get_services_hours en cours (non annulable), get_route encore en file (annulé)
+    assert prefetcher.counters.get("wasted") == 2
+    assert prefetcher.counters.get("cancelled") == 1
+    assert prefetcher.counters.get("wasted_seconds") == 0
+
+    # Travail perdu compté quand l'appel non annulable se termine
+    release.set()
+    _wait_until(lambda: prefetcher.counters.get("wasted_seconds") > 0)
+    assert ("get_route", "Louvre, Paris", "DRIVE") not in calls
+    assert prefetcher.get_metrics()["waste_rate"] == round(2 / 3, 3)
+    assert prefetch._current_batch.get() is None
@@ -0,0 +1,39 @@
+# tests/core/test_profiling.py
+import json
+import asyncio
+import pstats
+from bellai.core.agent import BellAIAgent
+from bellai.core.memory import chat_memory
+from bellai.core.profiling import turn_profiler
+from bellai.core.router import ModelRoute
+from bellai.testing.fake_llm import FakeChatModel
+
+def run_turns(session_id: str, count: int = 1):
+    agent = BellAIAgent(models={route: FakeChatModel(script=["Bonjour !"], latency=0.03) for route in ModelRoute})
+    for _ in range(count):
+        asyncio.run(agent.process_message("Bonjour", session_id))
+    chat_memory.clear_session(session_id)
+    return agent
+
+def test_marked_session_writes_profiles_named_by_turn(tmp_path, monkeypatch):
+    monkeypatch.setattr(turn_profiler, "output_dir", str(tmp_path))
+    agent = run_turns("unmarked_session")
+    assert not list(tmp_path.iterdir())
+
+    agent.profile_session("profiled_session")
+    try:
+        run_turns("profiled_session")
+        monkeypatch.setattr(turn_profiler, "mode", "sampling")
+        run_turns("profiled_session")
+    finally:
+        agent.profile_session("profiled_session", enabled=False)
+
+    files = sorted(path.name for path in tmp_path.iterdir())
+    assert all(name.startswith("profiled_session_turn_") for name in files)
+    pstats_file = next(path for path in tmp_path.iterdir() if path.suffix == ".pstats")
+    functions = {func[2] for func in pstats.Stats(str(pstats_file)).stats}
+    assert "_execute_turn" in functions
+    speedscope = json.loads(next(tmp_path.glob("*.speedscope.json")).read_text())
+    assert speedscope["profiles"][0]["samples"]
+    assert len(list(tmp_path.glob("*.alloc.txt"))) == 2
+    assert agent.get_profiling_metrics()["profiled"] >= 2
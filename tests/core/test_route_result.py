@@ -0,0 +1,83 @@
+# tests/core/test_route_result.py
+import os
+import json
+import pytest
+from bellai.tools.route_result import RouteResult, parse_routes_response, render_route_summary
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "..", "fixtures", "routes")
+
+def _load(name: str) -> dict:
+    with open(os.path.join(FIXTURES, name), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+@pytest.fixture
+def transit():
+    return parse_routes_response(_load("transit_eiffel.json"), "Hôtel", "Tour Eiffel", "TRANSIT")
+
+@pytest.fixture
+def incomplete_walk():
+    # Ni durée ni distance au niveau de l'itinéraire, étape sans distance et à durée illisible
+    return parse_routes_response(_load("walk_incomplete.json"), "Hôtel", "Parc", "WALK")
+
+def test_parse_transit_response(transit):
+    assert (transit.distance_meters, transit.duration_seconds, transit.duration_minutes) == (5230, 1680, 28)
+    assert [leg.mode for leg in transit.legs] == ["WALK", "TRANSIT", "TRANSIT", "WALK"]
+    assert len(transit.steps) == 5
+
+    # Sous-étapes à pied consécutives fusionnées
+    walk = transit.legs[0]
+    assert (walk.distance_meters, walk.duration_seconds) == (300, 240)
+    assert walk.instructions == ["Prendre la direction nord sur Rue d'Oradour-sur-Glane", "Tourner à droite vers Porte de Versailles"]
+
+    first, second = transit.transit_lines
+    assert (first.name, first.vehicle, first.departure_stop, first.arrival_time, first.stop_count) == ("12", "Métro", "Porte de Versailles", "08:20", 4)
+    # Sans nom court, le nom complet de la ligne
+    assert second.name == "Ligne 6"
+
+def test_parse_response_without_duration_or_distance(incomplete_walk):
+    assert (incomplete_walk.distance_meters, incomplete_walk.duration_seconds) == (0, 0)
+    assert len(incomplete_walk.legs) == 1
+    assert (incomplete_walk.legs[0].distance_meters, incomplete_walk.legs[0].duration_seconds) == (400, 300)
+
+def test_minimal_verbosity(transit, incomplete_walk):
+    assert render_route_summary(transit, "minimal") == "Transport en commun • 5.2 km • 28 min"
+    assert render_route_summary(incomplete_walk, "minimal") == "À pied • 0 m • 0 min"
+
+def test_compact_verbosity(transit, incomplete_walk):
+    assert render_route_summary(transit, "compact").splitlines() == [
+        "Transport en commun • 5.2 km • 28 min",
+        "1. À pied 300 m (4 min)",
+        "2. Métro 12 dir. Mairie d'Issy : Porte de Versailles 08:10 → Pasteur 08:20 (4 arrêts)",
+        "3. Métro Ligne 6 dir. Charles de Gaulle - Étoile : Pasteur 08:25 → Bir-Hakeim 08:31 (3 arrêts)",
+        "4. À pied 230 m (4 min)",
+    ]
+    # Un seul segment à pied : les totaux suffisent
+    assert render_route_summary(incomplete_walk, "compact") == "À pied • 0 m • 0 min"
+    # Niveau inconnu : compact
+    assert render_route_summary(transit, "bavard") == render_route_summary(transit, "compact")
+
+def test_detailed_verbosity(transit, incomplete_walk):
+    lines = render_route_summary(transit, "detailed").splitlines()
+    assert lines[1:4] == [
+        "1. À pied 300 m (4 min)",
+        "   - Prendre la direction nord sur Rue d'Oradour-sur-Glane",
+        "   - Tourner à droite vers Porte de Versailles",
+    ]
+    assert lines[-2:] == ["4. À pied 230 m (4 min)", "   - Continuer sur Quai Branly"]
+    assert render_route_summary(incomplete_walk, "detailed").splitlines() == [
+        "À pied • 0 m • 0 min",
+        "1. À pied 400 m (5 min)",
+        "   - Prendre la direction est",
+    ]
+
+def test_route_id_and_taxi_label():
+    route = parse_routes_response(_load("walk_incomplete.json"), "Hôtel", "Orly", "DRIVE", vehicle_type="taxi")
+    route.route_id = "route_1_1"
+    assert render_route_summary(route, "minimal").splitlines() == ["Taxi • 0 m • 0 min", "ROUTE_ID: route_1_1"]
+
+def test_departure_times_omitted_when_unknown(transit):
+    transit.transit_lines[0].departure_time = transit.transit_lines[0].arrival_time = None
+    assert "2. Métro 12 dir. Mairie d'Issy : Porte de Versailles → Pasteur (4 arrêts)" in render_route_summary(transit).splitlines()
+
+def test_dict_round_trip(transit):
+    assert RouteResult.from_dict(json.loads(json.dumps(transit.to_dict()))) == transit
@@ -0,0 +1,113 @@
+# tests/core/test_route_table.py
+import time
+from datetime import datetime
+import pytest
+from bellai.tools import navigation, route_table as route_table_module
+from bellai.tools.route_table import TIME_BUCKETS, TRAVEL_MODES, RouteTable, time_bucket
+from bellai.tools.route_result import RouteLeg, RouteResult, TransitLine
+from bellai.tools.places_service import HOTEL_LOCATION
+
+DESTINATIONS = [
+    {"name": "Tour Eiffel, Paris", "aliases": ["tour eiffel", "eiffel tower"]},
+    {"name": "Musée du Louvre, Paris", "aliases": ["louvre"]},
+]
+
+def _route(destination: str, mode: str) -> RouteResult:
+    line = TransitLine("6", "SUBWAY", "Nation", "Pasteur", "Bir-Hakeim", "08:10", "08:22", 5)
+    return RouteResult(HOTEL_LOCATION, destination, mode, 4200, 1500,
+                       legs=[RouteLeg(mode, 4200, 1500, transit=line if mode == "TRANSIT" else None)])
+
+@pytest.fixture
+def table(tmp_path):
+    return RouteTable(str(tmp_path / "routes.sqlite3"), max_age_hours=1, destinations=DESTINATIONS)
+
+@pytest.fixture
+def paris_time(monkeypatch):
+    monkeypatch.setenv("TZ", "Europe/Paris")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+@pytest.mark.parametrize("departure, bucket", [
+    (datetime(2025, 6, 2, 7, 59), "nuit"),
+    (datetime(2025, 6, 2, 8, 0), "matin"),
+    (datetime(2025, 6, 2, 13, 30), "midi"),
+    (datetime(2025, 6, 2, 18, 0), "soir"),
+    (datetime(2025, 6, 2, 23, 15), "nuit"),
+    ("2025-06-02T12:00:00", "midi"),
+    ("pas une date", time_bucket(None)),
+])
+def test_time_bucket(departure, bucket):
+    assert time_bucket(departure) == bucket
+
+def test_time_bucket_converts_utc_to_local_time(paris_time):
+    # 6h30 UTC = 8h30 à Paris en été, 17h30 UTC = 18h30
+    assert time_bucket("2025-06-02T06:30:00Z") == "matin"
+    assert time_bucket("2025-06-02T17:30:00Z") == "soir"
+    assert time_bucket("2025-06-02T06:30:00+02:00") == "nuit"
+
+def test_lookup_fresh_entry_by_alias(table):
+    table.store("tour eiffel", "TRANSIT", "matin", _route("Tour Eiffel, Paris", "TRANSIT"))
+
+    route = table.lookup(HOTEL_LOCATION, "Eiffel Tower", "TRANSIT", "2025-06-02T08:30:00")
+    assert route.source == "route_table"
+    assert route.destination == "Eiffel Tower"
+    # Horaires de passage retirés : valables pour un autre jour seulement
+    assert route.transit_lines[0].departure_time is None
+    assert table.counters.get("hits") == 1
+
+def test_lookup_misses(table):
+    table.store("tour eiffel", "TRANSIT", "matin", _route("Tour Eiffel, Paris", "TRANSIT"))
+
+    assert table.lookup(HOTEL_LOCATION, "Tour Eiffel", "TRANSIT", "2025-06-02T19:00:00") is None  # autre créneau
+    assert table.lookup(HOTEL_LOCATION, "Tour Eiffel", "WALK", "2025-06-02T08:30:00") is None
+    assert table.lookup(HOTEL_LOCATION, "Gare du Nord", "TRANSIT", "2025-06-02T08:30:00") is None
+    # Origine autre que l'hôtel : jamais servie par la table
+    assert table.lookup("Gare de Lyon", "Tour Eiffel", "TRANSIT", "2025-06-02T08:30:00") is None
+    assert table.counters.get("misses") == 3
+
+def test_lookup_stale_entry(table):
+    table.store("tour eiffel", "TRANSIT", "matin", _route("Tour Eiffel, Paris", "TRANSIT"))
+    table._connection().execute("UPDATE routes SET fetched_at = ?", (time.time() - 7200,))
+
+    assert table.lookup(HOTEL_LOCATION, "Tour Eiffel", "TRANSIT", "2025-06-02T08:30:00") is None
+    assert table.counters.get("stale") == 1
+    assert table.coverage() == {"entries": 1, "fresh": 0, "destinations": {}}
+
+def test_rebuild_and_coverage(table, monkeypatch):
+    calls = []
+
+    def fake_fetch(origin, destination, mode, departure):
+        calls.append((destination, mode, departure))
+        if destination.startswith("Musée") and mode == "BICYCLE":
+            raise RuntimeError("quota")
+        return _route(destination, mode)
+
+    monkeypatch.setattr(navigation, "fetch_route", fake_fetch)
+    report = table.rebuild()
+
+    assert len(calls) == len(DESTINATIONS) * len(TRAVEL_MODES) * len(TIME_BUCKETS)
+    assert report["fetched"] == len(calls) - len(TIME_BUCKETS)
+    assert {error["bucket"] for error in report["errors"]} == set(TIME_BUCKETS)
+    # Heure de départ seulement pour les modes qui en dépendent
+    assert all((departure is None) == (mode in ("WALK", "BICYCLE")) for _, mode, departure in calls)
+
+    coverage = table.coverage()
+    assert coverage["fresh"] == coverage["entries"] == report["fetched"]
+    assert coverage["destinations"] == {"musee du louvre": "12/16", "tour eiffel": "16/16"}
+
+def test_scheduler_skips_rebuild_of_fresh_table(table, monkeypatch):
+    rebuilds = []
+    monkeypatch.setattr(route_table_module, "_scheduler", None)
+    monkeypatch.setattr(table, "coverage", lambda: {"fresh": 32})
+    monkeypatch.setattr(table, "rebuild", lambda top_n: rebuilds.append(top_n))
+
+    thread = route_table_module.start_scheduler(table, interval_hours=1)
+    assert route_table_module.start_scheduler(table, interval_hours=1) is thread
+    thread.join(timeout=0.2)
+    assert rebuilds == []
+
+def test_scheduler_disabled_by_default(monkeypatch):
+    monkeypatch.setattr(route_table_module, "ROUTE_TABLE_SCHEDULE_HOURS", 0)
+    assert route_table_module.start_scheduler_from_env() is None
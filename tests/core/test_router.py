@@ -0,0 +1,57 @@
+# tests/core/test_router.py
+import pytest
+from bellai.core.router import ModelRoute, ModelRouter, detect_turn_intent
+
+@pytest.fixture
+def router(monkeypatch):
+    monkeypatch.delenv("BELLAI_ROUTER_ENABLED", raising=False)
+    monkeypatch.delenv("BELLAI_ROUTER_FAST_MAX_CHARS", raising=False)
+    monkeypatch.delenv("BELLAI_ROUTER_FAST_MAX_TOOL_DEPTH", raising=False)
+    return ModelRouter()
+
+@pytest.mark.parametrize("message, intent", [
+    ("Bonjour !", "greeting"),
+    ("Merci beaucoup", "greeting"),
+    ("Oui, d'accord", "confirmation"),
+    ("Quel est le code wifi ?", "info"),
+    ("À quelle heure ouvre la piscine ?", "info"),
+    ("Je voudrais réserver une table pour ce soir", "booking"),
+    ("Un massage demain matin", "booking"),
+    ("Comment aller à la Tour Eiffel ?", "concierge"),
+    ("Commandez-moi un taxi pour Orly", "concierge"),
+    ("Je veux parler au responsable", "escalation"),
+    ("Pouvez-vous m'en dire plus ?", "unknown"),
+])
+def test_detect_turn_intent(message, intent):
+    assert detect_turn_intent(message) == intent
+
+@pytest.mark.parametrize("message, route", [
+    # Salutations et questions d'information courtes : modèle rapide
+    ("Bonjour !", ModelRoute.FAST),
+    ("Quel est le code wifi ?", ModelRoute.FAST),
+    ("x" * 50 + " horaire ?", ModelRoute.FAST),  # 60 caractères : limite incluse
+    # Trop long, même pour une simple information
+    ("x" * 51 + " horaire ?", ModelRoute.MAIN),
+    ("Bonjour, pourriez-vous me rappeler les horaires du petit-déjeuner demain ?", ModelRoute.MAIN),
+    # Intentions qui appellent plusieurs outils
+    ("Oui", ModelRoute.MAIN),
+    ("Une table pour deux", ModelRoute.MAIN),
+    ("Trajet vers le Louvre", ModelRoute.MAIN),
+    ("Je veux parler au responsable", ModelRoute.MAIN),
+    ("Pouvez-vous m'aider ?", ModelRoute.MAIN),
+])
+def test_route_selection(router, message, route):
+    assert router.route(message) == route
+
+def test_tool_depth_threshold(router):
+    router.fast_max_tool_depth = 0
+    assert router.route("Bonjour !") == ModelRoute.MAIN
+
+def test_disabled_router_always_uses_main(router):
+    router.enabled = False
+    assert router.route("Bonjour !") == ModelRoute.MAIN
+
+@pytest.mark.parametrize("message", ["Comment me rendre à Orly ?", "Un uber pour Bercy", "Y aller à pied ?"])
+def test_route_keywords_shared_with_prefetch(message):
+    # Même liste que le préchargement de get_route : un trajet n'est jamais routé vers le modèle rapide
+    assert detect_turn_intent(message) == "concierge"
@@ -0,0 +1,105 @@
+# tests/core/test_scheduler.py
+import asyncio
+from bellai.core.intention import action_manager
+from bellai.core.scheduler import Priority, TurnScheduler, classify_priority
+from bellai.core.sessions import TurnContext, current_session, current_turn
+from bellai.tools.intention_service import detect_escalation_need
+
+def test_classify_priority():
+    assert classify_priority("C'est une urgence, ma chambre est inondée") == Priority.URGENT
+    assert classify_priority("Je veux parler au responsable") == Priority.HIGH
+    assert classify_priority("Le restaurant est ouvert ce soir ?") == Priority.NORMAL
+
+def test_urgent_turn_jumps_the_queue_and_escalates_immediately():
+    scheduler = TurnScheduler(max_concurrent=1, aging_seconds=60)
+    order = []
+
+    async def handler(message, session_id):
+        order.append(message)
+        await asyncio.sleep(0.02)
+        return {"response": message}
+
+    async def run():
+        first = asyncio.create_task(scheduler.submit("restaurant 1", "s1", handler))
+        await asyncio.sleep(0.005)
+        routine = [asyncio.create_task(scheduler.submit(f"restaurant {i}", f"s{i}", handler)) for i in range(2, 5)]
+        await asyncio.sleep(0.005)
+        urgent = asyncio.create_task(scheduler.submit("urgence : fuite d'eau", "s9", handler))
+        await asyncio.sleep(0)
+        escalated = [a for a in action_manager.get_pending_actions()
+                     if a.action_type == "escalate_to_human" and a.data["user_message"] == "urgence : fuite d'eau"]
+        return await asyncio.gather(first, *routine, urgent), escalated
+
+    results, escalated = asyncio.run(run())
+    assert order[:2] == ["restaurant 1", "urgence : fuite d'eau"]
+    assert results[-1]["priority"] == "urgent"
+    assert len(escalated) == 1 and escalated[0].data["priority"] == "high"
+
+    metrics = scheduler.get_metrics()
+    assert metrics["running"] == 0 and metrics["escalations_dispatched"] == 1
+    assert metrics["priorities"]["normal"]["latency"]["count"] == 4
+
+def test_aging_prevents_starvation():
+    scheduler = TurnScheduler(max_concurrent=1, aging_seconds=0.01)
+    order = []
+
+    async def handler(message, session_id):
+        order.append(message)
+        await asyncio.sleep(0.03)
+        return {}
+
+    async def run():
+        first = asyncio.create_task(scheduler.submit("bonjour", "s1", handler))
+        await asyncio.sleep(0.001)
+        old = asyncio.create_task(scheduler.submit("horaires du spa", "s2", handler))
+        await asyncio.sleep(0.025)
+        late = asyncio.create_task(scheduler.submit("je veux le responsable", "s3", handler))
+        await asyncio.gather(first, old, late)
+
+    asyncio.run(run())
+    assert order == ["bonjour", "horaires du spa", "je veux le responsable"]
+
+def test_same_escalation_text_escalates_in_each_session():
+    message = "Je veux parler au responsable (test sessions)"
+
+    def escalate(session_id: str) -> str:
+        session_token, turn_token = current_session.set(session_id), current_turn.set(TurnContext(session_id, message))
+        try:
+            # Ordonnanceur puis modèle : une seule action pour le tour
+            TurnScheduler().dispatch_escalation(message, session_id)
+            return detect_escalation_need.func(message)
+        finally:
+            current_session.reset(session_token)
+            current_turn.reset(turn_token)
+
+    escalate("escalation_guest_a")
+    escalate("escalation_guest_b")
+    for session_id in ("escalation_guest_a", "escalation_guest_b"):
+        actions = [a for a in action_manager.get_pending_actions(session_id) if a.data["user_message"] == message]
+        assert len(actions) == 1
+
+def test_model_paraphrase_reuses_the_turn_escalation():
+    session_id = "escalation_paraphrase"
+    message = "Première demande.\nJe veux parler au responsable, c'est une urgence"
+
+    def run_turn(tool_message: str) -> str:
+        session_token, turn_token = current_session.set(session_id), current_turn.set(TurnContext(session_id, message))
+        try:
+            TurnScheduler().dispatch_escalation(message, session_id)
+            # Texte reformulé par le modèle (ou message fusionné après remplacement)
+            return detect_escalation_need.func(tool_message)
+        finally:
+            current_session.reset(session_token)
+            current_turn.reset(turn_token)
+
+    first = run_turn("Le client veut parler au responsable")
+    assert len(action_manager.get_pending_actions(session_id)) == 1
+    assert first.endswith(action_manager.get_pending_actions(session_id)[0].id)
+
+    # Tour suivant : nouvelle escalade
+    run_turn("urgence")
+    actions = action_manager.get_pending_actions(session_id)
+    assert len(actions) == 2
+    assert len({action.turn_id for action in actions}) == 2
+    for action in actions:
+        action_manager.cancel_action(action.id)
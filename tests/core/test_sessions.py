@@ -0,0 +1,82 @@
+# tests/core/test_sessions.py
+import asyncio
+import random
+from bellai.core.agent import BellAIAgent
+from bellai.core.memory import chat_memory
+from bellai.core.router import ModelRoute
+from bellai.core.sessions import SessionLocks
+from bellai.testing.fake_llm import FakeChatModel
+
+SESSIONS = 100
+TURNS_PER_SESSION = 20
+
+def test_turns_of_one_session_run_in_order_while_sessions_overlap():
+    locks = SessionLocks()
+    running, overlap, order = set(), [], []
+
+    async def turn(session_id, i):
+        async with locks.hold(session_id):
+            assert session_id not in running
+            running.add(session_id)
+            overlap.append(len(running))
+            await asyncio.sleep(random.random() / 1000)
+            order.append((session_id, i))
+            running.discard(session_id)
+
+    async def run():
+        await asyncio.gather(*(turn(f"s{n % 10}", n // 10) for n in range(200)))
+
+    asyncio.run(run())
+    for s in range(10):
+        assert [i for session_id, i in order if session_id == f"s{s}"] == list(range(20))
+    assert max(overlap) > 1
+    assert locks.get_metrics()["active_sessions"] == 0
+
+def test_stress_concurrent_turns_keep_history_consistent():
+    agent = BellAIAgent(models={route: FakeChatModel(latency=0.001) for route in ModelRoute})
+    agent.turn_deadline = 0  # toutes les rafales sont soumises d'un coup : pas d'échéance
+    sessions = [f"stress_{n}" for n in range(SESSIONS)]
+    messages = [(session_id, f"{session_id} message {i}") for i in range(TURNS_PER_SESSION) for session_id in sessions]
+    random.Random(7).shuffle(messages)
+
+    async def run():
+        return await asyncio.gather(*(agent.process_message(message, session_id) for session_id, message in messages))
+
+    results = asyncio.run(run())
+    assert all(result["status"] == "success" for result in results)
+
+    for session_id in sessions:
+        sent = [message for s, message in messages if s == session_id]
+        history = chat_memory.get_conversation_history(session_id)
+        assert [m["role"] for m in history] == ["user", "assistant"] * TURNS_PER_SESSION
+        assert [m["content"] for m in history[::2]] == sent
+        assert [m["content"] for m in history[1::2]] == [f"Réponse à: {message}" for message in sent]
+        chat_memory.clear_session(session_id)
+
+    assert agent.get_session_metrics()["active_sessions"] == 0
+
+def test_newer_message_supersedes_in_flight_turn():
+    script = [("detect_booking_intention", {"user_message": "table pour 19h", "service_type": "restaurant"}), "C'est noté."]
+    agent = BellAIAgent(models={route: FakeChatModel(script=script, latency=0.05) for route in ModelRoute})
+    agent.supersede_policy = "cancel"
+    session_id = "supersede_session"
+
+    async def run():
+        first = asyncio.create_task(agent.process_message("Une table pour 19h", session_id))
+        await asyncio.sleep(0.08)  # le premier tour attend sa deuxième réponse du modèle
+        second = asyncio.create_task(agent.process_message("non, plutôt pour 20h", session_id))
+        return await asyncio.gather(first, second)
+
+    first, second = asyncio.run(run())
+    assert first["status"] == "superseded"
+    assert second["status"] == "success"
+
+    history = chat_memory.get_conversation_history(session_id)
+    assert [(m["role"], m["content"]) for m in history] == [
+        ("user", "Une table pour 19h\nnon, plutôt pour 20h"),
+        ("assistant", "C'est noté."),
+    ]
+    # L'action préparée par le tour annulé a été retirée, seule celle du tour fusionné reste
+    assert len(second["backend_actions"]) == 1
+    assert agent.get_session_metrics()["rolled_back_actions"] == 1
+    chat_memory.clear_session(session_id)
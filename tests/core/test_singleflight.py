@@ -0,0 +1,92 @@
+# tests/core/test_singleflight.py
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.tools import tool
+from bellai.core.singleflight import SingleFlight
+
+def test_concurrent_identical_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+
+    def slow_lookup(query):
+        calls.append(query)
+        time.sleep(0.1)
+        return f"result:{query}"
+
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        results = list(pool.map(lambda _: flight.do("k", slow_lookup, "louvre"), range(5)))
+
+    assert results == ["result:louvre"] * 5
+    assert len(calls) == 1
+    metrics = flight.get_metrics()
+    assert metrics["executions"] == 1 and metrics["shared"] == 4
+    assert metrics["max_waiters"] == 4 and metrics["in_flight"] == {}
+
+def test_errors_are_shared_and_key_is_released():
+    flight = SingleFlight()
+    started = threading.Event()
+
+    def failing():
+        started.set()
+        time.sleep(0.05)
+        raise ValueError("boom")
+
+    def follower():
+        started.wait()
+        try:
+            flight.do("k", failing)
+        except ValueError as e:
+            return str(e)
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(follower)
+        try:
+            flight.do("k", failing)
+        except ValueError:
+            pass
+        assert leader.result() == "boom"
+    assert flight.do("k", lambda: "ok") == "ok"
+
+def test_wrapped_tool_coalesces_normalized_async_calls():
+    calls = []
+
+    @tool
+    def search(query: str, max_results: int = 3) -> str:
+        """Recherche"""
+        calls.append(query)
+        time.sleep(0.05)
+        return query
+
+    wrapped = SingleFlight().wrap_tool(search)
+
+    async def burst():
+        return await asyncio.gather(
+            wrapped.ainvoke({"query": "Restaurant  Italien"}),
+            wrapped.ainvoke({"query": "restaurant italien", "max_results": 3}),
+        )
+
+    assert len(asyncio.run(burst())) == 2
+    assert len(calls) == 1
+
+def test_cancelled_follower_does_not_cancel_the_others():
+    flight = SingleFlight()
+
+    def slow_lookup():
+        time.sleep(0.1)
+        return "route"
+
+    async def scenario():
+        leader = asyncio.ensure_future(flight.ado("k", slow_lookup))
+        await asyncio.sleep(0.01)
+        cancelled = asyncio.ensure_future(flight.ado("k", slow_lookup))
+        follower = asyncio.ensure_future(flight.ado("k", slow_lookup))
+        await asyncio.sleep(0.01)
+        cancelled.cancel()
+        return await asyncio.gather(leader, cancelled, follower, return_exceptions=True)
+
+    leader, cancelled, follower = asyncio.run(scenario())
+    assert isinstance(cancelled, asyncio.CancelledError)
+    assert leader == follower == "route"
+    assert "errors" not in flight.get_metrics()
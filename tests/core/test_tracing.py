@@ -0,0 +1,54 @@
+# tests/core/test_tracing.py
+import asyncio
+from bellai.core import agent as agent_module
+from bellai.core.agent import BellAIAgent
+from bellai.core.memory import chat_memory
+from bellai.core.router import ModelRoute
+from bellai.core.tracing import Tracer, load_traces, render_flame, render_tree, session_traces
+from bellai.testing.fake_llm import FakeChatModel
+from bellai.testing.google_stub import GoogleStubServer
+from bellai.tools import navigation
+
+SCRIPT = [
+    ("get_route", {"origin": "Hôtel BellAI", "destination": "Basilique de Saint-Denis", "travel_mode": "DRIVE"}),
+    "Comptez environ 30 minutes en voiture.",
+]
+
+def test_turn_is_exported_as_span_tree(tmp_path, monkeypatch):
+    path = str(tmp_path / "traces.jsonl")
+    tracer = Tracer(path=path, sample_rate=1.0)
+    monkeypatch.setattr(agent_module, "tracer", tracer)
+
+    with GoogleStubServer() as google:
+        monkeypatch.setattr(navigation, "ROUTES_API_URL", f"{google.url}/directions/v2:computeRoutes")
+        agent = BellAIAgent(models={route: FakeChatModel(script=SCRIPT, prompt_tokens=80) for route in ModelRoute})
+        asyncio.run(agent.process_message("Comment aller à Saint-Denis en voiture ?", "trace_session"))
+    chat_memory.clear_session("trace_session")
+    assert tracer.flush()
+
+    turns = session_traces(load_traces(path), "trace_session")
+    assert len(turns) == 1
+    spans = {span["span_id"]: span for span in turns[0]}
+    by_name = {span["name"]: span for span in spans.values()}
+    assert by_name["agent.turn"]["attributes"]["bellai.status"] == "success"
+    assert by_name["agent.turn"]["attributes"]["gen_ai.usage.input_tokens"] == 160
+
+    tool = by_name["tool get_route"]
+    iteration = spans[tool["parent_id"]]
+    assert iteration["name"] == "agent.iteration" and iteration["attributes"]["bellai.iteration"] == 1
+    assert spans[iteration["parent_id"]]["name"] == "agent.turn"
+    http = [span for span in spans.values() if span["name"].startswith("HTTP POST")]
+    assert any(span["parent_id"] in (tool["span_id"], by_name["agent.turn"]["span_id"]) for span in http)
+
+    assert "└─ agent.iteration" in render_tree(turns[0])
+    assert render_flame(turns[0]).startswith("agent.turn")
+
+def test_fast_turns_are_sampled_out_but_errors_kept(tmp_path):
+    tracer = Tracer(path=str(tmp_path / "traces.jsonl"), sample_rate=0.0, slow_ms=10_000)
+    tracer.start_trace("agent.turn").end()
+    failed = tracer.start_trace("agent.turn")
+    failed.set_error("RuntimeError")
+    failed.end()
+    assert tracer.flush()
+    metrics = tracer.get_metrics()
+    assert (metrics["sampled_out"], metrics["exported"], metrics["dropped"]) == (1, 1, 0)
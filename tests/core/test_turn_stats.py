@@ -0,0 +1,29 @@
+# tests/core/test_turn_stats.py
+import asyncio
+from bellai.core.agent import BellAIAgent
+from bellai.core.memory import chat_memory
+from bellai.core.router import ModelRoute
+from bellai.testing.fake_llm import FakeChatModel
+
+def test_result_carries_latency_and_token_breakdown():
+    script = [("get_client_preferences", {}), "Le Patio vous attend ce soir."]
+    model = FakeChatModel(script=script, latency=0.05, prompt_tokens=120, completion_tokens=15)
+    agent = BellAIAgent(models={route: model for route in ModelRoute})
+    session_id = "stats_session"
+    before = agent.get_turn_stats_metrics()["turns"]
+
+    result = asyncio.run(agent.process_message("J'ai faim", session_id))
+    stats = result["stats"]
+
+    assert stats["iterations"] == 2
+    assert [call["prompt_tokens"] for call in stats["llm_calls"]] == [120, 120]
+    assert stats["completion_tokens"] == 30
+    assert all(call["ms"] >= 50 for call in stats["llm_calls"])
+    assert [tool["name"] for tool in stats["tools"]] == ["get_client_preferences"]
+    assert stats["memory_ms"] > 0
+    assert stats["llm_ms"] + stats["tool_ms"] + stats["memory_ms"] <= stats["total_ms"]
+
+    metrics = agent.get_turn_stats_metrics()
+    assert metrics["turns"] == before + 1
+    assert metrics["tools"]["get_client_preferences"]["count"] >= 1
+    chat_memory.clear_session(session_id)
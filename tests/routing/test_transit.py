@@ -0,0 +1,45 @@
+# tests/routing/test_transit.py
+import os
+from datetime import datetime
+import pytest
+from bellai.routing.transit import TransitTimetable, RaptorRouter
+from bellai.tools.route_result import render_route_summary
+
+GTFS_FIXTURE = os.path.join(os.path.dirname(__file__), "..", "fixtures", "gtfs_mini")
+
+PORTE_DE_VERSAILLES = (48.8324, 2.2878)
+BIR_HAKEIM = (48.8539, 2.2894)
+
+@pytest.fixture(scope="module")
+def router():
+    return RaptorRouter(TransitTimetable(GTFS_FIXTURE))
+
+def test_timetable_is_array_backed(router):
+    tt = router.timetable
+    assert len(tt.stop_ids) == 8  # la station parente est ignorée
+    assert len(tt.pattern_stops) == 2
+    assert tt.pattern_departures[0].dtype.kind == "i"
+
+def test_weekday_route_with_transfer(router):
+    route = router.route(PORTE_DE_VERSAILLES, BIR_HAKEIM, datetime(2025, 6, 2, 8, 3), "Hôtel", "Bir-Hakeim")
+
+    assert route is not None
+    assert route.source == "gtfs"
+    assert [line.name for line in route.transit_lines] == ["12", "6"]
+    first, second = route.transit_lines
+    assert (first.departure_stop, first.departure_time) == ("Porte de Versailles", "08:10")
+    assert (second.departure_time, second.arrival_stop, second.arrival_time) == ("08:25", "Bir-Hakeim", "08:31")
+    assert route.duration_seconds == 28 * 60
+
+def test_weekend_uses_weekend_service(router):
+    route = router.route(PORTE_DE_VERSAILLES, BIR_HAKEIM, datetime(2025, 6, 7, 8, 3))
+    assert route.transit_lines[1].departure_time == "08:20"
+
+def test_calendar_exception_removes_service(router):
+    assert router.route(PORTE_DE_VERSAILLES, BIR_HAKEIM, datetime(2025, 12, 25, 8, 3)) is None
+
+def test_summary_uses_get_route_format(router):
+    route = router.route(PORTE_DE_VERSAILLES, BIR_HAKEIM, datetime(2025, 6, 2, 8, 3))
+    summary = render_route_summary(route)
+    assert summary.startswith("Transport en commun")
+    assert "Métro 12" in summary and "Métro 6" in summary
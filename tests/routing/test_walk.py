@@ -0,0 +1,37 @@
+# tests/routing/test_walk.py
+import os
+import pytest
+from bellai.routing.walk import WalkGraph, WalkRouter
+
+WALK_FIXTURE = os.path.join(os.path.dirname(__file__), "..", "fixtures", "osm_walk_sample.json")
+
+HOTEL = (48.8294, 2.2784)
+EAST_CORNER = (48.8294, 2.2784 + 4 * 0.00136)
+NORTH_EAST_CORNER = (48.8294 + 4 * 0.0009, 2.2784 + 4 * 0.00136)
+
+@pytest.fixture(scope="module")
+def router():
+    return WalkRouter(WalkGraph(WALK_FIXTURE))
+
+def test_graph_is_csr(router):
+    graph = router.graph
+    assert len(graph.offsets) == len(graph.node_ids) + 1
+    assert graph.offsets[-1] == len(graph.targets) == len(graph.lengths)
+
+def test_detour_around_closed_segment(router):
+    route = router.route(HOTEL, EAST_CORNER, "Hôtel", "Rue Desnouettes")
+
+    assert route.travel_mode == "WALK" and route.source == "osm"
+    assert 590 <= route.distance_meters <= 610  # 100 m + 400 m + 100 m au lieu de 400 m
+    assert route.legs[0].instructions == [
+        "Partir sur Rue Henry Farman",
+        "Tourner à droite sur Rue du Colonel Pierre Avia",
+        "Tourner à droite sur Rue Desnouettes",
+    ]
+
+def test_astar_uses_shortcut(router):
+    route = router.route(HOTEL, NORTH_EAST_CORNER)
+    assert any("Allée du Parc" in step["navigationInstruction"]["instructions"] for step in route.steps)
+
+def test_points_outside_graph_are_rejected(router):
+    assert router.route(HOTEL, (48.8584, 2.2945)) is None